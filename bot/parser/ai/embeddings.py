@@ -0,0 +1,186 @@
+"""
+Async-сервіс embeddings для fuzzy-дедупу.
+
+Запити — через спільний шлюз parser.ai.gateway (пул з'єднань, RPM/TPM, повтори 429/5xx);
+черга збирає тексти з різних повідомлень в один запит embeddings.create (до PARSER_EMBEDDING_BATCH_SIZE
+або через PARSER_EMBEDDING_BATCH_WAIT_MS), та кеш за вмістом у parser_embedding_cache.
+PARSER_EMBEDDING_BASE_URL — напр. локальний stub-ендпоінт для перевірки без OpenAI.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+from parser.ai.gateway import estimate_tokens, get_ai_gateway
+from parser.config.settings import (
+    PARSER_EMBEDDING_BASE_URL,
+    PARSER_EMBEDDING_BATCH_SIZE,
+    PARSER_EMBEDDING_BATCH_WAIT_MS,
+    PARSER_EMBEDDING_MODEL,
+)
+from parser.core.metrics import metrics, stage_timer
+from parser.storage.db_pool import db_read, db_write
+from parser.storage.embedding_cache import (
+    embedding_cache_key,
+    get_cached_embeddings,
+    put_cached_embeddings,
+)
+
+logger = logging.getLogger(__name__)
+
+_MEMO_MAX = 4096
+
+
+class EmbeddingService:
+    """embed() з будь-якої кількості корутин; однакові тексти в польоті — один запит."""
+
+    def __init__(
+        self,
+        *,
+        model: str = PARSER_EMBEDDING_MODEL,
+        batch_size: int = PARSER_EMBEDDING_BATCH_SIZE,
+        batch_wait_ms: int = PARSER_EMBEDDING_BATCH_WAIT_MS,
+        base_url: str | None = None,
+        client: Any = None,
+    ):
+        self.model = model
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = max(0, int(batch_wait_ms)) / 1000.0
+        self._base_url = base_url if base_url is not None else (PARSER_EMBEDDING_BASE_URL or None)
+        # Явний клієнт (скрипти / перевірки); інакше — спільний з шлюзу.
+        self._client = client
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: list[tuple[str, str]] = []
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._memo: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.stats = {"requests": 0, "texts_sent": 0, "cache_hits": 0, "errors": 0}
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Новий event loop (окремий asyncio.run у скрипті) — стан попереднього не придатний.
+            self._loop = loop
+            self._pending.clear()
+            self._inflight.clear()
+            self._timer = None
+            self._tasks.clear()
+        return loop
+
+    def _memo_put(self, key: str, vec: np.ndarray) -> None:
+        self._memo[key] = vec
+        self._memo.move_to_end(key)
+        while len(self._memo) > _MEMO_MAX:
+            self._memo.popitem(last=False)
+
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """float32-вектор або None (помилка API — fuzzy-дедуп для цього поста пропускається)."""
+        text = (text or "").strip()
+        if not text:
+            return None
+        key = embedding_cache_key(self.model, text)
+        hit = self._memo.get(key)
+        if hit is not None:
+            self._memo.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            metrics.inc("embedding_cache_hit")
+            return hit
+
+        loop = self._bind_loop()
+        fut = self._inflight.get(key)
+        if fut is None:
+            # Future реєструється до читання кешу — паралельні embed() того ж тексту чекають на нього.
+            fut = loop.create_future()
+            self._inflight[key] = fut
+            try:
+                cached = (await db_read(get_cached_embeddings, [key])).get(key)
+            except Exception as e:
+                logger.debug("embedding cache read skipped: %s", e)
+                cached = None
+            if cached is not None:
+                vec = np.asarray(cached, dtype=np.float32)
+                self._memo_put(key, vec)
+                self.stats["cache_hits"] += 1
+                metrics.inc("embedding_cache_hit")
+                self._inflight.pop(key, None)
+                fut.set_result(vec)
+                return vec
+            self._pending.append((key, text))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.batch_wait, self._flush)
+        # shield: скасування одного поста не скасовує спільний запит для інших.
+        return await asyncio.shield(fut)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[: self.batch_size]
+            del self._pending[: self.batch_size]
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[tuple[str, str]]) -> None:
+        results: dict[str, Optional[np.ndarray]] = {key: None for key, _ in batch}
+        texts = [text for _, text in batch]
+        gateway = get_ai_gateway()
+        try:
+            with stage_timer("embedding_request"):
+                if self._client is not None:
+                    response = await gateway.call(
+                        self.model,
+                        sum(estimate_tokens(text) for text in texts),
+                        lambda _: self._client.embeddings.create(model=self.model, input=texts),
+                    )
+                else:
+                    response = await gateway.embeddings(model=self.model, input=texts, base_url=self._base_url)
+            self.stats["requests"] += 1
+            self.stats["texts_sent"] += len(batch)
+            metrics.inc("embedding_texts_sent", len(batch))
+            for pos, item in enumerate(response.data):
+                idx = getattr(item, "index", pos)
+                if 0 <= idx < len(batch):
+                    results[batch[idx][0]] = np.asarray(item.embedding, dtype=np.float32)
+        except Exception as e:
+            self.stats["errors"] += 1
+            metrics.inc("embedding_errors")
+            logger.warning("Fuzzy dedup embedding batch (%s) failed: %s", len(batch), e)
+
+        fresh = {key: vec for key, vec in results.items() if vec is not None}
+        for key, vec in fresh.items():
+            self._memo_put(key, vec)
+        if fresh:
+            try:
+                await db_write(put_cached_embeddings, self.model, fresh)
+            except Exception as e:
+                logger.debug("embedding cache write skipped: %s", e)
+        for key, vec in results.items():
+            fut = self._inflight.pop(key, None)
+            if fut is not None and not fut.done():
+                fut.set_result(vec)
+
+    async def aclose(self) -> None:
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+_service: EmbeddingService | None = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    global _service
+    if _service is None:
+        _service = EmbeddingService()
+    return _service
@@ -26,6 +26,7 @@ from typing import Any, Optional
 
 from dotenv import load_dotenv
 
+from parser.ai.gateway import get_ai_gateway, openai_available
 from parser.marketplace_categories import (
     clean_title,
     marketplace_taxonomy_for_ai,
@@ -312,15 +313,12 @@ async def enrich_parsed_item_with_ai(item: dict) -> Optional[AiEnrichmentResult]
     if not is_ai_enrich_enabled():
         return None
 
-    try:
-        from openai import AsyncOpenAI
-    except ImportError:
+    if not openai_available():
         logger.error("openai не встановлено. pip install openai")
         return None
 
-    client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     try:
-        response = await client.chat.completions.create(
+        response = await get_ai_gateway().chat_completion(
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": _ENRICH_SYSTEM_PROMPT},
@@ -0,0 +1,319 @@
+"""
+Спільний шлюз до OpenAI для всього процесу парсера.
+
+Один AsyncOpenAI на base_url (пул з'єднань httpx перевикористовується між постами),
+глобальний ліміт паралельних запитів PARSER_AI_MAX_CONCURRENCY і окремі token bucket
+RPM / TPM на кожну модель (PARSER_AI_RPM / PARSER_AI_TPM, для embeddings —
+PARSER_AI_EMBEDDING_*; точково — PARSER_AI_MODEL_LIMITS="model=rpm/tpm,…").
+
+429 / 5xx / обрив з'єднання — повтор із jittered exponential backoff; retry-after(-ms)
+з відповіді має пріоритет, а 429 на час паузи блокує bucket моделі для всіх корутин.
+Власні ретраї SDK вимкнені (max_retries=0), щоб не множити спроби.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from parser.config.settings import (
+    PARSER_AI_EMBEDDING_RPM,
+    PARSER_AI_EMBEDDING_TPM,
+    PARSER_AI_MAX_CONCURRENCY,
+    PARSER_AI_MAX_RETRIES,
+    PARSER_AI_MODEL_LIMITS,
+    PARSER_AI_RPM,
+    PARSER_AI_TPM,
+)
+from parser.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_BACKOFF_BASE_SEC = 1.0
+_BACKOFF_MAX_SEC = 60.0
+# Грубо: ~3 символи кириличного / змішаного тексту на токен.
+_CHARS_PER_TOKEN = 3
+_RETRY_STATUSES = frozenset({408, 409, 429})
+
+
+def openai_available() -> bool:
+    try:
+        import openai  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // _CHARS_PER_TOKEN)
+
+
+def _chat_tokens(body: dict) -> int:
+    """Оцінка для TPM: промпт + max_tokens (OpenAI рахує ліміт так само)."""
+    prompt = sum(estimate_tokens(str(m.get("content") or "")) for m in body.get("messages") or ())
+    return prompt + int(body.get("max_tokens") or body.get("max_completion_tokens") or 0)
+
+
+def _parse_model_limits(raw: str) -> dict[str, tuple[int, int]]:
+    out: dict[str, tuple[int, int]] = {}
+    for part in (raw or "").split(","):
+        model, _, limits = part.partition("=")
+        rpm, _, tpm = limits.partition("/")
+        try:
+            out[model.strip()] = (int(rpm), int(tpm))
+        except ValueError:
+            if part.strip():
+                logger.warning("PARSER_AI_MODEL_LIMITS: пропущено «%s» (очікується model=rpm/tpm)", part)
+    return out
+
+
+_MODEL_LIMITS = _parse_model_limits(PARSER_AI_MODEL_LIMITS)
+
+
+class _TokenBucket:
+    """Ємність = ліміт за хвилину, поповнення рівномірне. Баланс може піти в мінус (дорахунок usage)."""
+
+    __slots__ = ("capacity", "rate", "tokens", "ts")
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.ts = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class _ModelLimits:
+    __slots__ = ("rpm", "tpm", "blocked_until")
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = _TokenBucket(rpm)
+        self.tpm = _TokenBucket(tpm)
+        self.blocked_until = 0.0
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    return int(code) if isinstance(code, int) else None
+
+
+def _retry_after_sec(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    raw_ms = headers.get("retry-after-ms")
+    if raw_ms:
+        try:
+            return max(0.0, float(raw_ms) / 1000.0)
+        except ValueError:
+            pass
+    raw = headers.get("retry-after")
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(exc: BaseException, attempt: int) -> Optional[float]:
+    """Пауза перед повтором або None — помилка не тимчасова (400, 401, закінчилась квота…)."""
+    import openai
+
+    if isinstance(exc, openai.APIConnectionError):
+        retry_after = None
+    elif isinstance(exc, openai.APIStatusError):
+        status = _status_code(exc)
+        if status is None or (status not in _RETRY_STATUSES and status < 500):
+            return None
+        if getattr(exc, "code", None) == "insufficient_quota":
+            return None
+        retry_after = _retry_after_sec(exc)
+    else:
+        return None
+    backoff = min(_BACKOFF_MAX_SEC, _BACKOFF_BASE_SEC * (2 ** attempt))
+    if retry_after is not None:
+        # Сервер назвав час — чекаємо його + невеликий розкид, щоб корутини не стартували разом.
+        return min(_BACKOFF_MAX_SEC, retry_after) + random.uniform(0, 0.25 * backoff)
+    return random.uniform(backoff / 2, backoff)
+
+
+class AiGateway:
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = PARSER_AI_MAX_CONCURRENCY,
+        max_retries: int = PARSER_AI_MAX_RETRIES,
+    ):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sem: asyncio.Semaphore | None = None
+        self._clients: dict[Optional[str], Any] = {}
+        self._limits: dict[str, _ModelLimits] = {}
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "errors": 0}
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Новий event loop (окремий asyncio.run у скрипті) — клієнти httpx прив'язані до старого.
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._clients.clear()
+
+    def client(self, base_url: Optional[str] = None):
+        """Спільний AsyncOpenAI для base_url (None — api.openai.com)."""
+        self._bind_loop()
+        client = self._clients.get(base_url)
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(
+                api_key=(os.getenv("OPENAI_API_KEY") or "").strip(),
+                base_url=base_url,
+                timeout=90.0,
+                max_retries=0,
+            )
+            self._clients[base_url] = client
+        return client
+
+    def _model_limits(self, model: str) -> _ModelLimits:
+        limits = self._limits.get(model)
+        if limits is None:
+            if model in _MODEL_LIMITS:
+                rpm, tpm = _MODEL_LIMITS[model]
+            elif "embedding" in model:
+                rpm, tpm = PARSER_AI_EMBEDDING_RPM, PARSER_AI_EMBEDDING_TPM
+            else:
+                rpm, tpm = PARSER_AI_RPM, PARSER_AI_TPM
+            limits = self._limits[model] = _ModelLimits(rpm, tpm)
+        return limits
+
+    async def _acquire(self, limits: _ModelLimits, tokens: int) -> None:
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            delay = max(
+                limits.blocked_until - now,
+                limits.rpm.wait_time(1, now),
+                limits.tpm.wait_time(tokens, now),
+            )
+            if delay <= 0:
+                limits.rpm.take(1)
+                limits.tpm.take(tokens)
+                break
+            waited += delay
+            await asyncio.sleep(delay)
+        if waited:
+            metrics.observe("ai_rate_wait", waited)
+
+    async def call(
+        self,
+        model: Optional[str],
+        tokens: int,
+        fn: Callable[[Any], Awaitable[T]],
+        *,
+        base_url: Optional[str] = None,
+    ) -> T:
+        """
+        fn(client) під лімітами моделі з повторами. model=None — без RPM/TPM
+        (службові виклики: файли / статус Batch API), лише конкурентність і backoff.
+        """
+        client = self.client(base_url)
+        limits = self._model_limits(model) if model else None
+        attempt = 0
+        while True:
+            if limits is not None:
+                await self._acquire(limits, tokens)
+            assert self._sem is not None
+            try:
+                async with self._sem:
+                    result = await fn(client)
+            except Exception as e:
+                delay = retry_delay(e, attempt) if attempt < self.max_retries else None
+                if delay is None:
+                    self.stats["errors"] += 1
+                    raise
+                attempt += 1
+                self.stats["retries"] += 1
+                metrics.inc("ai_retries")
+                if _status_code(e) == 429:
+                    self.stats["rate_limited"] += 1
+                    metrics.inc("ai_rate_limited")
+                    if limits is not None:
+                        limits.blocked_until = max(limits.blocked_until, time.monotonic() + delay)
+                logger.info(
+                    "AI %s: %s — повтор %s/%s через %.1f с",
+                    model or "api",
+                    _status_code(e) or type(e).__name__,
+                    attempt,
+                    self.max_retries,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.stats["requests"] += 1
+            usage = getattr(result, "usage", None)
+            used = getattr(usage, "total_tokens", None)
+            if limits is not None and isinstance(used, int):
+                # Оцінка включала max_tokens — повертаємо невикористане в bucket.
+                limits.tpm.adjust(used - tokens)
+            return result
+
+    async def chat_completion(self, *, base_url: Optional[str] = None, **body: Any):
+        return await self.call(
+            body["model"],
+            _chat_tokens(body),
+            lambda client: client.chat.completions.create(**body),
+            base_url=base_url,
+        )
+
+    async def embeddings(self, *, model: str, input: list[str], base_url: Optional[str] = None):
+        return await self.call(
+            model,
+            sum(estimate_tokens(text) for text in input),
+            lambda client: client.embeddings.create(model=model, input=input, timeout=30.0),
+            base_url=base_url,
+        )
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.close()
+
+
+_gateway: AiGateway | None = None
+
+
+def get_ai_gateway() -> AiGateway:
+    global _gateway
+    if _gateway is None:
+        _gateway = AiGateway()
+    return _gateway
@@ -0,0 +1,241 @@
+"""
+Локальний pre-screen перед AI screen: логістична регресія на хешованих n-грамах (numpy, CPU).
+
+Вчиться на вердиктах AI (parser_ai_screen_labels) — ціль «AI відхилив пост». Поріг підбирається
+на відкладених свіжих даних під PARSER_PRESCREEN_MIN_PRECISION, тож у режимі enforce відсікається
+лише впевнене сміття (спам, вакансії, «куплю», чати), решта йде в AI як раніше.
+
+Навчання / оцінка — python -m parser.scripts.train_prescreen; модель — PARSER_PRESCREEN_MODEL_PATH
+(перечитується, коли файл змінився).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from parser.config.settings import PARSER_PRESCREEN_MODE, PARSER_PRESCREEN_MODEL_PATH
+from parser.core.metrics import metrics, stage_timer
+
+logger = logging.getLogger(__name__)
+
+PRESCREEN_REJECT_REASON = "мусор (prescreen)"
+
+_DEFAULT_BITS = 18
+_MAX_CHARS = 2000
+_MIN_THRESHOLD = 0.5
+_URL_RE = re.compile(r"(?:https?://|t\.me/|www\.)\S+", re.IGNORECASE)
+_MENTION_RE = re.compile(r"@\w{3,}")
+_DIGIT_RE = re.compile(r"\d")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _normalize(text: str) -> str:
+    t = (text or "")[:_MAX_CHARS].lower()
+    t = _URL_RE.sub(" urltoken ", t)
+    t = _MENTION_RE.sub(" mentiontoken ", t)
+    return _DIGIT_RE.sub("0", t)
+
+
+def featurize(text: str, n_bits: int = _DEFAULT_BITS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Індекси ознак і ваги (L2 = 1): слова, біграми слів, символьні 3-грами в межах слова
+    та кошик довжини. crc32, а не hash() — стабільно між процесами.
+    """
+    mask = (1 << n_bits) - 1
+    words = _WORD_RE.findall(_normalize(text))
+    grams = [f"l:{min(len(words), 200).bit_length()}"]
+    grams.extend(f"w:{w}" for w in words)
+    grams.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    for w in words:
+        padded = f" {w} "
+        grams.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    idx = np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) & mask for g in grams), dtype=np.int64))
+    val = np.full(len(idx), 1.0 / np.sqrt(len(idx)), dtype=np.float32)
+    return idx, val
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30.0, 30.0)))
+
+
+@dataclass
+class PrescreenModel:
+    weights: np.ndarray
+    bias: float
+    n_bits: int = _DEFAULT_BITS
+    # > 1 — модель нічого не відсікає (на val не знайшлося порогу з потрібною precision).
+    threshold: float = 1.01
+    meta: dict = field(default_factory=dict)
+
+    def reject_proba(self, text: str) -> float:
+        idx, val = featurize(text, self.n_bits)
+        return float(_sigmoid(np.float64(self.weights[idx] @ val) + self.bias))
+
+    def reject_probas(self, texts: Sequence[str]) -> np.ndarray:
+        return np.array([self.reject_proba(t) for t in texts], dtype=np.float64)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self.weights.astype(np.float32),
+                bias=np.float64(self.bias),
+                n_bits=np.int64(self.n_bits),
+                threshold=np.float64(self.threshold),
+                meta=np.array(json.dumps(self.meta, ensure_ascii=False)),
+            )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "PrescreenModel":
+        with np.load(Path(path), allow_pickle=False) as data:
+            return cls(
+                weights=data["weights"].astype(np.float32),
+                bias=float(data["bias"]),
+                n_bits=int(data["n_bits"]),
+                threshold=float(data["threshold"]),
+                meta=json.loads(str(data["meta"])),
+            )
+
+
+def train_prescreen(
+    texts: Sequence[str],
+    rejects: Sequence[int],
+    *,
+    n_bits: int = _DEFAULT_BITS,
+    epochs: int = 6,
+    batch_size: int = 64,
+    lr: float = 0.5,
+    l2: float = 1e-6,
+    seed: int = 0,
+) -> PrescreenModel:
+    """Mini-batch AdaGrad по розріджених ознаках; поріг виставляє choose_threshold окремо."""
+    rows = [featurize(t, n_bits) for t in texts]
+    y = np.asarray(rejects, dtype=np.float64)
+    w = np.zeros(1 << n_bits, dtype=np.float64)
+    g2 = np.full(1 << n_bits, 1e-8, dtype=np.float64)
+    b, b_g2 = 0.0, 1e-8
+    rng = np.random.default_rng(seed)
+    for _ in range(max(1, epochs)):
+        order = rng.permutation(len(rows))
+        for start in range(0, len(order), batch_size):
+            ids = order[start:start + batch_size]
+            idx = np.concatenate([rows[i][0] for i in ids])
+            val = np.concatenate([rows[i][1] for i in ids])
+            lens = np.array([len(rows[i][0]) for i in ids])
+            # Кожен рядок має щонайменше ознаку довжини — сегменти reduceat непорожні.
+            starts = np.concatenate(([0], np.cumsum(lens)[:-1]))
+            err = _sigmoid(np.add.reduceat(w[idx] * val, starts) + b) - y[ids]
+            uniq, inv = np.unique(idx, return_inverse=True)
+            grad = np.bincount(inv, weights=np.repeat(err, lens) * val) / len(ids) + l2 * w[uniq]
+            g2[uniq] += grad * grad
+            w[uniq] -= lr * grad / np.sqrt(g2[uniq])
+            b_grad = float(err.mean())
+            b_g2 += b_grad * b_grad
+            b -= lr * b_grad / np.sqrt(b_g2)
+    return PrescreenModel(weights=w.astype(np.float32), bias=b, n_bits=n_bits)
+
+
+def choose_threshold(
+    probas: np.ndarray,
+    rejects: np.ndarray,
+    *,
+    min_precision: float,
+    min_support: int = 20,
+) -> float:
+    """
+    Поріг з найбільшим recall, за якого precision відсіву (частка справжніх AI-відхилень
+    серед відсічених) ще ≥ min_precision; з однаковим recall — найвищий, щоб запас precision
+    не витрачався на зайві accept. Не нижче 0.5; 1.01 — такого порогу немає.
+    """
+    order = np.argsort(-probas, kind="stable")
+    p = probas[order]
+    tp = np.cumsum(np.asarray(rejects)[order])
+    n = np.arange(1, len(p) + 1)
+    # Рахуємо лише на межах однакових значень — поріг p[k] відсікає всі рівні йому.
+    last_of_tie = np.append(p[1:] != p[:-1], True)
+    ok = last_of_tie & (tp / n >= min_precision) & (n >= min_support) & (p >= _MIN_THRESHOLD)
+    if not ok.any():
+        return 1.01
+    candidates = np.flatnonzero(ok)
+    best = candidates[tp[candidates] == tp[candidates].max()][0]
+    return float(p[best])
+
+
+def evaluate_prescreen(probas: np.ndarray, rejects: np.ndarray, threshold: float) -> dict:
+    """Precision / recall відсіву проти вердиктів AI; coverage — частка постів, де AI не викликається."""
+    rejects = np.asarray(rejects, dtype=bool)
+    cut = probas >= threshold
+    tp = int((cut & rejects).sum())
+    fp = int((cut & ~rejects).sum())
+    total = len(rejects)
+    return {
+        "total": total,
+        "ai_rejects": int(rejects.sum()),
+        "cut": tp + fp,
+        "true_rejects": tp,
+        "false_rejects": fp,
+        "precision": tp / (tp + fp) if tp + fp else 1.0,
+        "recall": tp / int(rejects.sum()) if rejects.any() else 0.0,
+        "coverage": (tp + fp) / total if total else 0.0,
+    }
+
+
+_model: Optional[PrescreenModel] = None
+_model_mtime: Optional[float] = None
+
+
+def get_prescreen_model() -> Optional[PrescreenModel]:
+    """Модель з PARSER_PRESCREEN_MODEL_PATH (None — режим off або файлу ще немає)."""
+    global _model, _model_mtime
+    if PARSER_PRESCREEN_MODE == "off":
+        return None
+    try:
+        mtime = PARSER_PRESCREEN_MODEL_PATH.stat().st_mtime
+    except OSError:
+        _model, _model_mtime = None, None
+        return None
+    if mtime != _model_mtime:
+        _model_mtime = mtime
+        try:
+            _model = PrescreenModel.load(PARSER_PRESCREEN_MODEL_PATH)
+            logger.info(
+                "Pre-screen: модель %s (поріг %.3f, %s)",
+                PARSER_PRESCREEN_MODEL_PATH.name,
+                _model.threshold,
+                _model.meta.get("trained_at", "?"),
+            )
+        except Exception as e:
+            _model = None
+            logger.warning("Pre-screen: не вдалося завантажити %s: %s", PARSER_PRESCREEN_MODEL_PATH, e)
+    return _model
+
+
+def prescreen_reject_reason(text: str) -> Optional[str]:
+    """
+    Причина відхилення без AI або None. shadow — лише лічильник prescreen_would_reject,
+    щоб звірити з вердиктами AI перед увімкненням enforce.
+    """
+    model = get_prescreen_model()
+    if model is None or not (text or "").strip():
+        return None
+    with stage_timer("prescreen"):
+        proba = model.reject_proba(text)
+    if proba < model.threshold:
+        return None
+    if PARSER_PRESCREEN_MODE != "enforce":
+        metrics.inc("prescreen_would_reject")
+        return None
+    metrics.inc("prescreen_reject")
+    return PRESCREEN_REJECT_REASON
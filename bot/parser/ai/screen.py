@@ -6,6 +6,8 @@ AI-фільтр парсованих оголошень: сміття, дубл
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import logging
 import os
@@ -25,8 +27,28 @@ from parser.ai.enrich import (
     is_ai_enrich_enabled,
     merge_enrichment_into_item,
 )
-from parser.marketplace_categories import clean_title, resolve_marketplace_category
-from parser.storage.listing_dedup import recent_listings_for_ai_context
+from parser.ai.gateway import get_ai_gateway, openai_available
+from parser.config.settings import PARSER_AI_SCREEN_CACHE_ENABLED, PARSER_AI_SCREEN_LABELS
+from parser.core.metrics import metrics, stage_timer
+from parser.marketplace_categories import (
+    clean_title,
+    marketplace_taxonomy_for_ai,
+    resolve_marketplace_category,
+)
+from parser.storage.ai_screen_cache import (
+    ai_screen_cache_key,
+    get_cached_ai_screen,
+    put_cached_ai_screen,
+)
+from parser.storage.ai_screen_labels import put_ai_screen_label
+from parser.storage.db_pool import db_read, db_write
+from parser.storage.listing_dedup import (
+    ai_context_from_snapshot,
+    current_ai_context_snapshot,
+    load_ai_context_snapshot,
+    set_ai_context_snapshot,
+)
+from parser.storage.parsed_items import fingerprint_parsed_text
 
 load_dotenv(Path(__file__).resolve().parent.parent.parent / ".env")
 
@@ -128,8 +150,8 @@ def _pick_best_title(ai_title: str, item: dict, raw_text: str) -> str:
 
 
 def _build_screen_prompt(item: dict, context: dict) -> str:
+    """Змінна частина (user): пост, підказки парсера, правило локації, черги для дедупу — в кінці."""
     from parser.core.location import is_local_source_city
-    from parser.marketplace_categories import marketplace_taxonomy_for_ai
 
     raw_text = (item.get("raw_text") or "")[:4000]
     pending = context.get("pending_titles") or []
@@ -156,9 +178,7 @@ def _build_screen_prompt(item: dict, context: dict) -> str:
 
     channel_scope = "LOCAL city channel" if local_channel else "Germany-wide channel"
 
-    return f"""You moderate AND enrich Telegram flea-market posts for Trade Ground (Germany; RU/UK/DE).
-
-POST TEXT:
+    return f"""POST TEXT:
 {raw_text}
 
 Parser hints (UNTRUSTED — often wrong stubs; rebuild from POST TEXT):
@@ -168,14 +188,34 @@ Parser hints (UNTRUSTED — often wrong stubs; rebuild from POST TEXT):
 - channel: {item.get("source_channel")}
 - channel city: {channel_city} ({channel_scope})
 
+LOCATION RULE: {location_hint}
+
 ALREADY IN MODERATION QUEUE (reject duplicates):
 {pending_block}
 
 ALREADY LIVE ON MARKETPLACE (recent; reject duplicates):
-{active_block}
+{active_block}"""
+
+
+_SCREEN_SYSTEM_INTRO = (
+    "You are the listing quality engine for Trade Ground marketplace (Germany). "
+    "For each Telegram flea-market post: (1) accept only real goods/service offers; "
+    "(2) write a marketplace-ready Russian title (brand/model/service — never stubs like "
+    "«авто»/«товар», never price/city in title); "
+    "(3) write a complete factual Russian description from the post (no invention); "
+    "(4) assign category/subcategory ONLY from the allowed id list "
+    "(cars → auto/cars; phones → electronics/smartphones; tattoo/nails → "
+    "services_work/beauty_health). Never invent category ids. JSON only."
+)
+
+# Статична частина — однакова для всіх постів і йде першою: префікс кешується провайдером
+# (prompt caching від ~1024 токенів), платимо лише за змінний хвіст у user-повідомленні.
+_SCREEN_INSTRUCTIONS = """You moderate AND enrich Telegram flea-market posts for Trade Ground (Germany; RU/UK/DE).
+The user message contains the POST TEXT, untrusted parser hints, the LOCATION RULE for this channel
+and the lists of titles ALREADY IN MODERATION QUEUE / ALREADY LIVE ON MARKETPLACE.
 
 Allowed marketplace category / subcategory ids ONLY:
-{marketplace_taxonomy_for_ai()}
+{taxonomy}
 
 ══════════════════════════════════════
 ACCEPT / REJECT
@@ -193,7 +233,8 @@ REJECT (accept=false):
 - wanted-only (“куплю / ищу”) with no own offer
 - empty / spam
 If unsure NEWS/JOB vs listing → reject. If item+price is obvious → accept.
-Duplicates vs queues above → accept=false, is_duplicate=true, reject_reason="duplicate".
+Duplicates vs the queue / marketplace lists in the user message → accept=false, is_duplicate=true,
+reject_reason="duplicate".
 
 ══════════════════════════════════════
 ENRICHMENT (only if accept=true) — marketplace auto-publish quality
@@ -258,7 +299,7 @@ PRICE / LOCATION / CONDITION:
 - price: numeric string "5500" or null; if no price in post → null (stored as negotiable/Договорная)
 - currency EUR unless грн explicit
 - is_free: true ONLY if text says free/віддам/даром
-- {location_hint}
+- location: follow the LOCATION RULE from the user message
 - goods: condition new|used from text; services_work: ALWAYS condition="new"
 - services with no price → price=null, is_free=false
 
@@ -279,23 +320,116 @@ Respond with JSON only:
   "changes_summary": "short note"
 }}"""
 
-
 _SCREEN_SYSTEM_PROMPT = (
-    "You are the listing quality engine for Trade Ground marketplace (Germany). "
-    "For each Telegram flea-market post: (1) accept only real goods/service offers; "
-    "(2) write a marketplace-ready Russian title (brand/model/service — never stubs like "
-    "«авто»/«товар», never price/city in title); "
-    "(3) write a complete factual Russian description from the post (no invention); "
-    "(4) assign category/subcategory ONLY from the allowed id list "
-    "(cars → auto/cars; phones → electronics/smartphones; tattoo/nails → "
-    "services_work/beauty_health). Never invent category ids. JSON only."
+    f"{_SCREEN_SYSTEM_INTRO}\n\n"
+    f"{_SCREEN_INSTRUCTIONS.format(taxonomy=marketplace_taxonomy_for_ai())}"
 )
 
+# Змінили _build_screen_prompt по суті — підняти _SCREEN_PROMPT_REVISION (скидає кеш відповідей).
+# Зміни _SCREEN_SYSTEM_PROMPT (інструкції, таксономія) враховуються автоматично через hash.
+_SCREEN_PROMPT_REVISION = "2"
+SCREEN_PROMPT_VERSION = (
+    f"{_SCREEN_PROMPT_REVISION}:"
+    f"{hashlib.sha256(_SCREEN_SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:12]}"
+)
+
+
+def screen_request_body(item: dict, context: dict) -> dict:
+    """Тіло chat.completions для screen — спільне для синхронного виклику і Batch API."""
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": _SCREEN_SYSTEM_PROMPT},
+            {"role": "user", "content": _build_screen_prompt(item, context)},
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.0,
+        "max_tokens": 2800,
+        # Один ключ на версію промпту — запити потрапляють на ті самі кеш-вузли провайдера.
+        "prompt_cache_key": f"parser-screen-{SCREEN_PROMPT_VERSION}",
+    }
+
+
+_context_load: Optional[tuple[asyncio.AbstractEventLoop, asyncio.Task]] = None
+
+
+async def screen_context(item: dict) -> dict:
+    """Черга / активні оголошення для дедупу в промпті — зі знімка циклу (один SQL на цикл)."""
+    global _context_load
+    snapshot = current_ai_context_snapshot()
+    if snapshot is None:
+        loop = asyncio.get_running_loop()
+        # Паралельні пости на старті циклу чекають одне завантаження.
+        if _context_load is None or _context_load[0] is not loop or _context_load[1].done():
+            _context_load = (loop, loop.create_task(db_read(load_ai_context_snapshot)))
+        snapshot = await asyncio.shield(_context_load[1])
+        set_ai_context_snapshot(snapshot)
+    return ai_context_from_snapshot(
+        snapshot,
+        title=str(item.get("title") or ""),
+        location=str(item.get("source_city") or item.get("location") or ""),
+        exclude_id=item.get("id"),
+    )
+
+
+async def cached_screen_result(item: dict) -> Optional[AiScreenResult]:
+    """Результат з кешу відповідей або None (кеш вимкнено / промах)."""
+    cache_key = _screen_cache_key(item)
+    if not cache_key:
+        return None
+    # get_cached_ai_screen оновлює hits — тому через writer.
+    cached = await db_write(get_cached_ai_screen, cache_key)
+    if cached is None:
+        return None
+    logger.info("AI screen: відповідь з кешу (%s)", cache_key[:12])
+    metrics.inc("ai_screen_cache_hit")
+    return _screen_result_from_data(cached, item)
+
+
+async def screen_result_from_content(content: str, item: dict) -> Optional[AiScreenResult]:
+    """Текст відповіді моделі → AiScreenResult (+ запис у кеш); None — невалідний JSON."""
+    raw = (content or "").strip()
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        logger.error("AI screen invalid JSON: %s", raw[:400])
+        return None
+    if not isinstance(data, dict):
+        data = {}
+
+    cache_key = _screen_cache_key(item)
+    if cache_key and data and _is_cacheable_screen_response(data):
+        try:
+            await db_write(
+                put_cached_ai_screen,
+                cache_key,
+                model=OPENAI_MODEL,
+                prompt_version=SCREEN_PROMPT_VERSION,
+                data=data,
+            )
+        except Exception as e:
+            logger.debug("AI screen cache write skipped: %s", e)
+
+    result = _screen_result_from_data(data, item)
+    if PARSER_AI_SCREEN_LABELS and data and _is_cacheable_screen_response(data):
+        # Датасет для parser.ai.prescreen: текст + вердикт AI.
+        try:
+            await db_write(
+                put_ai_screen_label,
+                str(item.get("raw_text") or ""),
+                accept=result.accept,
+                reason=result.reason,
+                model=OPENAI_MODEL,
+                source_channel=str(item.get("source_channel") or ""),
+            )
+        except Exception as e:
+            logger.debug("AI screen label write skipped: %s", e)
+    return result
+
 
 async def ai_screen_parsed_listing(item: dict) -> AiScreenResult:
     """Фільтр + збагачення. При помилці API — fail-closed, з вузьким fail-open на явному офері."""
     from parser.core.quality import has_listing_offer_signal
-    from parser.core.text import format_listing_description
 
     raw_preview = str(item.get("raw_text") or item.get("description") or "")
 
@@ -305,31 +439,25 @@ async def ai_screen_parsed_listing(item: dict) -> AiScreenResult:
         logger.warning("AI screen вимкнено — оголошення без enrich (approve спробує знову)")
         return AiScreenResult(accept=True)
 
-    try:
-        from openai import AsyncOpenAI
-    except ImportError:
+    cached = await cached_screen_result(item)
+    if cached is not None:
+        return cached
+
+    if not openai_available():
         logger.warning("AI screen: openai не встановлено — відхиляємо")
         return AiScreenResult(accept=False, reason="ai недоступний")
 
-    context = recent_listings_for_ai_context(
-        title=str(item.get("title") or ""),
-        location=str(item.get("source_city") or item.get("location") or ""),
-    )
+    context = await screen_context(item)
 
-    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY", "").strip())
+    metrics.inc("ai_screen_api_call")
     try:
-        response = await client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": _SCREEN_SYSTEM_PROMPT},
-                {"role": "user", "content": _build_screen_prompt(item, context)},
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.0,
-            max_tokens=2800,
-            timeout=75,
-        )
+        with stage_timer("ai_screen_request"):
+            response = await get_ai_gateway().chat_completion(
+                **screen_request_body(item, context),
+                timeout=75,
+            )
     except Exception as e:
+        metrics.inc("ai_screen_errors")
         if has_listing_offer_signal(raw_preview):
             logger.warning(
                 "AI screen failed (пропускаємо без enrich; approve повторить): %s", e
@@ -338,14 +466,35 @@ async def ai_screen_parsed_listing(item: dict) -> AiScreenResult:
         logger.warning("AI screen failed (відхиляємо): %s", e)
         return AiScreenResult(accept=False, reason="ai помилка")
 
-    raw = (response.choices[0].message.content or "").strip()
-    try:
-        data = json.loads(raw)
-    except json.JSONDecodeError:
-        logger.error("AI screen invalid JSON: %s", raw[:400])
+    result = await screen_result_from_content(response.choices[0].message.content or "", item)
+    if result is None:
         if has_listing_offer_signal(raw_preview):
             return AiScreenResult(accept=True)
         return AiScreenResult(accept=False, reason="ai помилка")
+    return result
+
+
+def _screen_cache_key(item: dict) -> str:
+    """Порожній рядок — не кешувати (вимкнено або текст закороткий для fingerprint)."""
+    if not PARSER_AI_SCREEN_CACHE_ENABLED:
+        return ""
+    fingerprint = fingerprint_parsed_text(str(item.get("raw_text") or ""))
+    if not fingerprint:
+        return ""
+    return ai_screen_cache_key(fingerprint, OPENAI_MODEL, SCREEN_PROMPT_VERSION)
+
+
+def _is_cacheable_screen_response(data: dict) -> bool:
+    """«Дублікат» залежить від черги/маркетплейсу на момент запиту — такі відповіді не кешуємо."""
+    if data.get("is_duplicate"):
+        return False
+    reason = str(data.get("reject_reason") or "").lower()
+    return "duplicate" not in reason and "дубл" not in reason
+
+
+def _screen_result_from_data(data: dict, item: dict) -> AiScreenResult:
+    """JSON моделі → AiScreenResult; валідація title/категорії/локації — під конкретний item."""
+    from parser.core.text import format_listing_description
 
     if data.get("accept") is not True:
         reason = str(data.get("reject_reason") or "ai відхилено").strip().lower()
@@ -0,0 +1,308 @@
+"""
+AI screen через OpenAI Batch API: плановий парсинг кладе пости в чергу
+(ai_screen_status=screen_pending), цей цикл раз на PARSER_AI_BATCH_INTERVAL_MIN:
+
+1. забирає результати відкритих пачок → enrichment, фіналізація, сповіщення модерації;
+2. впалі / прострочені пачки повертає в чергу;
+3. пости, що чекають довше PARSER_AI_BATCH_FALLBACK_HOURS, перевіряє синхронно;
+4. решту черги відправляє новою пачкою (JSONL з тими самими тілами chat.completions).
+
+Стан — parser.storage.ai_batches. Ручний /parse і services-канали лишаються синхронними.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from parser.ai.gateway import get_ai_gateway, openai_available
+from parser.ai.screen import (
+    ai_screen_parsed_listing,
+    cached_screen_result,
+    is_ai_screen_enabled,
+    screen_context,
+    screen_request_body,
+    screen_result_from_content,
+)
+from parser.config.channels import PARSER_TYPE_SERVICES_CHANNEL, SERVICE_CHANNELS, normalize_channel_key
+from parser.config.settings import (
+    PARSER_AI_BATCH_BASE_URL,
+    PARSER_AI_BATCH_FALLBACK_HOURS,
+    PARSER_AI_BATCH_MAX_ITEMS,
+)
+from parser.core.metrics import metrics
+from parser.storage.ai_batches import (
+    SCREEN_SUBMITTED,
+    apply_screened_item,
+    ensure_ai_batches_table,
+    list_batch_items,
+    list_open_batches,
+    list_overdue_screen_items,
+    list_screen_pending,
+    record_submitted_batch,
+    reject_screened_item,
+    requeue_batch_items,
+    update_batch_status,
+)
+from parser.storage.db_pool import db_read, db_write
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+_CUSTOM_ID_PREFIX = "pi-"
+_FAILED_STATUSES = frozenset({"failed", "expired", "cancelled"})
+
+NotifyCallback = Callable[[dict], Awaitable[Any]]
+
+
+async def _batch_api(base_url: Optional[str], fn: Callable[[Any], Awaitable[Any]]) -> Any:
+    """Службовий виклик Files / Batches через шлюз: спільний клієнт і backoff, без RPM/TPM."""
+    return await get_ai_gateway().call(None, 0, fn, base_url=base_url)
+
+
+def _custom_id(item_id: int) -> str:
+    return f"{_CUSTOM_ID_PREFIX}{int(item_id)}"
+
+
+def _item_id_from_custom_id(custom_id: str) -> Optional[int]:
+    if not str(custom_id or "").startswith(_CUSTOM_ID_PREFIX):
+        return None
+    try:
+        return int(custom_id[len(_CUSTOM_ID_PREFIX):])
+    except ValueError:
+        return None
+
+
+def _screen_candidate(row: dict) -> dict:
+    """Рядок parsed_items → candidate у форматі run_ai_screen_and_dedup."""
+    return {
+        "raw_text": row.get("raw_text") or "",
+        "title": row.get("title") or "",
+        "description": row.get("description") or "",
+        "category": row.get("category") or "",
+        "subcategory": row.get("subcategory"),
+        "price": row.get("price"),
+        "currency": row.get("currency"),
+        "is_free": bool(row.get("is_free")),
+        "condition": row.get("condition"),
+        "source_channel": row.get("source_channel") or "",
+        "source_city": row.get("source_city") or "",
+        "location": row.get("source_city") or "",
+    }
+
+
+async def _finish_item(row: dict, screen, notify_callback: NotifyCallback, stats: dict) -> None:
+    """AiScreenResult для рядка з черги → parsed_items + сповіщення (як commit у runner)."""
+    from parser.core.location import resolve_parsed_location
+    from parser.core.parse_pipeline import finalize_screen_result
+    from parser.marketplace_categories import (
+        force_services_marketplace_categories,
+        should_treat_as_service,
+    )
+    from parser.storage.parsed_items import hydrate_parsed_item
+
+    item_id = int(row["id"])
+    expected = row.get("ai_screen_status") or SCREEN_SUBMITTED
+    candidate = _screen_candidate(row)
+    ok, reason, fields = finalize_screen_result(
+        candidate,
+        screen,
+        force_service=row.get("parser_type") == PARSER_TYPE_SERVICES_CHANNEL,
+    )
+    if not ok:
+        if await db_write(reject_screened_item, item_id, expected_status=expected):
+            stats["rejected"] += 1
+            logger.info("AI batch: parsed_item %s відхилено (%s)", item_id, reason)
+        return
+
+    text = f"{fields['title']}\n{fields['description']}\n{candidate['raw_text']}"
+    fields["location"] = resolve_parsed_location(
+        channel_city=candidate["source_city"],
+        source_channel=candidate["source_channel"],
+        suggested=fields.get("location"),
+        text=text,
+    )
+    # Як у runner: після AI ще раз фіксуємо послуги з goods-каналів → мод послуг
+    if should_treat_as_service(
+        text,
+        force_service_channel=normalize_channel_key(candidate["source_channel"]) in SERVICE_CHANNELS,
+        category=fields.get("category"),
+    ):
+        locked = force_services_marketplace_categories(
+            {
+                "raw_text": candidate["raw_text"],
+                "title": fields["title"],
+                "description": fields["description"],
+                "subcategory": fields.get("subcategory"),
+            }
+        )
+        fields["category"] = locked["category"]
+        fields["subcategory"] = locked.get("subcategory")
+        fields["condition"] = "new"
+        fields["parser_type"] = PARSER_TYPE_SERVICES_CHANNEL
+    else:
+        fields["parser_type"] = "default"
+
+    if not await db_write(apply_screened_item, item_id, fields, expected_status=expected):
+        return
+    stats["accepted"] += 1
+
+    item_data = hydrate_parsed_item({**row, **fields, "ai_screen_status": None})
+    if fields["parser_type"] == PARSER_TYPE_SERVICES_CHANNEL:
+        item_data["moderation_target"] = "services_both"
+    try:
+        from parser.core.message_pipeline import moderation_rate_limiter
+
+        await moderation_rate_limiter.wait(item_data["notify_chat_id"])
+        await notify_callback(item_data)
+    except Exception as e:
+        logger.error("AI batch: помилка сповіщення для item %s: %s", item_id, e)
+
+
+async def _collect_batch(base_url: Optional[str], batch_row: dict, notify_callback: NotifyCallback, stats: dict) -> None:
+    batch_id = batch_row["batch_id"]
+    batch = await _batch_api(base_url, lambda client: client.batches.retrieve(batch_id))
+    status = str(batch.status)
+    if status in _FAILED_STATUSES:
+        await db_write(update_batch_status, batch_id, status)
+        n = await db_write(requeue_batch_items, batch_id)
+        stats["requeued"] += n
+        logger.warning("AI batch %s: %s — %s постів повернуто в чергу", batch_id, status, n)
+        return
+    if status != "completed":
+        if status != batch_row["status"]:
+            await db_write(update_batch_status, batch_id, status)
+        return
+
+    rows = {int(r["id"]): r for r in await db_read(list_batch_items, batch_id)}
+    failed: list[int] = []
+    if batch.output_file_id and rows:
+        content = await _batch_api(base_url, lambda client: client.files.content(batch.output_file_id))
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                out = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            item_id = _item_id_from_custom_id(out.get("custom_id"))
+            row = rows.pop(item_id, None) if item_id is not None else None
+            if row is None:
+                continue
+            response = out.get("response") or {}
+            body = response.get("body") or {}
+            if out.get("error") or int(response.get("status_code") or 0) != 200:
+                failed.append(item_id)
+                continue
+            try:
+                message = body["choices"][0]["message"]["content"] or ""
+            except (KeyError, IndexError, TypeError):
+                failed.append(item_id)
+                continue
+            screen = await screen_result_from_content(message, row)
+            if screen is None:
+                failed.append(item_id)
+                continue
+            await _finish_item(row, screen, notify_callback, stats)
+    # Рядки без відповіді (error_file / обрізаний output) — у наступну пачку.
+    failed.extend(rows)
+    if failed:
+        stats["requeued"] += await db_write(requeue_batch_items, batch_id, failed)
+    await db_write(
+        update_batch_status,
+        batch_id,
+        status,
+        output_file_id=batch.output_file_id,
+        error_file_id=getattr(batch, "error_file_id", None),
+    )
+    metrics.inc("ai_batch_collected")
+    logger.info("AI batch %s: отримано, %s повторно в черзі", batch_id, len(failed))
+
+
+async def _screen_overdue(notify_callback: NotifyCallback, stats: dict) -> None:
+    """Швидка смуга: пости, що чекають AI довше порогу — синхронний screen."""
+    cutoff = int(time.time()) - PARSER_AI_BATCH_FALLBACK_HOURS * 3600
+    for row in await db_read(list_overdue_screen_items, cutoff, PARSER_AI_BATCH_MAX_ITEMS):
+        screen = await ai_screen_parsed_listing(row)
+        await _finish_item(row, screen, notify_callback, stats)
+        stats["fallback"] += 1
+
+
+async def _submit_pending(base_url: Optional[str], notify_callback: NotifyCallback, stats: dict) -> None:
+    rows = await db_read(list_screen_pending, PARSER_AI_BATCH_MAX_ITEMS)
+    lines: list[str] = []
+    item_ids: list[int] = []
+    for row in rows:
+        # Поки пост чекав, таку саму відповідь міг закешувати інший пост.
+        cached = await cached_screen_result(row)
+        if cached is not None:
+            await _finish_item(row, cached, notify_callback, stats)
+            continue
+        context = await screen_context(row)
+        body = screen_request_body(_screen_candidate(row), context)
+        lines.append(
+            json.dumps(
+                {"custom_id": _custom_id(row["id"]), "method": "POST", "url": BATCH_ENDPOINT, "body": body},
+                ensure_ascii=False,
+            )
+        )
+        item_ids.append(int(row["id"]))
+    if not lines:
+        return
+
+    payload = ("\n".join(lines) + "\n").encode("utf-8")
+    file_obj = await _batch_api(
+        base_url,
+        lambda client: client.files.create(file=("screen_batch.jsonl", payload), purpose="batch"),
+    )
+    batch = await _batch_api(
+        base_url,
+        lambda client: client.batches.create(
+            input_file_id=file_obj.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"kind": "parser_ai_screen"},
+        ),
+    )
+    await db_write(record_submitted_batch, batch.id, str(batch.status), file_obj.id, item_ids)
+    stats["submitted"] += len(item_ids)
+    metrics.inc("ai_batch_submitted")
+    logger.info("AI batch %s: відправлено %s постів", batch.id, len(item_ids))
+
+
+async def run_screen_batch_cycle(
+    notify_callback: NotifyCallback,
+    *,
+    base_url: Optional[str] = None,
+) -> dict[str, int]:
+    """
+    Один прохід: забрати готові пачки, fallback для прострочених, відправити чергу.
+    base_url — інший OpenAI-сумісний ендпоінт (за замовчуванням PARSER_AI_BATCH_BASE_URL).
+    """
+    stats = {"accepted": 0, "rejected": 0, "requeued": 0, "fallback": 0, "submitted": 0}
+    if not is_ai_screen_enabled():
+        logger.warning("AI batch: AI screen вимкнено — черга чекає")
+        return stats
+    if not openai_available():
+        logger.warning("AI batch: openai не встановлено")
+        return stats
+    if base_url is None:
+        base_url = PARSER_AI_BATCH_BASE_URL or None
+
+    await db_write(ensure_ai_batches_table)
+    for batch_row in await db_read(list_open_batches):
+        try:
+            await _collect_batch(base_url, batch_row, notify_callback, stats)
+        except Exception as e:
+            logger.warning("AI batch %s: не вдалося отримати результат: %s", batch_row["batch_id"], e)
+
+    await _screen_overdue(notify_callback, stats)
+
+    try:
+        await _submit_pending(base_url, notify_callback, stats)
+    except Exception as e:
+        metrics.inc("ai_batch_errors")
+        logger.warning("AI batch: не вдалося відправити пачку: %s", e)
+    return stats
@@ -4,6 +4,9 @@
 """
 
 import re
+from functools import lru_cache
+
+from parser.core.keyword_matcher import KeywordMatcher
 
 # ──────────────────────────────────────────────
 # Словник категорій: category -> subcategory -> [keywords]
@@ -348,27 +351,40 @@ def detect_category(text: str, skip_free: bool = False) -> tuple[str, str | None
             return "services_work", "vacancies"
         return "services_work", "vacancies"
 
+    scores = _category_scores(lower)
     best_category = "other"
     best_subcategory = None
     best_score = 0
 
-    for category, subcategories in CATEGORY_KEYWORDS.items():
+    for category, subcategory in _category_matcher().groups:
         if category == "free_stuff" and skip_free:
             continue
-
-        for subcategory, keywords in subcategories.items():
-            score = 0
-            for kw in keywords:
-                if re.search(r"\b" + re.escape(kw) + r"\b", lower) or kw in lower:
-                    score += 1
-            if score > best_score:
-                best_score = score
-                best_category = category
-                best_subcategory = subcategory if subcategory and not subcategory.startswith("other_") else None
+        score = scores.get((category, subcategory), 0)
+        if score > best_score:
+            best_score = score
+            best_category = category
+            best_subcategory = subcategory if subcategory and not subcategory.startswith("other_") else None
 
     return best_category, best_subcategory
 
 
+@lru_cache(maxsize=1)
+def _category_matcher() -> KeywordMatcher:
+    # Як раніше «\bkw\b or kw in lower» — фактично substring, тож без меж слова.
+    return KeywordMatcher(
+        ((category, subcategory), kw, 1, False)
+        for category, subcategories in CATEGORY_KEYWORDS.items()
+        for subcategory, keywords in subcategories.items()
+        for kw in keywords
+    )
+
+
+@lru_cache(maxsize=256)
+def _category_scores(lower: str) -> dict:
+    """parse_channel викликає detect_category двічі на пост — другий раз з кешу."""
+    return _category_matcher().scores(lower)
+
+
 def get_category_label(category: str, subcategory: str | None = None) -> str:
     """Повертає читабельну назву категорії/підкатегорії."""
     labels = {
@@ -60,6 +60,9 @@ PARSER_CURSOR_OVERLAP: int = max(0, _env_int("PARSER_CURSOR_OVERLAP", 25))
 # Звичайний /parse і шедулер: завжди останні N постів (ignore cursor).
 # 0 = режим cursor+overlap (лише нові message_id після cursor).
 PARSER_ROLLING_LOOKBACK: int = max(0, _env_int("PARSER_ROLLING_LOOKBACK", 100))
+# Кеш резолву invite-посилань (peer id + access_hash на акаунт): без CheckChatInvite щоциклу.
+# 0 = вимкнено (резолв щоразу, як раніше).
+PARSER_CHAT_TARGET_TTL_HOURS: int = max(0, _env_int("PARSER_CHAT_TARGET_TTL_HOURS", 168))
 
 PARSER_DEDUP_ENABLED: bool = _env_bool("PARSER_DEDUP_ENABLED", False)
 PARSER_SERVICES_DEDUP_ENABLED: bool = _env_bool("PARSER_SERVICES_DEDUP_ENABLED", True)
@@ -79,6 +82,63 @@ PARSER_FUZZY_DEDUP_ENABLED: bool = _env_bool("PARSER_FUZZY_DEDUP", True)
 PARSER_FUZZY_DEDUP_SAME_CHANNEL: bool = _env_bool("PARSER_FUZZY_DEDUP_SAME_CHANNEL", True)
 PARSER_FUZZY_DEDUP_THRESHOLD: float = float(os.getenv("PARSER_FUZZY_DEDUP_THRESHOLD", "0.94"))
 PARSER_EMBEDDING_MODEL: str = (_env_str("PARSER_EMBEDDING_MODEL") or "text-embedding-3-small")
+# Стан parsed_items для сторінки історії одним запитом (0 — вимкнено, запит на кожен пост)
+PARSER_DEDUP_PREFETCH_PAGE: int = max(0, _env_int("PARSER_DEDUP_PREFETCH_PAGE", 100))
+# Скільки найновіших блокуючих embeddings тримати в in-memory індексі на партицію: канал
+# при PARSER_FUZZY_DEDUP_SAME_CHANNEL, інакше весь індекс (1536 float32 ≈ 6 KB на рядок)
+PARSER_FUZZY_INDEX_MAX_ROWS: int = max(1, _env_int("PARSER_FUZZY_INDEX_MAX_ROWS", 2500))
+# Формат parsed_items.text_embedding_blob: f16 (≈3 KB), f32 (≈6 KB), i8 (≈1.5 KB) або json (старий TEXT)
+PARSER_EMBEDDING_STORAGE: str = (_env_str("PARSER_EMBEDDING_STORAGE") or "f16").lower()
+if PARSER_EMBEDDING_STORAGE not in ("json", "f32", "f16", "i8"):
+    PARSER_EMBEDDING_STORAGE = "f16"
+# Батчинг embeddings: один запит на кілька постів (до N текстів або через N мс)
+PARSER_EMBEDDING_BATCH_SIZE: int = max(1, _env_int("PARSER_EMBEDDING_BATCH_SIZE", 64))
+PARSER_EMBEDDING_BATCH_WAIT_MS: int = max(0, _env_int("PARSER_EMBEDDING_BATCH_WAIT_MS", 50))
+# Порожньо — api.openai.com; інакше OpenAI-сумісний ендпоінт (локальний stub для перевірки)
+PARSER_EMBEDDING_BASE_URL: str = _env_str("PARSER_EMBEDDING_BASE_URL")
+PARSER_EMBEDDING_CACHE_DAYS: int = max(1, _env_int("PARSER_EMBEDDING_CACHE_DAYS", 30))
+
+# Спільний шлюз OpenAI (parser.ai.gateway): паралельні запити, RPM / TPM на модель, повтори 429/5xx
+PARSER_AI_MAX_CONCURRENCY: int = max(1, _env_int("PARSER_AI_MAX_CONCURRENCY", 8))
+PARSER_AI_MAX_RETRIES: int = max(0, _env_int("PARSER_AI_MAX_RETRIES", 4))
+PARSER_AI_RPM: int = max(1, _env_int("PARSER_AI_RPM", 500))
+PARSER_AI_TPM: int = max(1, _env_int("PARSER_AI_TPM", 200000))
+PARSER_AI_EMBEDDING_RPM: int = max(1, _env_int("PARSER_AI_EMBEDDING_RPM", 3000))
+PARSER_AI_EMBEDDING_TPM: int = max(1, _env_int("PARSER_AI_EMBEDDING_TPM", 1000000))
+# Точкові ліміти: "gpt-4o-mini=500/200000,text-embedding-3-small=3000/1000000"
+PARSER_AI_MODEL_LIMITS: str = _env_str("PARSER_AI_MODEL_LIMITS")
+
+# Кеш відповідей AI screen за fingerprint тексту (+ модель, версія промпту)
+PARSER_AI_SCREEN_CACHE_ENABLED: bool = _env_bool("PARSER_AI_SCREEN_CACHE", True)
+PARSER_AI_SCREEN_CACHE_TTL_HOURS: int = max(1, _env_int("PARSER_AI_SCREEN_CACHE_TTL_HOURS", 72))
+PARSER_AI_SCREEN_CACHE_MAX_ROWS: int = max(1, _env_int("PARSER_AI_SCREEN_CACHE_MAX_ROWS", 20000))
+# Вердикти AI з текстом поста — датасет для локального pre-screen (scripts/train_prescreen.py)
+PARSER_AI_SCREEN_LABELS: bool = _env_bool("PARSER_AI_SCREEN_LABELS", True)
+PARSER_AI_SCREEN_LABELS_MAX_ROWS: int = max(1, _env_int("PARSER_AI_SCREEN_LABELS_MAX_ROWS", 100000))
+# Локальний класифікатор перед AI screen: off — вимкнено, shadow — лише метрики, enforce — відсікати
+# впевнене сміття без виклику AI. Поріг підбирається при навчанні під PARSER_PRESCREEN_MIN_PRECISION.
+PARSER_PRESCREEN_MODE: str = (_env_str("PARSER_PRESCREEN_MODE") or "off").lower()
+if PARSER_PRESCREEN_MODE not in ("off", "shadow", "enforce"):
+    PARSER_PRESCREEN_MODE = "off"
+PARSER_PRESCREEN_MIN_PRECISION: float = float(os.getenv("PARSER_PRESCREEN_MIN_PRECISION", "0.98"))
+
+# Відкладений AI screen через OpenAI Batch API (~50% дешевше, результат до 24 год).
+# Плановий парсинг кладе пости в чергу, окремий job відправляє й забирає пачки.
+PARSER_AI_BATCH_ENABLED: bool = _env_bool("PARSER_AI_BATCH_ENABLED", False)
+PARSER_AI_BATCH_INTERVAL_MIN: int = max(1, _env_int("PARSER_AI_BATCH_INTERVAL_MIN", 10))
+PARSER_AI_BATCH_MAX_ITEMS: int = max(1, _env_int("PARSER_AI_BATCH_MAX_ITEMS", 500))
+# Пости, що чекають AI довше — перевіряються синхронно (швидка смуга)
+PARSER_AI_BATCH_FALLBACK_HOURS: int = max(1, _env_int("PARSER_AI_BATCH_FALLBACK_HOURS", 6))
+# Порожньо — api.openai.com; інакше OpenAI-сумісний ендпоінт (scripts/fake_openai_batch.py)
+PARSER_AI_BATCH_BASE_URL: str = _env_str("PARSER_AI_BATCH_BASE_URL")
+
+# Метрики етапів циклу: *.json — JSON, інакше Prometheus text (textfile collector); 0/off — не писати.
+_metrics_file = _env_str("PARSER_METRICS_FILE", "logs/parser_metrics.prom")
+PARSER_METRICS_FILE: Path | None = (
+    None
+    if _metrics_file.lower() in ("0", "off", "false", "no")
+    else (Path(_metrics_file) if Path(_metrics_file).is_absolute() else _BOT_ROOT / _metrics_file)
+)
 
 # ── Групи модерації парсера (3 потоки) ─────────
 # 1) Послуги → канал Hamburg + маркетплейс
@@ -106,15 +166,53 @@ PARSER_INTERVAL_MIN: float = float(os.getenv("PARSER_INTERVAL_MIN", "30"))
 PARSER_SERVICES_AI_INTERVAL_MIN: float = float(
     os.getenv("PARSER_SERVICES_AI_INTERVAL_MIN", os.getenv("PARSER_INTERVAL_MIN", "30"))
 )
+# Адаптивне опитування: плановий job «тікає» раз на TICK хв і бере лише канали, чий час настав.
+# Інтервал каналу = TARGET_POSTS / швидкість постингу (приріст message_id), у межах MIN…MAX хв;
+# fetch limit лишається повним (lookback / cursor). 0 = усі канали кожні PARSER_INTERVAL_MIN.
+PARSER_ADAPTIVE_POLLING: bool = _env_bool("PARSER_ADAPTIVE_POLLING", True)
+PARSER_ADAPTIVE_TICK_MIN: int = max(1, _env_int("PARSER_ADAPTIVE_TICK_MIN", 10))
+PARSER_ADAPTIVE_MIN_INTERVAL_MIN: int = max(1, _env_int("PARSER_ADAPTIVE_MIN_INTERVAL_MIN", 10))
+PARSER_ADAPTIVE_MAX_INTERVAL_MIN: int = max(
+    PARSER_ADAPTIVE_MIN_INTERVAL_MIN,
+    _env_int("PARSER_ADAPTIVE_MAX_INTERVAL_MIN", 360),
+)
+PARSER_ADAPTIVE_TARGET_POSTS: int = max(1, _env_int("PARSER_ADAPTIVE_TARGET_POSTS", 15))
+# Скільки Pyrogram-акаунтів парсять свої канали одночасно (1 = послідовно, як раніше)
+PARSER_ACCOUNT_CONCURRENCY: int = max(1, _env_int("PARSER_ACCOUNT_CONCURRENCY", 3))
+
+# Конвеєр parse_channel: скільки постів одночасно проходять AI / фото,
+# скільки максимум у роботі до впорядкованого insert, пауза між сповіщеннями в один чат.
+PARSER_PIPELINE_WORKERS: int = max(1, _env_int("PARSER_PIPELINE_WORKERS", 4))
+PARSER_PIPELINE_WINDOW: int = max(
+    PARSER_PIPELINE_WORKERS,
+    _env_int("PARSER_PIPELINE_WINDOW", PARSER_PIPELINE_WORKERS * 2),
+)
+PARSER_NOTIFY_INTERVAL_SEC: float = max(0.0, float(os.getenv("PARSER_NOTIFY_INTERVAL_SEC", "3")))
+# Insert у parsed_items пачками: готові підряд пости до N, очікування наступного ≤ WAIT_MS.
+PARSER_INSERT_BATCH_SIZE: int = max(1, _env_int("PARSER_INSERT_BATCH_SIZE", 32))
+PARSER_INSERT_BATCH_WAIT_MS: int = max(0, _env_int("PARSER_INSERT_BATCH_WAIT_MS", 250))
+
+# Пул SQLite парсера: read-only WAL-читачі + один writer, що комітить пачки записів однією транзакцією.
+# PARSER_DB_POOL=0 — db_read/db_write викликають функції напряму (старий шлях через _DB_LOCK).
+PARSER_DB_POOL_ENABLED: bool = _env_bool("PARSER_DB_POOL", True)
+PARSER_DB_READERS: int = max(1, _env_int("PARSER_DB_READERS", 4))
+PARSER_DB_WRITE_BATCH: int = max(1, _env_int("PARSER_DB_WRITE_BATCH", 64))
 
 # Максимум фото на одне parsed_items (жорстко не більше 3)
 PARSER_MAX_PHOTOS: int = min(3, max(1, _env_int("PARSER_MAX_PHOTOS", 3)))
+# Завантаження фото: паралельних файлів на один Pyrogram-клієнт; спільні для всіх акаунтів
+# ліміти — старти завантажень/с і KB/s (0 — без ліміту); повтори на файл (FloodWait теж).
+PARSER_PHOTO_CONCURRENCY: int = max(1, _env_int("PARSER_PHOTO_CONCURRENCY", 3))
+PARSER_PHOTO_RPS: float = max(0.0, float(os.getenv("PARSER_PHOTO_RPS", "5")))
+PARSER_PHOTO_BANDWIDTH_KBPS: int = max(0, _env_int("PARSER_PHOTO_BANDWIDTH_KBPS", 0))
+PARSER_PHOTO_RETRIES: int = max(0, _env_int("PARSER_PHOTO_RETRIES", 2))
 
 # Автоочистка parsed_photos (після циклу парсингу + cron/APScheduler)
 PARSER_PHOTOS_AUTO_CLEANUP: bool = _env_bool("PARSER_PHOTOS_AUTO_CLEANUP", True)
 PARSER_PHOTOS_CLEANUP_DAYS: int = max(1, _env_int("PARSER_PHOTOS_CLEANUP_DAYS", 7))
 PARSER_PHOTOS_PUBLIC_ORPHAN_DAYS: int = max(0, _env_int("PARSER_PHOTOS_PUBLIC_ORPHAN_DAYS", 7))
-# public/listings/originals — важкий прохід на малому VPS; за замовчуванням вимкнено в авто-режимі
+# public/listings/originals (копії парсера parser_* / pi*) — теж через маніфест з refcount;
+# за замовчуванням вимкнено в авто-режимі
 PARSER_PHOTOS_CLEANUP_PUBLIC: bool = _env_bool("PARSER_PHOTOS_CLEANUP_PUBLIC", False)
 
 # Автопідтвердження релевантних оголошень (маркетплейс; послуги — також у Telegram-канал)
@@ -133,3 +231,10 @@ PARSER_AUTO_APPROVE_SERVICES_CHANNEL: bool = _env_bool(
 REPO_ROOT = Path(__file__).resolve().parent.parent.parent.parent
 PHOTOS_DIR = REPO_ROOT / "database" / "parsed_photos"
 PHOTOS_DIR.mkdir(parents=True, exist_ok=True)
+# Модель pre-screen (scripts/train_prescreen.py); відносний шлях — від bot/
+_prescreen_model = _env_str("PARSER_PRESCREEN_MODEL_PATH")
+PARSER_PRESCREEN_MODEL_PATH: Path = (
+    REPO_ROOT / "database" / "parser_prescreen.npz"
+    if not _prescreen_model
+    else (Path(_prescreen_model) if Path(_prescreen_model).is_absolute() else _BOT_ROOT / _prescreen_model)
+)
@@ -5,15 +5,31 @@ from __future__ import annotations
 import asyncio
 import logging
 from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from typing import Any
 
 from parser.config.settings import FETCH_LIMIT, PARSER_CURSOR_OVERLAP
+from parser.core.poll_schedule import record_channel_poll
 from parser.core.pyrogram_photo_patch import apply_pyrogram_photo_size_patch
+from parser.core.telegram_meta import (
+    invalidate_chat_target,
+    is_stale_chat_target_error,
+    resolve_pyrogram_chat_target,
+)
 from parser.storage.channel_cursors import get_channel_cursor, set_channel_cursor
+from parser.storage.db_pool import db_write
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class HistoryPass:
+    """Підсумок читання історії; cursor зсуває advance_channel_cursor після обробки постів."""
+
+    head_id: int | None = None
+    finished_ok: bool = False
+
+
 async def iter_new_channel_messages(
     app: Any,
     chat_target: Any,
@@ -22,6 +38,7 @@ async def iter_new_channel_messages(
     parser_type: str = "default",
     fetch_limit: int | None = None,
     ignore_cursor: bool = False,
+    history: HistoryPass | None = None,
 ) -> AsyncIterator[Any]:
     """
     Повертає повідомлення для парсингу.
@@ -29,6 +46,7 @@ async def iter_new_channel_messages(
     fetch_limit — скільки останніх постів максимум читати з каналу.
     ignore_cursor=1 — завжди останні fetch_limit постів (без «cursor»), для catch-up.
     Інакше — новіші за cursor, плюс overlap (перечитати останні N на випадок збоїв).
+    history — сюди пишеться head проходу; cursor тут не оновлюється.
     """
     apply_pyrogram_photo_size_patch()
     if chat_target is None:
@@ -50,9 +68,9 @@ async def iter_new_channel_messages(
     else:
         last_cursor = max(0, stored_cursor - overlap)
 
-    head_id: int | None = None
+    if history is None:
+        history = HistoryPass()
     new_count = 0
-    finished_ok = False
 
     if ignore_cursor:
         logger.info(
@@ -77,27 +95,48 @@ async def iter_new_channel_messages(
             limit,
         )
 
-    try:
-        async for msg in app.get_chat_history(chat_target, limit=limit):
-            msg_id = int(getattr(msg, "id", 0) or 0)
-            if not msg_id:
-                continue
-            if head_id is None:
-                head_id = msg_id
-            if last_cursor and msg_id <= last_cursor:
-                break
-            new_count += 1
-            yield msg
-        finished_ok = True
-    finally:
-        # Cursor оновлюємо лише після успішного проходу історії.
-        # Інакше збій на фото стрибав cursor уперед і /parse більше нічого не бачив.
-        if finished_ok and head_id is not None:
-            await asyncio.to_thread(
-                set_channel_cursor, source_channel, parser_type, head_id
-            )
+    for attempt in range(2):
+        try:
+            async for msg in app.get_chat_history(chat_target, limit=limit):
+                msg_id = int(getattr(msg, "id", 0) or 0)
+                if not msg_id:
+                    continue
+                if history.head_id is None:
+                    history.head_id = msg_id
+                if last_cursor and msg_id <= last_cursor:
+                    break
+                new_count += 1
+                yield msg
+            history.finished_ok = True
+            break
+        except Exception as e:
+            if not is_stale_chat_target_error(e):
+                raise
+            await invalidate_chat_target(app, source_channel)
+            # Закешований id застарів — один повторний резолв, поки нічого не віддано.
+            if attempt or history.head_id is not None or not isinstance(chat_target, int):
+                raise
+            logger.info("  %s: %s — повторний резолв", source_channel, e)
+            chat_target = await resolve_pyrogram_chat_target(app, source_channel)
 
     if ignore_cursor or stored_cursor:
         logger.info("  %s: повідомлень для перевірки: %s", source_channel, new_count)
     elif new_count == 0:
         logger.info("  %s: канал порожній або недоступний", source_channel)
+
+
+async def advance_channel_cursor(source_channel: str, parser_type: str, history: HistoryPass) -> None:
+    """
+    Cursor оновлюємо лише після успішного проходу історії і commit усіх його постів.
+    Інакше збій на фото / insert стрибав cursor уперед і /parse більше цих постів не бачив.
+    """
+    if not history.finished_ok or history.head_id is None:
+        return
+    await db_write(_save_history_pass, source_channel, parser_type, history.head_id)
+
+
+def _save_history_pass(source_channel: str, parser_type: str, head_id: int) -> None:
+    """Writer пулу: розклад опитування і cursor однією транзакцією."""
+    # Швидкість постингу міряється від попереднього head — до оновлення cursor.
+    record_channel_poll(source_channel, parser_type, head_id)
+    set_channel_cursor(source_channel, parser_type, head_id)
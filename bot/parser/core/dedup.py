@@ -2,34 +2,39 @@
 
 from __future__ import annotations
 
-import json
 import logging
-import math
 import os
 from contextlib import contextmanager
-from typing import Optional
+from typing import Optional, Sequence
+
+import numpy as np
 
 from parser.config.channels import PARSER_TYPE_SERVICES_CHANNEL
 from parser.config.settings import (
-    PARSER_DEDUP_DAYS,
-    PARSER_EMBEDDING_MODEL,
     PARSER_FUZZY_DEDUP_ENABLED,
     PARSER_FUZZY_DEDUP_SAME_CHANNEL,
     PARSER_FUZZY_DEDUP_THRESHOLD,
     PARSER_DEDUP_ENABLED,
     PARSER_SERVICES_DEDUP_ENABLED,
 )
+from parser.core.embedding_index import _Partition, normalize_vector
+from parser.storage.db_pool import db_read, db_write
+from parser.storage.embeddings import EmbeddingPayload, decode_embedding, encode_embedding
 from parser.storage.parsed_items import (
     clear_repostable_parsed_item,
-    parsed_item_claimed_by_other_parser,
-    parsed_item_exists,
+    filter_blocking_parsed_items,
     parsed_item_is_semantic_duplicate,
+    parsed_item_may_be_repostable,
+    parsed_item_message_state,
 )
 
 logger = logging.getLogger(__name__)
 
 OPENAI_API_KEY = (os.getenv("OPENAI_API_KEY") or "").strip()
 
+# Збіги над порогом, що перевіряються в БД за раз (неактуальні прибираються з індексу).
+_FUZZY_HIT_CANDIDATES = 5
+
 
 def is_fuzzy_dedup_enabled() -> bool:
     if not PARSER_FUZZY_DEDUP_ENABLED:
@@ -39,17 +44,6 @@ def is_fuzzy_dedup_enabled() -> bool:
     return True
 
 
-def _cosine_similarity(a: list[float], b: list[float]) -> float:
-    if not a or not b or len(a) != len(b):
-        return 0.0
-    dot = sum(x * y for x, y in zip(a, b))
-    na = math.sqrt(sum(x * x for x in a))
-    nb = math.sqrt(sum(y * y for y in b))
-    if na == 0 or nb == 0:
-        return 0.0
-    return dot / (na * nb)
-
-
 def _embedding_input(title: str, description: str) -> str:
     title = (title or "").strip()
     description = (description or "").strip()
@@ -57,32 +51,22 @@ def _embedding_input(title: str, description: str) -> str:
     return blob[:6000]
 
 
-def compute_listing_embedding(title: str, description: str) -> Optional[list[float]]:
-    """Один запит embedding; викликати лише для кандидатів після exact-dedup."""
+async def compute_listing_embedding(title: str, description: str) -> Optional[np.ndarray]:
+    """Embedding через спільний батч-сервіс; викликати лише для кандидатів після exact-dedup."""
     if not is_fuzzy_dedup_enabled():
         return None
     text = _embedding_input(title, description)
     if len(text) < 20:
         return None
-    try:
-        from openai import OpenAI
+    from parser.ai.embeddings import get_embedding_service
 
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.embeddings.create(
-            model=PARSER_EMBEDDING_MODEL,
-            input=text,
-        )
-        vec = response.data[0].embedding
-        return [float(x) for x in vec]
-    except Exception as e:
-        logger.warning("Fuzzy dedup embedding failed: %s", e)
-        return None
+    return await get_embedding_service().embed(text)
 
 
-def is_fuzzy_semantic_duplicate(
+async def is_fuzzy_semantic_duplicate(
     title: str,
     description: str,
-    embedding: Optional[list[float]] = None,
+    embedding: Optional[Sequence[float] | np.ndarray] = None,
     *,
     source_channel: str | None = None,
 ) -> bool:
@@ -90,47 +74,34 @@ def is_fuzzy_semantic_duplicate(
     if not is_fuzzy_dedup_enabled():
         return False
 
-    vec = embedding or compute_listing_embedding(title, description)
-    if not vec:
+    vec = embedding if embedding is not None else await compute_listing_embedding(title, description)
+    if vec is None or not len(vec):
         return False
 
-    from parser.storage.parsed_items import get_recent_parsed_embeddings
+    from parser.core.embedding_index import get_embedding_index
 
+    index = get_embedding_index()
     channel_filter = source_channel if PARSER_FUZZY_DEDUP_SAME_CHANNEL else None
-    for row in get_recent_parsed_embeddings(PARSER_DEDUP_DAYS, source_channel=channel_filter):
-        stored = row.get("embedding")
-        if not stored:
+    top = await index.top_k(vec, source_channel=channel_filter, k=_FUZZY_HIT_CANDIDATES)
+    hits = [(item_id, score) for item_id, score in top if score >= PARSER_FUZZY_DEDUP_THRESHOLD]
+    if not hits:
+        return False
+    # Індекс живе до кінця циклу — запис міг уже перестати блокувати (відхилено / вийшов з вікна).
+    alive = await db_read(filter_blocking_parsed_items, [item_id for item_id, _ in hits])
+    for item_id, score in hits:
+        if item_id not in alive:
+            index.discard(item_id)
             continue
-        score = _cosine_similarity(vec, stored)
-        if score >= PARSER_FUZZY_DEDUP_THRESHOLD:
-            logger.info(
-                "Fuzzy dedup hit: score=%.3f item_id=%s title=%r",
-                score,
-                row.get("id"),
-                (title or "")[:60],
-            )
-            return True
+        logger.info(
+            "Fuzzy dedup hit: score=%.3f item_id=%s title=%r",
+            score,
+            item_id,
+            (title or "")[:60],
+        )
+        return True
     return False
 
 
-def embedding_to_json(vec: Optional[list[float]]) -> Optional[str]:
-    if not vec:
-        return None
-    return json.dumps(vec, separators=(",", ":"))
-
-
-def embedding_from_json(raw: Optional[str]) -> Optional[list[float]]:
-    if not raw:
-        return None
-    try:
-        data = json.loads(raw)
-        if isinstance(data, list) and data:
-            return [float(x) for x in data]
-    except Exception:
-        return None
-    return None
-
-
 _dedup_override: bool | None = None
 
 
@@ -154,7 +125,7 @@ def _text_dedup_enabled(parser_type: str) -> bool:
     return PARSER_DEDUP_ENABLED
 
 
-def check_parser_duplicates(
+async def check_parser_duplicates(
     *,
     source_channel: str,
     message_id: int,
@@ -163,20 +134,23 @@ def check_parser_duplicates(
     title: str,
     description: str,
     parser_type: str = "default",
-) -> tuple[bool, str, Optional[str]]:
+) -> tuple[bool, str, Optional[EmbeddingPayload]]:
     """
-    Повертає (is_duplicate, reason, embedding_json_for_insert).
+    Повертає (is_duplicate, reason, embedding_for_insert) — BLOB або JSON за PARSER_EMBEDDING_STORAGE.
     reason — ключ для stats['reasons'].
 
     Завжди: той самий message_id у цьому парсері / активний запис іншого парсера.
     Опційно (PARSER_*_DEDUP_ENABLED): dedup_key (title+desc+price), fuzzy AI.
     """
-    clear_repostable_parsed_item(source_channel, message_id)
+    # Стан з prefetch-кешу: у writer ідемо лише коли є що видаляти.
+    if parsed_item_may_be_repostable(source_channel, message_id):
+        await db_write(clear_repostable_parsed_item, source_channel, message_id)
 
-    if parsed_item_exists(source_channel, message_id, parser_type):
+    exists, claimed = await db_read(parsed_item_message_state, source_channel, message_id, parser_type)
+    if exists:
         return True, "дублікат (бд)", None
 
-    if parsed_item_claimed_by_other_parser(source_channel, message_id, parser_type):
+    if claimed:
         return True, "вже в іншому парсері", None
 
     if not _text_dedup_enabled(parser_type):
@@ -185,23 +159,66 @@ def check_parser_duplicates(
     scope = parser_type if parser_type == PARSER_TYPE_SERVICES_CHANNEL else None
 
     # Лише dedup_key (title+desc+price), без content_hash — менше хибних «дублікат (текст)».
-    if parsed_item_is_semantic_duplicate(
+    if await db_read(
+        parsed_item_is_semantic_duplicate,
         dedup_key,
         parser_type=scope,
         source_channel=source_channel,
     ):
         return True, "дублікат (оголошення)", None
 
-    embedding_json: Optional[str] = None
+    embedding_payload: Optional[EmbeddingPayload] = None
     if is_fuzzy_dedup_enabled():
-        vec = compute_listing_embedding(title, description)
-        if vec and is_fuzzy_semantic_duplicate(
+        vec = await compute_listing_embedding(title, description)
+        if vec is not None and await is_fuzzy_semantic_duplicate(
             title,
             description,
             vec,
             source_channel=source_channel,
         ):
             return True, "дублікат (схожий текст)", None
-        embedding_json = embedding_to_json(vec)
+        embedding_payload = encode_embedding(vec)
+
+    return False, "", embedding_payload
 
-    return False, "", embedding_json
+
+class RunDedup:
+    """
+    Text/fuzzy dedup між постами одного проходу каналу — на етапі commit.
+
+    check_parser_duplicates іде в prepare паралельно для всього вікна, а insert — пізніше,
+    тож два репости в одному вікні обидва проходять перевірку в БД. Тут рядок звіряється
+    з уже закоміченими в цьому проході й з попередніми рядками своєї пачки.
+    """
+
+    def __init__(self) -> None:
+        self._keys: set[tuple[Optional[str], str]] = set()
+        self._vectors: Optional[_Partition] = None
+
+    def duplicate_reason(self, row: dict) -> Optional[str]:
+        """Ключ для stats['reasons'], якщо рядок дублює раніший у проході; інакше запам'ятовує його."""
+        parser_type = row.get("parser_type") or "default"
+        if not _text_dedup_enabled(parser_type):
+            return None
+        scope = parser_type if parser_type == PARSER_TYPE_SERVICES_CHANNEL else None
+        key = (scope, row["dedup_key"]) if row.get("dedup_key") else None
+        if key is not None and key in self._keys:
+            return "дублікат (оголошення)"
+
+        vec = decode_embedding(row.get("text_embedding"))
+        unit = normalize_vector(vec) if vec is not None else None
+        if unit is not None and self._vectors is not None:
+            if unit.size != self._vectors.matrix.shape[1]:
+                unit = None
+            elif self._vectors.size:
+                _, matrix = self._vectors.view()
+                if float(np.max(matrix @ unit)) >= PARSER_FUZZY_DEDUP_THRESHOLD:
+                    return "дублікат (схожий текст)"
+
+        if key is not None:
+            self._keys.add(key)
+        if unit is not None:
+            if self._vectors is None:
+                self._vectors = _Partition(int(unit.size))
+            self._vectors.append(self._vectors.size, unit)
+        return None
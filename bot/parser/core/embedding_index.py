@@ -0,0 +1,260 @@
+"""
+In-memory індекс embeddings для fuzzy-дедупу.
+
+Нормалізована float32-матриця (по партиції на source_channel) завантажується
+з parsed_items раз на цикл (читач пулу + потік, не event loop) і доповнюється після
+insert (add_to_embedding_index). Усі зміни й пошук — з event loop: writer пулу індекс
+не чіпає. Пошук — одне множення матриця × вектор замість циклу по рядках.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+from parser.config.settings import (
+    PARSER_DEDUP_DAYS,
+    PARSER_FUZZY_DEDUP_SAME_CHANNEL,
+    PARSER_FUZZY_INDEX_MAX_ROWS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Підстраховка для ручних запусків поза шедулером (там індекс скидається на старті циклу).
+_MAX_AGE_SEC = 15 * 60
+
+
+def normalize_vector(vec: Sequence[float] | np.ndarray) -> Optional[np.ndarray]:
+    arr = np.asarray(vec, dtype=np.float32).reshape(-1)
+    if arr.size == 0:
+        return None
+    norm = float(np.linalg.norm(arr))
+    if not norm or not np.isfinite(norm):
+        return None
+    return arr / norm
+
+
+class _Partition:
+    """Непереривний буфер рядків з подвоєнням ємності (amortized O(1) append)."""
+
+    __slots__ = ("ids", "matrix", "size")
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.size = 0
+
+    def append(self, item_id: int, unit_vec: np.ndarray) -> None:
+        if self.size == len(self.ids):
+            capacity = max(64, len(self.ids) * 2)
+            ids = np.zeros(capacity, dtype=np.int64)
+            ids[: self.size] = self.ids[: self.size]
+            matrix = np.zeros((capacity, self.matrix.shape[1]), dtype=np.float32)
+            matrix[: self.size] = self.matrix[: self.size]
+            self.ids, self.matrix = ids, matrix
+        self.ids[self.size] = item_id
+        self.matrix[self.size] = unit_vec
+        self.size += 1
+
+    def view(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.ids[: self.size], self.matrix[: self.size]
+
+    def remove(self, item_id: int) -> bool:
+        """Останній рядок переноситься на місце видаленого (порядок неважливий для top-k)."""
+        hits = np.flatnonzero(self.ids[: self.size] == item_id)
+        if not hits.size:
+            return False
+        i, last = int(hits[0]), self.size - 1
+        self.ids[i] = self.ids[last]
+        self.matrix[i] = self.matrix[last]
+        self.size = last
+        return True
+
+
+def _build_partitions(rows: list[dict]) -> tuple[int | None, dict[str, _Partition], set[int]]:
+    """Партиції з рядків БД — у потоці, щоб не тримати event loop."""
+    dim: int | None = None
+    partitions: dict[str, _Partition] = {}
+    known: set[int] = set()
+    for row in rows:
+        item_id = int(row["id"])
+        unit = normalize_vector(row["embedding"])
+        if item_id in known or unit is None:
+            continue
+        if dim is None:
+            dim = int(unit.size)
+        elif unit.size != dim:
+            continue
+        channel = str(row.get("source_channel") or "")
+        part = partitions.get(channel)
+        if part is None:
+            part = partitions[channel] = _Partition(dim)
+        part.append(item_id, unit)
+        known.add(item_id)
+    return dim, partitions, known
+
+
+class EmbeddingIndex:
+    """Top-k косинусної схожості серед записів, що ще блокують дедуп."""
+
+    def __init__(
+        self,
+        max_rows: int = PARSER_FUZZY_INDEX_MAX_ROWS,
+        *,
+        per_channel: bool = PARSER_FUZZY_DEDUP_SAME_CHANNEL,
+    ):
+        # Ліміт на партицію (per_channel) або на весь індекс — тихі канали не витісняються активними.
+        self.max_rows = max(1, int(max_rows))
+        self.per_channel = per_channel
+        self.dim: int | None = None
+        self._partitions: dict[str, _Partition] = {}
+        self._known_ids: set[int] = set()
+        self._all: tuple[np.ndarray, np.ndarray] | None = None
+        self._loaded_at: float | None = None
+        self._load_lock: tuple[asyncio.AbstractEventLoop, asyncio.Lock] | None = None
+        # Вставки, що прийшли під час завантаження, — застосовуються після нього.
+        self._pending_adds: list[tuple[int, str, np.ndarray]] | None = None
+
+    def __len__(self) -> int:
+        return len(self._known_ids)
+
+    def reset(self) -> None:
+        """Наступний запит перечитає індекс з БД (старт циклу парсингу)."""
+        self.dim = None
+        self._partitions.clear()
+        self._known_ids.clear()
+        self._all = None
+        self._loaded_at = None
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < _MAX_AGE_SEC
+
+    async def ensure_loaded(self) -> None:
+        if self._is_fresh():
+            return
+        loop = asyncio.get_running_loop()
+        if self._load_lock is None or self._load_lock[0] is not loop:
+            self._load_lock = (loop, asyncio.Lock())
+        async with self._load_lock[1]:
+            if self._is_fresh():
+                return
+            from parser.storage.db_pool import db_read
+            from parser.storage.parsed_items import get_recent_parsed_embeddings
+
+            started = time.monotonic()
+            self._pending_adds = []
+            try:
+                rows = await db_read(
+                    get_recent_parsed_embeddings,
+                    PARSER_DEDUP_DAYS,
+                    limit=self.max_rows,
+                    per_channel=self.per_channel,
+                )
+                dim, partitions, known = await asyncio.to_thread(_build_partitions, rows)
+            except BaseException:
+                self._pending_adds = None
+                raise
+            self.reset()
+            self.dim, self._partitions, self._known_ids = dim, partitions, known
+            self._loaded_at = time.monotonic()
+            pending, self._pending_adds = self._pending_adds, None
+            for item_id, source_channel, vec in pending:
+                self._add(item_id, source_channel, vec)
+            logger.info(
+                "Embedding index: %s рядків, %s каналів за %.2fs",
+                len(self),
+                len(self._partitions),
+                self._loaded_at - started,
+            )
+
+    def add(self, item_id: int, source_channel: str, vec: Sequence[float] | np.ndarray) -> None:
+        """Інкрементально після COMMIT insert (до перезавантаження індекс лишається актуальним)."""
+        if self._pending_adds is not None:
+            self._pending_adds.append((int(item_id), source_channel or "", vec))
+            return
+        if self._loaded_at is None:
+            return
+        self._add(int(item_id), source_channel or "", vec)
+
+    def discard(self, item_id: int) -> None:
+        """Запис більше не блокує дедуп (відхилено / вийшов з вікна) — прибрати до перезавантаження."""
+        item_id = int(item_id)
+        if item_id not in self._known_ids:
+            return
+        self._known_ids.discard(item_id)
+        for part in self._partitions.values():
+            if part.remove(item_id):
+                break
+        self._all = None
+
+    def _add(self, item_id: int, source_channel: str, vec) -> None:
+        if item_id in self._known_ids:
+            return
+        unit = normalize_vector(vec)
+        if unit is None:
+            return
+        if self.dim is None:
+            self.dim = int(unit.size)
+        elif unit.size != self.dim:
+            # Інша модель embeddings — не змішуємо простори.
+            return
+        part = self._partitions.get(source_channel)
+        if part is None:
+            part = self._partitions[source_channel] = _Partition(self.dim)
+        part.append(item_id, unit)
+        self._known_ids.add(item_id)
+        self._all = None
+
+    def _matrix_for(self, source_channel: str | None) -> tuple[np.ndarray, np.ndarray] | None:
+        if source_channel is not None:
+            part = self._partitions.get(source_channel)
+            return part.view() if part and part.size else None
+        if self._all is None:
+            views = [p.view() for p in self._partitions.values() if p.size]
+            if not views:
+                return None
+            self._all = (
+                np.concatenate([ids for ids, _ in views]),
+                np.concatenate([m for _, m in views]),
+            )
+        return self._all
+
+    async def top_k(
+        self,
+        vec: Sequence[float] | np.ndarray,
+        *,
+        source_channel: str | None = None,
+        k: int = 1,
+    ) -> list[tuple[int, float]]:
+        """[(item_id, cosine)] від найбільш схожого; source_channel=None — усі канали."""
+        await self.ensure_loaded()
+        unit = normalize_vector(vec)
+        if unit is None or self.dim is None or unit.size != self.dim:
+            return []
+        data = self._matrix_for(source_channel)
+        if data is None:
+            return []
+        ids, matrix = data
+        scores = matrix @ unit
+        k = max(1, min(int(k), scores.size))
+        if k < scores.size:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(scores.size)
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+_index = EmbeddingIndex()
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    return _index
+
+
+def reset_embedding_index() -> None:
+    _index.reset()
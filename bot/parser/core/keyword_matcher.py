@@ -0,0 +1,115 @@
+"""
+Aho–Corasick для ключових слів категорій: усі словники — за один прохід тексту.
+
+Автомат будується один раз на словник; scores() повертає суму ваг збігів по групах
+(підкатегоріях). Кожен запис словника рахується не більше одного разу, як у старих
+циклах «for kw in keywords».
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Hashable, Iterable
+
+# Символи «всередині слова» для лівої межі — як [a-zа-яёіїєґ0-9] з re.IGNORECASE
+# (разом з юнікод-варіантами, які IGNORECASE теж зводить до цих літер).
+_WORD_CHARS = frozenset(
+    "abcdefghijklmnopqrstuvwxyz0123456789абвгдежзийклмнопрстуфхцчшщъыьэюяёіїєґ"
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZАБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯЁІЇЄҐ"
+    "\u0130\u0131\u017f\u1c80\u1c81\u1c82\u1c83\u1c84\u1c85\u1c86\u212a"
+)
+
+
+class KeywordMatcher:
+    """
+    entries: (group, keyword, weight, left_boundary).
+    left_boundary=True — збіг не може починатися всередині слова (шин⊄машин);
+    інакше — звичайний substring.
+    """
+
+    __slots__ = ("_goto", "_fail", "_out", "_lengths", "_entries", "_groups")
+
+    def __init__(self, entries: Iterable[tuple[Hashable, str, int, bool]]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[list[int]] = [[]]
+        self._lengths: list[int] = []
+        # pattern id → [(group, weight, left_boundary), ...] (дублікати ключів зберігаються)
+        self._entries: list[list[tuple[Hashable, int, bool]]] = []
+        self._groups: list[Hashable] = []
+        pattern_ids: dict[str, int] = {}
+        seen_groups: set = set()
+
+        for group, keyword, weight, left_boundary in entries:
+            if group not in seen_groups:
+                seen_groups.add(group)
+                self._groups.append(group)
+            if not keyword:
+                continue
+            pid = pattern_ids.get(keyword)
+            if pid is None:
+                pid = pattern_ids[keyword] = len(self._lengths)
+                self._lengths.append(len(keyword))
+                self._entries.append([])
+                self._insert(keyword, pid)
+            self._entries[pid].append((group, int(weight), bool(left_boundary)))
+        self._fail = self._build_fail_links()
+
+    def _insert(self, keyword: str, pid: int) -> None:
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._out.append([])
+            state = nxt
+        self._out[state].append(pid)
+
+    def _build_fail_links(self) -> list[int]:
+        fail = [0] * len(self._goto)
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in self._goto[f]:
+                    f = fail[f]
+                fail[nxt] = self._goto[f].get(ch, 0)
+                # Виходи суфіксних станів — одразу в списку стану (без обходу fail під час scan).
+                self._out[nxt].extend(self._out[fail[nxt]])
+        return fail
+
+    @property
+    def groups(self) -> list[Hashable]:
+        """Групи в порядку словника (для детермінованого вибору при рівних балах)."""
+        return list(self._groups)
+
+    def scores(self, text: str) -> dict[Hashable, int]:
+        """{group: сума ваг} лише для груп зі збігами; text очікується вже в lower()."""
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        plain_hit: set[int] = set()
+        bounded_hit: set[int] = set()
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not state:
+                continue
+            for pid in out[state]:
+                plain_hit.add(pid)
+                if pid in bounded_hit:
+                    continue
+                start = i - lengths[pid] + 1
+                if start == 0 or text[start - 1] not in _WORD_CHARS:
+                    bounded_hit.add(pid)
+
+        result: dict[Hashable, int] = {}
+        for pid in plain_hit:
+            for group, weight, left_boundary in self._entries[pid]:
+                if left_boundary and pid not in bounded_hit:
+                    continue
+                result[group] = result.get(group, 0) + weight
+        return result
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 
 from utils.location_normalization import CITY_SYNONYMS, normalize_city_name
 
@@ -104,36 +105,85 @@ def channel_city_from_source(
     return "Germany"
 
 
-def detect_cities_in_text(text: str) -> list[str]:
-    """Канонічні міста з тексту (укр/рос/нім + відмінки: в Гамбурге)."""
-    if not text:
-        return []
+class _CityIndex:
+    """
+    Trie синонімів і міст (окремо для raw і ASCII-folded), будується один раз.
+    Скан: лише позиції початку слова, від кожної — прохід по trie; збіг, якщо після
+    ключа ≤ 4 літер до кінця слова (як (?<!\w)key\w{0,4}(?!\w) у попередній версії).
+    """
+
+    _END = ""
+
+    def __init__(self) -> None:
+        # (ключ, канонічне місто); індекс у списку = пріоритет у виводі (синоніми, потім міста)
+        entries: list[tuple[str, str]] = []
+        for syn, canon in CITY_SYNONYMS.items():
+            if len(syn) < 3 or canon.lower() in _WIDE_SOURCE_CITIES:
+                continue
+            name = canonicalize_known_city(canon)
+            entries.append((syn, name or ""))
+        for city in _KNOWN_CITIES:
+            entries.append((city.lower(), city))
+
+        self.names = [name for _, name in entries]
+        self.raw = self._build((key, order) for order, (key, _) in enumerate(entries))
+        self.ascii = self._build((_ascii_fold(key), order) for order, (key, _) in enumerate(entries))
+
+    @classmethod
+    def _build(cls, keys) -> dict:
+        root: dict = {}
+        for key, order in keys:
+            node = root
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node.setdefault(cls._END, []).append(order)
+        return root
+
+    def scan(self, text: str, trie: dict, hits: set[int]) -> None:
+        n = len(text)
+        for m in _WORD_START_RE.finditer(text):
+            node = trie.get(text[m.start()])
+            i = m.start() + 1
+            while node is not None:
+                orders = node.get(self._END)
+                if orders and not _LONG_SUFFIX_RE.match(text, i):
+                    hits.update(orders)
+                if i >= n:
+                    break
+                node = node.get(text[i])
+                i += 1
+
+
+# Позиція початку слова; далі ≥ 5 літер — це вже інше слово, не відмінок.
+_WORD_START_RE = re.compile(r"(?<!\w)\w")
+_LONG_SUFFIX_RE = re.compile(r"\w{5}")
+
+
+@lru_cache(maxsize=1)
+def _city_index() -> _CityIndex:
+    return _CityIndex()
+
+
+@lru_cache(maxsize=512)
+def _detect_cities_cached(text: str) -> tuple[str, ...]:
+    index = _city_index()
     lower = text.lower()
-    lower_ascii = _ascii_fold(lower)
+    hits: set[int] = set()
+    index.scan(lower, index.raw, hits)
+    index.scan(_ascii_fold(lower), index.ascii, hits)
     found: list[str] = []
+    for order in sorted(hits):
+        name = index.names[order]
+        if name and name not in found:
+            found.append(name)
+    return tuple(found)
 
-    for syn, canon in CITY_SYNONYMS.items():
-        if len(syn) < 3:
-            continue
-        if canon.lower() in _WIDE_SOURCE_CITIES:
-            continue
-        pattern = rf"(?<!\w){re.escape(syn)}\w{{0,4}}(?!\w)"
-        pattern_ascii = rf"(?<!\w){re.escape(_ascii_fold(syn))}\w{{0,4}}(?!\w)"
-        if re.search(pattern, lower) or re.search(pattern_ascii, lower_ascii):
-            name = canonicalize_known_city(canon)
-            if name and name not in found:
-                found.append(name)
 
-    for city in _KNOWN_CITIES:
-        c_lower = city.lower()
-        c_ascii = _ascii_fold(c_lower)
-        pattern = rf"(?<!\w){re.escape(c_lower)}\w{{0,4}}(?!\w)"
-        pattern_ascii = rf"(?<!\w){re.escape(c_ascii)}\w{{0,4}}(?!\w)"
-        if re.search(pattern, lower) or re.search(pattern_ascii, lower_ascii):
-            if city not in found:
-                found.append(city)
-
-    return found
+def detect_cities_in_text(text: str) -> list[str]:
+    """Канонічні міста з тексту (укр/рос/нім + відмінки: в Гамбурге) — один прохід по тексту."""
+    if not text:
+        return []
+    return list(_detect_cities_cached(text))
 
 
 def resolve_parsed_location(
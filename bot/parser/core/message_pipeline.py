@@ -0,0 +1,268 @@
+"""
+Конвеєр обробки постів каналу: history → пул воркерів (AI, фото) → впорядкований insert/notify.
+
+Воркери готують пости паралельно, але insert у parsed_items і сповіщення
+модерації йдуть строго в порядку читання історії.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from parser.config.settings import (
+    PARSER_DEDUP_PREFETCH_PAGE,
+    PARSER_INSERT_BATCH_SIZE,
+    PARSER_INSERT_BATCH_WAIT_MS,
+    PARSER_NOTIFY_INTERVAL_SEC,
+    PARSER_PIPELINE_WINDOW,
+    PARSER_PIPELINE_WORKERS,
+)
+from parser.core.metrics import metrics, stage_timer
+from parser.core.text import to_plain_str
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+# Поля рядка parsed_items, що йдуть у notify_callback (модерація / auto-approve).
+NOTIFY_ITEM_KEYS = (
+    "source_channel",
+    "source_city",
+    "message_id",
+    "author_username",
+    "author_id",
+    "title",
+    "description",
+    "price",
+    "currency",
+    "is_free",
+    "category",
+    "subcategory",
+    "condition",
+    "location",
+    "images",
+    "raw_text",
+    "msg_link",
+    "parser_type",
+)
+
+
+@dataclass
+class FetchedPost:
+    """Пост каналу після згортання альбому (media group) в одне оголошення."""
+
+    msg: Any
+    text: str
+    photos: list
+    message_id: int
+
+
+async def iter_channel_posts(messages: AsyncIterator[Any]) -> AsyncIterator[FetchedPost]:
+    """Альбом → один пост: текст з першого повідомлення з підписом, усі фото."""
+    processed_groups: set[str] = set()
+    iterator = messages.__aiter__()
+    while True:
+        # Час очікування наступного повідомлення = сторінки get_chat_history (+ FloodWait).
+        started = time.perf_counter()
+        try:
+            msg = await iterator.__anext__()
+        except StopAsyncIteration:
+            break
+        finally:
+            metrics.observe("telegram_history", time.perf_counter() - started)
+        if getattr(msg, "media_group_id", None):
+            gid = str(msg.media_group_id)
+            if gid in processed_groups:
+                continue
+            processed_groups.add(gid)
+            try:
+                with stage_timer("telegram_media_group"):
+                    group = await msg.get_media_group()
+            except Exception:
+                group = [msg]
+            first_with_cap = next((m for m in group if (m.text or m.caption)), group[0])
+            text = to_plain_str(first_with_cap.text or first_with_cap.caption or "")
+            photos = [m for m in group if m.photo]
+        else:
+            text = to_plain_str(msg.text or msg.caption or "")
+            photos = [msg] if msg.photo else []
+        yield FetchedPost(msg=msg, text=text, photos=photos, message_id=msg.id)
+
+
+async def prefetch_dedup_pages(
+    posts: AsyncIterator[FetchedPost],
+    source_channel: str,
+    *,
+    page_size: int | None = None,
+) -> AsyncIterator[FetchedPost]:
+    """
+    Буферизує сторінку постів і одним запитом підтягує їхній стан у parsed_items
+    (parsed_item_exists / claimed / clear_repostable далі читають in-cycle кеш).
+    """
+    from parser.storage.parsed_items import prefetch_parsed_item_states
+
+    size = PARSER_DEDUP_PREFETCH_PAGE if page_size is None else page_size
+    if size <= 0:
+        async for post in posts:
+            yield post
+        return
+
+    page: list[FetchedPost] = []
+
+    async def _flush():
+        with stage_timer("dedup_prefetch"):
+            await asyncio.to_thread(
+                prefetch_parsed_item_states,
+                source_channel,
+                [p.message_id for p in page],
+            )
+
+    async for post in posts:
+        page.append(post)
+        if len(page) >= size:
+            await _flush()
+            for item in page:
+                yield item
+            page = []
+    if page:
+        await _flush()
+        for item in page:
+            yield item
+
+
+def count_skip(stats: dict, reason: str) -> None:
+    stats["skipped"] += 1
+    metrics.inc("posts_skipped")
+    stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+
+
+async def run_ordered_pipeline(
+    source: AsyncIterator[T],
+    prepare: Callable[[T], Awaitable[R]],
+    commit: Callable[[list[R]], Awaitable[None]],
+    *,
+    workers: int | None = None,
+    window: int | None = None,
+    batch_size: int | None = None,
+    batch_wait_ms: int | None = None,
+) -> None:
+    """
+    prepare — паралельно (не більше workers), commit — пачками в порядку source.
+
+    window — скільки постів може бути в роботі/очікувати commit одночасно;
+    producer (читання історії) чекає, коли вікно заповнене.
+    Пачка commit — готові підряд результати: до batch_size, наступного чекаємо
+    не довше batch_wait_ms від першого (один INSERT-транзакція на пачку).
+    Помилка prepare/commit/source скасовує решту і пробрасується далі.
+    """
+    n_workers = max(1, workers or PARSER_PIPELINE_WORKERS)
+    n_window = max(n_workers, window or PARSER_PIPELINE_WINDOW)
+    n_batch = max(1, batch_size or PARSER_INSERT_BATCH_SIZE)
+    wait_sec = max(0, PARSER_INSERT_BATCH_WAIT_MS if batch_wait_ms is None else batch_wait_ms) / 1000.0
+    slots = asyncio.Semaphore(n_workers)
+    in_flight = asyncio.Semaphore(n_window)
+    queue: asyncio.Queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    async def _prepare(item: T) -> R:
+        async with slots:
+            metrics.inc("posts_seen")
+            with stage_timer("prepare_post"):
+                return await prepare(item)
+
+    async def _produce() -> None:
+        try:
+            async for item in source:
+                await in_flight.acquire()
+                queue.put_nowait(asyncio.create_task(_prepare(item)))
+        finally:
+            queue.put_nowait(_DONE)
+
+    async def _take(task: asyncio.Task) -> R:
+        try:
+            return await task
+        finally:
+            in_flight.release()
+
+    producer = asyncio.create_task(_produce())
+    # Знята з черги, але ще не готова задача — перша в наступній пачці.
+    held: Any = None
+    try:
+        finished = False
+        while not finished:
+            task = held if held is not None else await queue.get()
+            held = None
+            if task is _DONE:
+                break
+            batch = [await _take(task)]
+            deadline = loop.time() + wait_sec
+            while len(batch) < n_batch:
+                try:
+                    held = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        held = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if held is _DONE:
+                    finished = True
+                    break
+                if not held.done():
+                    remaining = deadline - loop.time()
+                    if remaining > 0:
+                        await asyncio.wait({held}, timeout=remaining)
+                    if not held.done():
+                        break
+                batch.append(await _take(held))
+                held = None
+            await commit(batch)
+        await producer
+    finally:
+        leftovers = [producer]
+        if held is not None and held is not _DONE:
+            leftovers.append(held)
+        while not queue.empty():
+            task = queue.get_nowait()
+            if task is not _DONE:
+                leftovers.append(task)
+        for task in leftovers:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*leftovers, return_exceptions=True)
+
+
+class ChatRateLimiter:
+    """
+    Мінімальний інтервал між повідомленнями в один чат модерації.
+    Спільний для всіх каналів і акаунтів процесу (Telegram: ~20 повідомлень/хв у групу).
+    """
+
+    def __init__(self, interval_sec: float):
+        self.interval_sec = max(0.0, float(interval_sec))
+        self._next_at: dict[int, float] = {}
+
+    async def wait(self, chat_id: int | None) -> None:
+        if self.interval_sec <= 0:
+            return
+        key = int(chat_id or 0)
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_at.get(key, 0.0))
+        self._next_at[key] = slot + self.interval_sec
+        if slot > now:
+            metrics.observe("notify_rate_wait", slot - now)
+            await asyncio.sleep(slot - now)
+
+
+moderation_rate_limiter = ChatRateLimiter(PARSER_NOTIFY_INTERVAL_SEC)
@@ -0,0 +1,152 @@
+"""
+Метрики циклу парсингу: гістограми тривалості етапів + лічильники (in-process).
+
+Етапи (stage_timer): telegram_history, telegram_media_group, dedup_prefetch, dedup,
+embedding_request, prescreen, ai_screen, photos, photo_download, photo_flood_wait, sqlite_insert,
+notify_rate_wait, moderation_send, prepare_post, channel. Воркери конвеєра паралельні — сума етапу може бути більшою за цикл.
+Реєстр скидається на старті циклу; знімок іде у звіт адмінам і у PARSER_METRICS_FILE.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# Секунди; останній кошик — +Inf.
+_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf,
+)
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        seconds = max(0.0, float(seconds))
+        for i, bound in enumerate(_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Верхня межа кошика, що містить q-квантиль (для +Inf — max)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(_BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return self.max if math.isinf(bound) else min(bound, self.max)
+        return self.max
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._histograms: dict[str, _Histogram] = {}
+        self._counters: dict[str, int] = {}
+        self._started_at = time.time()
+
+    def reset(self) -> None:
+        self._histograms.clear()
+        self._counters.clear()
+        self._started_at = time.time()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        hist = self._histograms.get(stage)
+        if hist is None:
+            hist = self._histograms[stage] = _Histogram()
+        hist.observe(seconds)
+
+    def inc(self, name: str, value: int = 1) -> None:
+        self._counters[name] = self._counters.get(name, 0) + int(value)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """with stage_timer("ai_screen"): await ... — час фіксується і при винятку."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        stages = {
+            name: {
+                "count": h.count,
+                "sum_sec": round(h.total, 4),
+                "p50_sec": round(h.quantile(0.5), 4),
+                "p95_sec": round(h.quantile(0.95), 4),
+                "max_sec": round(h.max, 4),
+                "buckets": {
+                    ("+Inf" if math.isinf(b) else f"{b:g}"): n
+                    for b, n in zip(_BUCKETS, h.counts)
+                },
+            }
+            for name, h in self._histograms.items()
+        }
+        return {
+            "started_at": self._started_at,
+            "exported_at": time.time(),
+            "stages": stages,
+            "counters": dict(self._counters),
+        }
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP parser_stage_seconds Тривалість етапів циклу парсингу",
+            "# TYPE parser_stage_seconds histogram",
+        ]
+        for name, h in sorted(self._histograms.items()):
+            cumulative = 0
+            for bound, n in zip(_BUCKETS, h.counts):
+                cumulative += n
+                le = "+Inf" if math.isinf(bound) else f"{bound:g}"
+                lines.append(f'parser_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'parser_stage_seconds_sum{{stage="{name}"}} {h.total:.6f}')
+            lines.append(f'parser_stage_seconds_count{{stage="{name}"}} {h.count}')
+        lines.append("# HELP parser_events_total Лічильники циклу парсингу")
+        lines.append("# TYPE parser_events_total counter")
+        for name, value in sorted(self._counters.items()):
+            lines.append(f'parser_events_total{{event="{name}"}} {value}')
+        lines.append("# HELP parser_cycle_started_timestamp_seconds Старт останнього циклу")
+        lines.append("# TYPE parser_cycle_started_timestamp_seconds gauge")
+        lines.append(f"parser_cycle_started_timestamp_seconds {self._started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path | None) -> None:
+        """.json → JSON-знімок, інакше Prometheus text (node_exporter textfile collector)."""
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.suffix.lower() == ".json":
+                body = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+            else:
+                body = self.to_prometheus()
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(body, encoding="utf-8")
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning("Не вдалося записати метрики парсера в %s: %s", path, e)
+
+
+metrics = MetricsRegistry()
+stage_timer = metrics.timer
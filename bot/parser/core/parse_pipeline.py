@@ -5,8 +5,16 @@ from __future__ import annotations
 import logging
 from typing import Any, Optional
 
-from parser.ai.screen import ai_screen_parsed_listing, apply_screen_enrichment
+from parser.ai.prescreen import prescreen_reject_reason
+from parser.ai.screen import (
+    AiScreenResult,
+    ai_screen_parsed_listing,
+    apply_screen_enrichment,
+    cached_screen_result,
+    is_ai_screen_enabled,
+)
 from parser.core.dedup import check_parser_duplicates
+from parser.core.metrics import stage_timer
 from parser.core.quality import is_junk_for_marketplace
 from parser.core.text import format_listing_description, polish_listing_description
 from parser.marketplace_categories import (
@@ -14,6 +22,9 @@ from parser.marketplace_categories import (
     force_services_marketplace_categories,
     should_treat_as_service,
 )
+from parser.storage.ai_batches import SCREEN_PENDING
+from parser.storage.db_pool import db_read
+from parser.storage.embeddings import EmbeddingPayload
 from parser.storage.listing_dedup import active_listing_duplicate
 
 logger = logging.getLogger(__name__)
@@ -137,24 +148,27 @@ async def run_ai_screen_and_dedup(
     is_free: bool,
     condition: Optional[str],
     force_service: bool = False,
-) -> tuple[bool, str, Optional[str], dict[str, Any]]:
+    defer_screen: bool = False,
+) -> tuple[bool, str, Optional[EmbeddingPayload], dict[str, Any]]:
     """
-    Повертає (ok, reason, embedding_json, fields_for_insert).
+    Повертає (ok, reason, embedding_payload, fields_for_insert).
   fields_for_insert може містити оновлені title/description/category/...
+    defer_screen — без синхронного AI: fields з ai_screen_status=screen_pending (parser.ai.screen_batch).
     """
-    is_dup, dup_reason, embedding_json = check_parser_duplicates(
-        source_channel=source_channel,
-        message_id=message_id,
-        content_hash=content_hash,
-        dedup_key=dedup_key,
-        title=title,
-        description=description,
-        parser_type=parser_type,
-    )
+    with stage_timer("dedup"):
+        is_dup, dup_reason, embedding_payload = await check_parser_duplicates(
+            source_channel=source_channel,
+            message_id=message_id,
+            content_hash=content_hash,
+            dedup_key=dedup_key,
+            title=title,
+            description=description,
+            parser_type=parser_type,
+        )
     if is_dup:
         return False, dup_reason, None, {}
 
-    if active_listing_duplicate(dedup_key, title, description):
+    if await db_read(active_listing_duplicate, dedup_key, title, description):
         return False, "дублікат (маркетплейс)", None, {}
 
     junk, junk_reason = is_junk_for_marketplace(
@@ -163,6 +177,12 @@ async def run_ai_screen_and_dedup(
     if junk:
         return False, junk_reason, None, {}
 
+    if is_ai_screen_enabled():
+        # Впевнене сміття за локальною моделлю — без виклику AI (PARSER_PRESCREEN_MODE=enforce).
+        prescreen_reason = prescreen_reject_reason(raw_text or description)
+        if prescreen_reason:
+            return False, prescreen_reason, None, {}
+
     candidate = {
         "raw_text": raw_text,
         "title": title,
@@ -178,9 +198,65 @@ async def run_ai_screen_and_dedup(
         "location": source_city,
     }
 
-    screen = await ai_screen_parsed_listing(candidate)
+    if defer_screen and is_ai_screen_enabled():
+        # Кеш — швидка смуга; інакше евристичні поля, AI — пізніше через Batch API.
+        screen = await cached_screen_result(candidate)
+        if screen is None:
+            fields = _finalize_fields(
+                title=title,
+                description=description,
+                raw_text=raw_text,
+                category=category,
+                subcategory=subcategory,
+                price=price,
+                currency=currency,
+                is_free=is_free,
+                condition=condition,
+                location=source_city,
+                force_service=force_service,
+            )
+            fields["ai_screen_status"] = SCREEN_PENDING
+            return True, "", embedding_payload, fields
+    else:
+        with stage_timer("ai_screen"):
+            screen = await ai_screen_parsed_listing(candidate)
+
+    ok, reason, fields = finalize_screen_result(candidate, screen, force_service=force_service)
+    if not ok:
+        return False, reason, None, {}
+    logger.info(
+        "AI screen OK %s/%s: %s → %s/%s",
+        source_channel,
+        message_id,
+        fields["title"][:40],
+        fields.get("category"),
+        fields.get("subcategory"),
+    )
+    return True, "", embedding_payload, fields
+
+
+def finalize_screen_result(
+    candidate: dict,
+    screen: AiScreenResult,
+    *,
+    force_service: bool = False,
+) -> tuple[bool, str, dict[str, Any]]:
+    """
+    AiScreenResult → (ok, reason, fields): enrichment поверх полів парсера, фіналізація,
+    повторна перевірка title / junk. Спільне для синхронного screen і результатів Batch API.
+    """
     if not screen.accept:
-        return False, screen.reason or "ai відхилено", None, {}
+        return False, screen.reason or "ai відхилено", {}
+
+    title = str(candidate.get("title") or "")
+    description = str(candidate.get("description") or "")
+    raw_text = str(candidate.get("raw_text") or "")
+    category = str(candidate.get("category") or "")
+    subcategory = candidate.get("subcategory")
+    price = candidate.get("price")
+    currency = candidate.get("currency")
+    is_free = candidate.get("is_free")
+    condition = candidate.get("condition")
 
     if screen.enrichment:
         enriched = apply_screen_enrichment(candidate, screen.enrichment)
@@ -208,7 +284,7 @@ async def run_ai_screen_and_dedup(
             currency=currency,
             is_free=is_free,
             condition=condition,
-            location=source_city,
+            location=candidate.get("source_city"),
             force_service=force_service,
         )
 
@@ -218,7 +294,7 @@ async def run_ai_screen_and_dedup(
         "оголошення",
         "listing",
     }:
-        return False, "поганий заголовок", None, {}
+        return False, "поганий заголовок", {}
 
     junk, junk_reason = is_junk_for_marketplace(
         check_title,
@@ -228,18 +304,10 @@ async def run_ai_screen_and_dedup(
         fields.get("subcategory") or subcategory,
     )
     if junk:
-        return False, f"{junk_reason} (ai)", None, {}
+        return False, f"{junk_reason} (ai)", {}
 
     fields["title"] = check_title
-    logger.info(
-        "AI screen OK %s/%s: %s → %s/%s",
-        source_channel,
-        message_id,
-        check_title[:40],
-        fields.get("category"),
-        fields.get("subcategory"),
-    )
-    return True, "", embedding_json, fields
+    return True, "", fields
 
 
 async def ensure_parsed_item_ai_screened(item: dict) -> dict:
@@ -247,8 +315,6 @@ async def ensure_parsed_item_ai_screened(item: dict) -> dict:
     Завжди один AI screen перед approve/publish (title, description, category).
     Поля з enrichment застосовуються напряму — без «залишити старий title якщо кращий».
     """
-    from parser.ai.screen import is_ai_screen_enabled
-
     item_id = item.get("id")
 
     if not is_ai_screen_enabled():
@@ -179,6 +179,12 @@ _ONE_EMOJI = (
 )
 TOO_MANY_EMOJI_RE = re.compile(f"({_ONE_EMOJI}){{10,}}")
 ONE_EMOJI_RE = re.compile(_ONE_EMOJI)
+LEADING_EMOJI_RE = re.compile(rf"^\s*(?:{_ONE_EMOJI}\s*)+")
+# Блоки емодзі, які прибирають fingerprint-и дедупу (латиницю / кирилицю / цифри не чіпає)
+EMOJI_BLOCK_RE = re.compile(
+    r"[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F600-\U0001F64F"
+    r"\U0001F680-\U0001F6FF\U0001F900-\U0001F9FF]+"
+)
 
 SERVICE_AD_HINT_RE = re.compile(
     r"косметолог|перукар|перукарн|манікюр|маникюр|педикюр"
@@ -1,29 +1,192 @@
-"""Завантаження фото з Telegram у локальне сховище."""
+"""
+Завантаження фото з Telegram у локальне сховище.
 
+Усі завантаження процесу йдуть через спільний PhotoDownloader: на кожен Pyrogram-клієнт —
+не більше PARSER_PHOTO_CONCURRENCY файлів одночасно, а старти (PARSER_PHOTO_RPS) і трафік
+(PARSER_PHOTO_BANDWIDTH_KBPS) обмежені token bucket'ами, спільними для всіх акаунтів.
+FloodWait ставить на паузу лише свій клієнт; кожен файл має власні повтори.
+
+Файли лягають у content-addressed сховище (parser.storage.photo_store): фото з уже
+відомим file_unique_id не завантажується повторно.
+"""
+
+from __future__ import annotations
+
+import asyncio
 import logging
+import time
+import uuid
+import weakref
 
-from parser.config.settings import PHOTOS_DIR, PARSER_MAX_PHOTOS
+from parser.config.settings import (
+    PARSER_MAX_PHOTOS,
+    PARSER_PHOTO_BANDWIDTH_KBPS,
+    PARSER_PHOTO_CONCURRENCY,
+    PARSER_PHOTO_RETRIES,
+    PARSER_PHOTO_RPS,
+    PHOTOS_DIR,
+)
+from parser.core.metrics import metrics, stage_timer
 
 logger = logging.getLogger(__name__)
 
+# Розмір, якщо Telegram не віддав file_size (типове фото після стиснення).
+_DEFAULT_PHOTO_BYTES = 200 * 1024
+# Довший FloodWait не чекаємо в межах поста — фото пропускається.
+_MAX_FLOOD_WAIT_SEC = 30.0
+_RETRY_BASE_SEC = 1.0
+
+
+class TokenBucket:
+    """
+    rate токенів/с, запас capacity. acquire() бронює токени наперед (баланс може піти
+    в мінус) і спить до свого слоту — черга без блокувань, як ChatRateLimiter.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = max(0.0, float(rate))
+        self.capacity = max(1.0, float(capacity if capacity is not None else self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Повертає, скільки секунд довелося чекати."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= min(float(amount), self.capacity)
+        if self._tokens >= 0:
+            return 0.0
+        wait = -self._tokens / self.rate
+        await asyncio.sleep(wait)
+        return wait
+
+
+class PhotoDownloader:
+    """Спільна черга завантажень фото для всіх клієнтів одного event loop."""
+
+    def __init__(
+        self,
+        *,
+        per_client: int = PARSER_PHOTO_CONCURRENCY,
+        rps: float = PARSER_PHOTO_RPS,
+        bandwidth_kbps: int = PARSER_PHOTO_BANDWIDTH_KBPS,
+        retries: int = PARSER_PHOTO_RETRIES,
+    ):
+        self.per_client = max(1, int(per_client))
+        self.retries = max(0, int(retries))
+        self._starts = TokenBucket(rps)
+        bytes_rate = max(0, int(bandwidth_kbps)) * 1024
+        # Запас — секунда трафіку, але не менше одного великого фото.
+        self._bandwidth = TokenBucket(bytes_rate, max(bytes_rate, 2 * _DEFAULT_PHOTO_BYTES))
+        self._slots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._paused_until: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _slot(self, app) -> asyncio.Semaphore:
+        sem = self._slots.get(app)
+        if sem is None:
+            sem = self._slots[app] = asyncio.Semaphore(self.per_client)
+        return sem
+
+    async def _wait_client(self, app) -> None:
+        delay = self._paused_until.get(app, 0.0) - time.monotonic()
+        if delay > 0:
+            metrics.observe("photo_flood_wait", delay)
+            await asyncio.sleep(delay)
+
+    def submit(self, app, message) -> asyncio.Task:
+        """Ставить фото в чергу; Task → посилання для images_json або None."""
+        return asyncio.ensure_future(self._fetch(app, message))
+
+    async def _fetch(self, app, message) -> str | None:
+        from parser.storage.db_pool import db_read, db_write
+        from parser.storage.photo_store import lookup_photo_blob, place_photo_blob, record_photo_blob
+
+        unique_id = getattr(getattr(message, "photo", None), "file_unique_id", None)
+        if unique_id:
+            rel = await db_read(lookup_photo_blob, unique_id)
+            if rel:
+                metrics.inc("photo_store_hits")
+                return rel
+        tmp = PHOTOS_DIR / f".dl_{uuid.uuid4().hex}.jpg"
+        if not await self._download(app, message, str(tmp)):
+            return None
+        # sha256 і перенесення файлу — у потоці: writer пулу не чекає на файловий I/O.
+        placed = await asyncio.to_thread(place_photo_blob, tmp)
+        if placed is None:
+            return None
+        sha256, size = placed
+        return await db_write(record_photo_blob, sha256, size, unique_id)
+
+    async def _download(self, app, message, file_name: str) -> bool:
+        from parser.core.account_pool import extract_flood_wait_seconds, is_flood_limit_error
+
+        size = getattr(getattr(message, "photo", None), "file_size", None) or _DEFAULT_PHOTO_BYTES
+        for attempt in range(self.retries + 1):
+            async with self._slot(app):
+                await self._wait_client(app)
+                await self._starts.acquire()
+                await self._bandwidth.acquire(size)
+                try:
+                    with stage_timer("photo_download"):
+                        await app.download_media(message, file_name=file_name)
+                    metrics.inc("photos_downloaded")
+                    return True
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    err = e
+            if is_flood_limit_error(err):
+                wait = float(extract_flood_wait_seconds(err) or 5)
+                metrics.inc("photo_flood_waits")
+                if wait > _MAX_FLOOD_WAIT_SEC:
+                    logger.warning("Фото [%s]: FloodWait %.0fs — пропуск", message.id, wait)
+                    break
+                self._paused_until[app] = max(self._paused_until.get(app, 0.0), time.monotonic() + wait)
+            elif attempt < self.retries:
+                await asyncio.sleep(_RETRY_BASE_SEC * (2**attempt))
+            if attempt >= self.retries:
+                logger.warning("Не вдалося завантажити фото [%s]: %s", message.id, err)
+        metrics.inc("photo_errors")
+        return False
+
+
+_downloader: PhotoDownloader | None = None
+_downloader_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_photo_downloader() -> PhotoDownloader:
+    """Один downloader на event loop (семафори asyncio прив'язані до циклу)."""
+    global _downloader, _downloader_loop
+    loop = asyncio.get_running_loop()
+    if _downloader is None or _downloader_loop is not loop:
+        _downloader = PhotoDownloader()
+        _downloader_loop = loop
+    return _downloader
+
 
 async def download_photos(
     app,
     messages_with_photos: list,
-    base_name: str,
     max_photos: int | None = None,
 ) -> list[str]:
+    """Фото поста паралельно через спільний downloader; шляхи — у порядку альбому."""
     limit = PARSER_MAX_PHOTOS if max_photos is None else max(0, min(PARSER_MAX_PHOTOS, max_photos))
     if limit <= 0:
         return []
-    paths = []
-    for i, m in enumerate(messages_with_photos[:limit]):
-        suffix = f"_{i + 1}" if limit > 1 else ""
-        filename = f"{base_name}{suffix}.jpg"
-        photo_path = PHOTOS_DIR / filename
-        try:
-            await app.download_media(m, file_name=str(photo_path))
-            paths.append(f"database/parsed_photos/{filename}")
-        except Exception as e:
-            logger.warning("Не вдалося завантажити фото [%s]: %s", m.id, e)
+    downloader = get_photo_downloader()
+    tasks = [downloader.submit(app, m) for m in messages_with_photos[:limit]]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    paths: list[str] = []
+    for rel in results:
+        # Альбом із двома однаковими фото — одне посилання.
+        if rel and rel not in paths:
+            paths.append(rel)
     return paths
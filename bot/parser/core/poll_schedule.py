@@ -0,0 +1,125 @@
+"""
+Адаптивне опитування каналів: кожен канал має власний інтервал.
+
+Швидкість постингу — EWMA приросту message_id за годину між опитуваннями
+(parser_channel_schedule; до першого виміру — cursor і кількість parsed_items).
+Інтервал = PARSER_ADAPTIVE_TARGET_POSTS / швидкість у межах MIN…MAX. Fetch limit не
+зменшується (сплеск понад оцінку інакше втрачався б; з cursor читання й так зупиняється
+на ньому) — очікувана кількість постів лише ділить канали між акаунтами.
+Плановий job тікає раз на PARSER_ADAPTIVE_TICK_MIN і бере лише канали, чий час настав.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+
+from parser.config.settings import (
+    PARSER_ADAPTIVE_MAX_INTERVAL_MIN,
+    PARSER_ADAPTIVE_MIN_INTERVAL_MIN,
+    PARSER_ADAPTIVE_TARGET_POSTS,
+    PARSER_ADAPTIVE_TICK_MIN,
+    PARSER_INTERVAL_MIN,
+)
+
+logger = logging.getLogger(__name__)
+
+# Вага нового виміру в EWMA швидкості.
+_RATE_ALPHA = 0.3
+# Коротші проміжки між опитуваннями не міряємо — шум.
+_MIN_MEASURE_SEC = 60
+# Розкид next_due, щоб канали з однаковою швидкістю не збігались в один тік.
+_JITTER = 0.1
+
+
+@dataclass
+class PollPlan:
+    channels: dict[str, str] = field(default_factory=dict)
+    # Очікувані нові пости каналу — вага для розподілу між акаунтами.
+    expected_posts: dict[str, float] = field(default_factory=dict)
+    total: int = 0
+
+
+def poll_interval_sec(rate_per_hour: float | None) -> int:
+    """Інтервал опитування для швидкості (повідомлень/год); None — базовий PARSER_INTERVAL_MIN."""
+    lo = PARSER_ADAPTIVE_MIN_INTERVAL_MIN * 60
+    hi = PARSER_ADAPTIVE_MAX_INTERVAL_MIN * 60
+    if rate_per_hour is None:
+        return int(min(hi, max(lo, PARSER_INTERVAL_MIN * 60)))
+    if rate_per_hour <= 0:
+        return hi
+    return int(min(hi, max(lo, PARSER_ADAPTIVE_TARGET_POSTS / rate_per_hour * 3600)))
+
+
+def expected_new_posts(rate_per_hour: float | None, elapsed_sec: int, cap: int) -> float:
+    """Скільки нових постів очікується з минулого опитування (не більше cap, невідомо — cap)."""
+    cap = max(1, int(cap))
+    if rate_per_hour is None or elapsed_sec <= 0:
+        return float(cap)
+    return max(1.0, min(float(cap), rate_per_hour * elapsed_sec / 3600.0))
+
+
+def plan_due_channels(channels: dict[str, str], cap: int, *, now: int | None = None) -> PollPlan:
+    """
+    Канали, чий next_due_ts настав (з допуском у пів тіку), і очікувані нові пости кожного.
+    Взятим каналам одразу зсувається next_due_ts — збій не повторюється щотіку.
+    """
+    from parser.storage.channel_schedule import defer_channels, load_channel_schedule
+
+    now = int(now if now is not None else time.time())
+    horizon = now + PARSER_ADAPTIVE_TICK_MIN * 30
+    state = load_channel_schedule(list(channels))
+    plan = PollPlan(total=len(channels))
+    deferred: dict[str, int] = {}
+    for channel, city in channels.items():
+        row = state.get(channel) or {}
+        if int(row.get("next_due_ts") or 0) > horizon:
+            continue
+        rate = row.get("rate_per_hour")
+        if rate is None:
+            rate = row.get("rate_hint")
+        last_polled = int(row.get("last_polled_ts") or 0)
+        elapsed = now - last_polled if last_polled else 0
+        plan.channels[channel] = city
+        plan.expected_posts[channel] = expected_new_posts(rate, elapsed, cap)
+        deferred[channel] = now + max(int(row.get("interval_sec") or 0), poll_interval_sec(rate))
+    defer_channels(deferred)
+    return plan
+
+
+def record_channel_poll(
+    source_channel: str,
+    parser_type: str,
+    head_id: int,
+    *,
+    now: int | None = None,
+) -> None:
+    """Успішне опитування: оновити швидкість за приростом head і призначити наступне."""
+    from parser.storage.channel_schedule import get_channel_schedule_row, save_channel_poll
+
+    now = int(now if now is not None else time.time())
+    row = get_channel_schedule_row(source_channel, parser_type)
+    rate = row.get("rate_per_hour")
+    prev_head = int(row.get("last_head_id") or 0)
+    prev_ts = int(row.get("last_polled_ts") or 0)
+    if prev_head > 0 and prev_ts > 0 and now - prev_ts >= _MIN_MEASURE_SEC:
+        measured = max(0, int(head_id) - prev_head) * 3600.0 / (now - prev_ts)
+        rate = measured if rate is None else _RATE_ALPHA * measured + (1 - _RATE_ALPHA) * float(rate)
+    interval = poll_interval_sec(rate)
+    next_due = now + int(interval * random.uniform(1 - _JITTER, 1 + _JITTER))
+    save_channel_poll(
+        source_channel,
+        rate_per_hour=rate,
+        interval_sec=interval,
+        head_id=head_id,
+        polled_ts=now,
+        next_due_ts=next_due,
+    )
+    logger.debug(
+        "poll schedule %s: %.1f/год → інтервал %s хв",
+        source_channel,
+        rate or 0.0,
+        interval // 60,
+    )
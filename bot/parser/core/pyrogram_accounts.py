@@ -14,7 +14,8 @@ from parser.core.account_pool import (
     is_flood_limit_error,
     list_accounts_round_robin,
 )
-from parser.core.session_lock import pyrogram_session_guard
+from parser.config.settings import PARSER_ACCOUNT_CONCURRENCY
+from parser.core.session_lock import lock_for_session, pyrogram_session_guard
 from parser.storage import parser_accounts_db as accounts_db
 from parser.storage.connection import is_sqlite_locked_error
 
@@ -79,8 +80,12 @@ async def _run_bucket_on_account(
     notify_callback: Callable[..., Awaitable[Any]],
     *,
     log_prefix: str,
+    deferred: list[tuple[PyrogramAccount, str, str]] | None = None,
 ) -> tuple[dict, list[dict]]:
-    """Один Pyrogram Client на всі канали акаунта."""
+    """
+    Один Pyrogram Client на всі канали акаунта.
+    deferred — сюди йдуть канали з лімітом, для яких усі резервні акаунти зайняті.
+    """
     from pyrogram import Client
 
     _ensure_pyrogram_patched()
@@ -126,7 +131,7 @@ async def _run_bucket_on_account(
                                 logger.info("  %s — причини пропуску: %s", channel, parts)
                         except Exception as e:
                             if is_flood_limit_error(e):
-                                stats, used_acc, flood_err = await _parse_channel_with_fallback(
+                                stats, used_acc, flood_err, busy = await _parse_channel_with_fallback(
                                     acc,
                                     parse_fn,
                                     channel,
@@ -134,7 +139,16 @@ async def _run_bucket_on_account(
                                     notify_callback,
                                     log_prefix=log_prefix,
                                 )
-                                if stats is None:
+                                if stats is None and busy and deferred is not None:
+                                    # Свою сесію не відпускаємо до кінця бакета — чекати тут
+                                    # на чужу означало б взаємне блокування акаунтів.
+                                    deferred.append((acc, channel, city))
+                                    logger.info(
+                                        "%s — %s: резервні акаунти зайняті, відкладаємо до кінця бакетів",
+                                        log_prefix,
+                                        channel,
+                                    )
+                                elif stats is None:
                                     errors.append(
                                         {
                                             "channel": channel,
@@ -231,11 +245,31 @@ async def _parse_channel_with_fallback(
     notify_callback: Callable[..., Awaitable[Any]],
     *,
     log_prefix: str,
-) -> tuple[dict | None, PyrogramAccount | None, str | None]:
-    chain = [primary, *fallback_accounts_after(primary)]
+    retry_primary: bool = True,
+) -> tuple[dict | None, PyrogramAccount | None, str | None, bool]:
+    """
+    (stats, акаунт, помилка, busy). busy — якийсь резервний акаунт пропущено, бо його
+    сесія зайнята: канал варто повторити, коли бакети акаунтів завершаться.
+    """
+    chain = fallback_accounts_after(primary)
+    if retry_primary:
+        chain = [primary, *chain]
     last_error: str | None = None
+    busy = False
 
     for acc in chain:
+        # Сесія вже відкрита (свій бакет або паралельний акаунт) — asyncio.Lock
+        # не реентерабельний, чекали б до timeout guard.
+        if lock_for_session(acc.session_path).locked():
+            logger.info(
+                "%s — %s (…%s) зайнятий, пропускаємо як fallback для %s",
+                log_prefix,
+                acc.label,
+                acc.phone_tail,
+                channel,
+            )
+            busy = busy or acc.label != primary.label
+            continue
         try:
             stats = await _run_parse_on_account(acc, parse_fn, channel, city, notify_callback)
             if acc.label != primary.label:
@@ -247,7 +281,7 @@ async def _parse_channel_with_fallback(
                     acc.label,
                     acc.phone_tail,
                 )
-            return stats, acc, None
+            return stats, acc, None, False
         except Exception as e:
             last_error = str(e)
             if is_flood_limit_error(e):
@@ -262,7 +296,7 @@ async def _parse_channel_with_fallback(
                 continue
             raise
 
-    return None, None, last_error
+    return None, None, last_error, busy
 
 
 async def run_channels_with_accounts(
@@ -271,7 +305,15 @@ async def run_channels_with_accounts(
     notify_callback: Callable[..., Awaitable[Any]],
     *,
     log_prefix: str = "Парсинг",
+    concurrency: int | None = None,
+    weights: dict[str, float] | None = None,
 ) -> dict:
+    """
+    Канали діляться між акаунтами round-robin; бакети акаунтів виконуються
+    паралельно (не більше concurrency / PARSER_ACCOUNT_CONCURRENCY одночасно).
+    weights (очікувана кількість постів каналу) — найважчі канали першими
+    до найменш завантаженого акаунта, щоб бакети були рівними за обсягом.
+    """
     accounts = list_accounts_round_robin(for_dm=False)
     if not accounts:
         raise ValueError(
@@ -280,50 +322,97 @@ async def run_channels_with_accounts(
 
     items = list(channels.items())
     buckets: list[list[tuple[str, str]]] = [[] for _ in accounts]
-    for idx, item in enumerate(items):
-        buckets[idx % len(accounts)].append(item)
+    if weights:
+        loads = [0.0] * len(accounts)
+        for item in sorted(items, key=lambda it: -float(weights.get(it[0], 1.0))):
+            idx = loads.index(min(loads))
+            buckets[idx].append(item)
+            loads[idx] += float(weights.get(item[0], 1.0))
+    else:
+        for idx, item in enumerate(items):
+            buckets[idx % len(accounts)].append(item)
 
     total: dict = {"added": 0, "skipped": 0, "errors": []}
+    limit = max(1, concurrency or PARSER_ACCOUNT_CONCURRENCY)
 
     logger.info(
-        "%s: %s канал(ів), %s Telegram-акаунт(ів) [%s]",
+        "%s: %s канал(ів), %s Telegram-акаунт(ів) [%s], паралельно до %s",
         log_prefix,
         len(items),
         len(accounts),
         ", ".join(f"{a.label}(…{a.phone_tail})" for a in accounts),
+        limit,
     )
 
-    for acc, bucket in zip(accounts, buckets):
-        if not bucket:
-            continue
-        logger.info(
-            "%s — основний акаунт %s (…%s): %s канал(ів)",
-            log_prefix,
-            acc.label,
-            acc.phone_tail,
-            len(bucket),
-        )
+    async def _run_account(acc: PyrogramAccount, bucket: list[tuple[str, str]]) -> None:
+        async with limiter:
+            logger.info(
+                "%s — основний акаунт %s (…%s): %s канал(ів)",
+                log_prefix,
+                acc.label,
+                acc.phone_tail,
+                len(bucket),
+            )
+            try:
+                local, errors = await _run_bucket_on_account(
+                    acc,
+                    bucket,
+                    parse_fn,
+                    notify_callback,
+                    log_prefix=log_prefix,
+                    deferred=deferred,
+                )
+                merge_channel_stats(total, local, channel="", city="")
+                total["errors"].extend(errors)
+                accounts_db.mark_parse_result(acc.id, ok=True)
+            except Exception as e:
+                logger.exception("%s — збій акаунта %s: %s", log_prefix, acc.label, e)
+                accounts_db.mark_parse_result(acc.id, ok=False, error=str(e))
+                wait_sec = extract_flood_wait_seconds(e)
+                if wait_sec > 0:
+                    import time as _time
+
+                    accounts_db.set_flood_until(acc.id, _time.time() + wait_sec)
+                total["errors"].append(
+                    {"channel": "—", "city": "—", "error": f"{acc.label}: {e}"}
+                )
+
+    # Одна task на акаунт; збій чи flood одного бакета не зупиняє інші.
+    limiter = asyncio.Semaphore(limit)
+    deferred: list[tuple[PyrogramAccount, str, str]] = []
+    await asyncio.gather(
+        *(_run_account(acc, bucket) for acc, bucket in zip(accounts, buckets) if bucket)
+    )
+
+    # Fallback, для якого всі акаунти були зайняті своїми бакетами: тепер сесії вільні.
+    for acc, channel, city in deferred:
         try:
-            local, errors = await _run_bucket_on_account(
+            stats, used_acc, flood_err, _ = await _parse_channel_with_fallback(
                 acc,
-                bucket,
                 parse_fn,
+                channel,
+                city,
                 notify_callback,
                 log_prefix=log_prefix,
+                retry_primary=False,
             )
-            merge_channel_stats(total, local, channel="", city="")
-            total["errors"].extend(errors)
-            accounts_db.mark_parse_result(acc.id, ok=True)
         except Exception as e:
-            logger.exception("%s — збій акаунта %s: %s", log_prefix, acc.label, e)
-            accounts_db.mark_parse_result(acc.id, ok=False, error=str(e))
-            wait_sec = extract_flood_wait_seconds(e)
-            if wait_sec > 0:
-                import time as _time
-
-                accounts_db.set_flood_until(acc.id, _time.time() + wait_sec)
+            logger.error("%s — fallback для %s: %s", log_prefix, channel, e, exc_info=True)
+            total["errors"].append({"channel": channel, "city": city, "error": str(e)})
+            continue
+        if stats is None:
             total["errors"].append(
-                {"channel": "—", "city": "—", "error": f"{acc.label}: {e}"}
+                {"channel": channel, "city": city, "error": flood_err or "ліміт на всіх акаунтах"}
             )
+            continue
+        merge_channel_stats(total, stats, channel=channel, city=city)
+        logger.info(
+            "  [%s …%s] %s (відкладений fallback): +%s, пропущено %s",
+            used_acc.label,
+            used_acc.phone_tail,
+            channel,
+            stats.get("added", 0),
+            stats.get("skipped", 0),
+        )
 
     return total
@@ -1,8 +1,6 @@
 """Парсинг груп/каналів послуг: один раз парсимо → дві окремі модерації (маркетплейс + канал)."""
 
-import asyncio
 import logging
-import re
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 
@@ -20,7 +18,21 @@ from parser.config.settings import (
     PARSER_SERVICES_IGNORE_CURSOR,
 )
 from parser.moderation.approve_routing import notify_chat_for_parsed_item
-from parser.core.channel_fetch import iter_new_channel_messages
+from parser.core.channel_fetch import (
+    HistoryPass,
+    advance_channel_cursor,
+    iter_new_channel_messages,
+)
+from parser.core.message_pipeline import (
+    NOTIFY_ITEM_KEYS,
+    FetchedPost,
+    count_skip,
+    iter_channel_posts,
+    prefetch_dedup_pages,
+    moderation_rate_limiter,
+    run_ordered_pipeline,
+)
+from parser.core.metrics import metrics, stage_timer
 from parser.core.photos import download_photos
 from parser.core.quality import (
     has_too_many_emojis,
@@ -40,18 +52,21 @@ from parser.core.text import (
     extract_description,
     extract_title,
     parse_price,
-    to_plain_str,
 )
 from parser.core.parse_pipeline import run_ai_screen_and_dedup
+from parser.core.dedup import RunDedup
 from parser.marketplace_categories import (
     force_services_marketplace_categories,
     should_treat_as_service,
 )
+from parser.storage.db_pool import db_write
+from parser.storage.listing_dedup import note_ai_context_pending
 from parser.storage.parsed_items import (
+    add_to_embedding_index,
     ensure_parsed_items_table,
     fingerprint_parsed_text,
     fingerprint_title_desc,
-    insert_parsed_item,
+    insert_parsed_items,
     parsed_item_exists,
 )
 
@@ -93,7 +108,6 @@ async def parse_services_ai_channel(app, channel: str, city: str, notify_callbac
     ensure_parsed_items_table()
 
     stats = {"added": 0, "skipped": 0, "reasons": {}}
-    processed_groups: set[str] = set()
     channel_key = normalize_channel_key(channel)
     force_service_channel = channel_key in SERVICE_CHANNELS
 
@@ -101,41 +115,16 @@ async def parse_services_ai_channel(app, channel: str, city: str, notify_callbac
 
     chat_target = await resolve_pyrogram_chat_target(app, channel)
 
-    fetch_limit, ignore_cursor = _active_fetch_options()
-    async for msg in iter_new_channel_messages(
-        app,
-        chat_target,
-        source_channel=channel,
-        parser_type=PARSER_TYPE_SERVICES_CHANNEL,
-        fetch_limit=fetch_limit,
-        ignore_cursor=ignore_cursor,
-    ):
-        if getattr(msg, "media_group_id", None):
-            gid = str(msg.media_group_id)
-            if gid in processed_groups:
-                continue
-            processed_groups.add(gid)
-            try:
-                group = await msg.get_media_group()
-            except Exception:
-                group = [msg]
-            first_with_cap = next((m for m in group if (m.text or m.caption)), group[0])
-            text = to_plain_str(first_with_cap.text or first_with_cap.caption or "")
-            photos = [m for m in group if m.photo]
-            msg_for_link = msg
-            effective_message_id = msg.id
-        else:
-            text = to_plain_str(msg.text or msg.caption or "")
-            photos = [msg] if msg.photo else []
-            msg_for_link = msg
-            effective_message_id = msg.id
+    async def prepare(post: FetchedPost) -> dict | None:
+        """Фільтри, AI, фото — паралельно в пулі воркерів. None = пропуск."""
+        effective_message_id = post.message_id
+        photos = post.photos
 
         if parsed_item_exists(channel, effective_message_id, PARSER_TYPE_SERVICES_CHANNEL):
-            stats["skipped"] += 1
-            stats["reasons"]["дублікат (бд)"] = stats["reasons"].get("дублікат (бд)", 0) + 1
-            continue
+            count_skip(stats, "дублікат (бд)")
+            return None
 
-        text = clean_channel_post_text(text, channel)
+        text = clean_channel_post_text(post.text, channel)
 
         content_hash = fingerprint_parsed_text(text)
 
@@ -146,16 +135,14 @@ async def parse_services_ai_channel(app, channel: str, city: str, notify_callbac
             or is_likely_service_ad(text)
         )
         if not is_service:
-            stats["skipped"] += 1
-            stats["reasons"]["не послуга"] = stats["reasons"].get("не послуга", 0) + 1
-            continue
+            count_skip(stats, "не послуга")
+            return None
 
         relaxed_quality = force_service_channel or is_service
         ok, reason = is_quality(text, len(photos) > 0, relaxed=relaxed_quality)
         if not ok:
-            stats["skipped"] += 1
-            stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
-            continue
+            count_skip(stats, reason)
+            return None
 
         price_str, currency, is_free = parse_price(text)
         title = extract_title(text)
@@ -163,14 +150,12 @@ async def parse_services_ai_channel(app, channel: str, city: str, notify_callbac
 
         # Навіть у beauty/service-каналах бувають новини/попередження — не послуга.
         if is_likely_not_listing(title, description, text):
-            stats["skipped"] += 1
-            stats["reasons"]["не оголошення"] = stats["reasons"].get("не оголошення", 0) + 1
-            continue
+            count_skip(stats, "не оголошення")
+            return None
 
         if not force_service_channel and has_too_many_emojis(description):
-            stats["skipped"] += 1
-            stats["reasons"]["багато емоджі"] = stats["reasons"].get("багато емоджі", 0) + 1
-            continue
+            count_skip(stats, "багато емоджі")
+            return None
 
         dedup_key = fingerprint_title_desc(
             title,
@@ -194,7 +179,7 @@ async def parse_services_ai_channel(app, channel: str, city: str, notify_callbac
 
         condition = detect_condition(text, category)
 
-        ok, skip_reason, embedding_json, ai_fields = await run_ai_screen_and_dedup(
+        ok, skip_reason, embedding_payload, ai_fields = await run_ai_screen_and_dedup(
             source_channel=channel,
             message_id=effective_message_id,
             content_hash=content_hash,
@@ -213,9 +198,8 @@ async def parse_services_ai_channel(app, channel: str, city: str, notify_callbac
             force_service=force_service_channel or is_service,
         )
         if not ok:
-            stats["skipped"] += 1
-            stats["reasons"][skip_reason] = stats["reasons"].get(skip_reason, 0) + 1
-            continue
+            count_skip(stats, skip_reason)
+            return None
 
         source_city = city
         location = source_city
@@ -267,14 +251,13 @@ async def parse_services_ai_channel(app, channel: str, city: str, notify_callbac
         else:
             final_parser_type = "default"
 
-        author_username, author_id = resolve_author_contact(msg_for_link, text, channel)
-        media_group_id = getattr(msg, "media_group_id", None)
+        author_username, author_id = resolve_author_contact(post.msg, text, channel)
+        media_group_id = getattr(post.msg, "media_group_id", None)
         if media_group_id:
             media_group_id = str(media_group_id)
 
-        chan_slug = re.sub(r"[^a-z0-9]+", "_", channel.lower()).strip("_")[:24] or "ch"
-        base_name = f"{chan_slug}_{effective_message_id}"
-        images = await download_photos(app, photos, base_name)
+        with stage_timer("photos"):
+            images = await download_photos(app, photos)
 
         post_msg_link = message_link(
             channel,
@@ -282,77 +265,99 @@ async def parse_services_ai_channel(app, channel: str, city: str, notify_callbac
             chat_id=chat_target if isinstance(chat_target, int) else None,
         )
 
-        item_id = insert_parsed_item(
-            source_channel=channel,
-            source_city=source_city,
-            message_id=effective_message_id,
-            media_group_id=media_group_id,
-            author_username=author_username,
-            author_id=author_id,
-            title=title,
-            description=description,
-            price=price_str,
-            currency=currency,
-            is_free=is_free,
-            category=category,
-            subcategory=subcategory,
-            condition=condition,
-            location=location,
-            images=images,
-            raw_text=text[:4000],
-            content_hash=content_hash,
-            dedup_key=dedup_key,
-            parser_type=final_parser_type,
-            text_embedding=embedding_json,
-            msg_link=post_msg_link,
-        )
+        return {
+            "source_channel": channel,
+            "source_city": source_city,
+            "message_id": effective_message_id,
+            "media_group_id": media_group_id,
+            "author_username": author_username,
+            "author_id": author_id,
+            "title": title,
+            "description": description,
+            "price": price_str,
+            "currency": currency,
+            "is_free": is_free,
+            "category": category,
+            "subcategory": subcategory,
+            "condition": condition,
+            "location": location,
+            "images": images,
+            "raw_text": text[:4000],
+            "content_hash": content_hash,
+            "dedup_key": dedup_key,
+            "parser_type": final_parser_type,
+            "text_embedding": embedding_payload,
+            "msg_link": post_msg_link,
+        }
 
-        if item_id:
-            base_item_data = {
-                "id": item_id,
-                "source_channel": channel,
-                "source_city": source_city,
-                "message_id": effective_message_id,
-                "author_username": author_username,
-                "author_id": author_id,
-                "title": title,
-                "description": description,
-                "price": price_str,
-                "currency": currency,
-                "is_free": is_free,
-                "category": category,
-                "subcategory": subcategory,
-                "condition": condition,
-                "location": location,
-                "images": images,
-                "raw_text": text[:4000],
-                "msg_link": post_msg_link,
-                "parser_type": final_parser_type,
-            }
-            try:
-                item_data = {
-                    **base_item_data,
-                    "moderation_target": (
-                        "services_both"
-                        if final_parser_type == PARSER_TYPE_SERVICES_CHANNEL
-                        else "marketplace"
-                    ),
-                    "notify_chat_id": notify_chat_for_parsed_item(base_item_data),
-                }
-                await notify_callback(item_data)
-                await asyncio.sleep(3)
-            except Exception as e:
-                logger.error(
-                    "Помилка сповіщення модерації (services AI) item %s: %s",
-                    item_id,
-                    e,
+    # prepare вікна йде паралельно — репости всередині вікна ловимо тут, перед insert.
+    run_dedup = RunDedup()
+
+    async def commit(batch: list[dict | None]) -> None:
+        """Insert пачки однією транзакцією, далі сповіщення модерації — строго в порядку історії каналу."""
+        rows = []
+        for row in batch:
+            if row is None:
+                continue
+            reason = run_dedup.duplicate_reason(row)
+            if reason:
+                count_skip(stats, reason)
+                continue
+            rows.append(row)
+        if not rows:
+            return
+        with stage_timer("sqlite_insert"):
+            item_ids, new_embeddings = await db_write(insert_parsed_items, rows)
+        add_to_embedding_index(new_embeddings)
+        note_ai_context_pending([(item_id, row["title"]) for row, item_id in zip(rows, item_ids)])
+
+        for row, item_id in zip(rows, item_ids):
+            if item_id:
+                base_item_data = {"id": item_id, **{k: row[k] for k in NOTIFY_ITEM_KEYS}}
+                try:
+                    item_data = {
+                        **base_item_data,
+                        "moderation_target": (
+                            "services_both"
+                            if row["parser_type"] == PARSER_TYPE_SERVICES_CHANNEL
+                            else "marketplace"
+                        ),
+                        "notify_chat_id": notify_chat_for_parsed_item(base_item_data),
+                    }
+                    await moderation_rate_limiter.wait(item_data["notify_chat_id"])
+                    with stage_timer("moderation_send"):
+                        await notify_callback(item_data)
+                except Exception as e:
+                    logger.error(
+                        "Помилка сповіщення модерації (services AI) item %s: %s",
+                        item_id,
+                        e,
+                    )
+
+                stats["added"] += 1
+                metrics.inc("posts_added")
+                logger.info(
+                    "  ✅ [services→канал] [%s/%s] %s", channel, row["message_id"], row["title"][:50]
                 )
+            else:
+                count_skip(stats, "дублікат (бд)")
 
-            stats["added"] += 1
-            logger.info("  ✅ [services→канал] [%s/%s] %s", channel, effective_message_id, title[:50])
-        else:
-            stats["skipped"] += 1
-            stats["reasons"]["дублікат (бд)"] = stats["reasons"].get("дублікат (бд)", 0) + 1
+    fetch_limit, ignore_cursor = _active_fetch_options()
+    history = HistoryPass()
+    messages = iter_new_channel_messages(
+        app,
+        chat_target,
+        source_channel=channel,
+        parser_type=PARSER_TYPE_SERVICES_CHANNEL,
+        fetch_limit=fetch_limit,
+        ignore_cursor=ignore_cursor,
+        history=history,
+    )
+    posts = prefetch_dedup_pages(iter_channel_posts(messages), channel)
+    with stage_timer("channel"):
+        await run_ordered_pipeline(posts, prepare, commit)
+    # Усі пости проходу закомічені — тепер можна зсунути cursor.
+    await advance_channel_cursor(channel, PARSER_TYPE_SERVICES_CHANNEL, history)
 
     return stats
 
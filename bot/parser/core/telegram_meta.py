@@ -2,9 +2,12 @@
 
 import logging
 import re
+from pathlib import Path
 from typing import Optional, Union
 
 from parser.config.channels import normalize_channel_key
+from parser.config.settings import PARSER_CHAT_TARGET_TTL_HOURS
+from parser.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -123,15 +126,116 @@ async def _resolve_invite_via_check(app, invite_hash: str) -> Optional[int]:
     return cid
 
 
+# Помилки, після яких збережений peer більше не придатний (вийшли / канал закрився / новий invite).
+_STALE_CHAT_TARGET_TOKENS = (
+    "PEER_ID_INVALID",
+    "CHANNEL_INVALID",
+    "CHANNEL_PRIVATE",
+    "CHAT_ID_INVALID",
+    "CHAT_FORBIDDEN",
+    "INVITE_HASH_EXPIRED",
+    "INVITE_HASH_INVALID",
+)
+
+
+def is_stale_chat_target_error(err: BaseException) -> bool:
+    err_s = str(err).upper()
+    return any(token in err_s for token in _STALE_CHAT_TARGET_TOKENS)
+
+
+def _account_key(app) -> str:
+    """Ключ акаунта в кеші — ім'я session-файлу (access_hash свій у кожного акаунта)."""
+    return Path(str(getattr(app, "name", "") or "")).name
+
+
+def _input_peer_fields(peer) -> Optional[tuple[int, str]]:
+    """InputPeer → (access_hash, тип peer для session storage)."""
+    from pyrogram import raw
+
+    if isinstance(peer, raw.types.InputPeerChannel):
+        return int(peer.access_hash or 0), "channel"
+    if isinstance(peer, raw.types.InputPeerChat):
+        return 0, "group"
+    if isinstance(peer, raw.types.InputPeerUser):
+        return int(peer.access_hash or 0), "user"
+    return None
+
+
+async def _remember_chat_target(app, channel_key: str, cid: int) -> None:
+    try:
+        fields = _input_peer_fields(await app.storage.get_peer_by_id(cid))
+    except Exception as e:
+        logger.debug("Peer %s ще не в session storage: %s", cid, e)
+        return
+    if fields is None:
+        return
+    from parser.storage.db_pool import db_write
+    from parser.storage.chat_targets import save_chat_target
+
+    await db_write(save_chat_target, channel_key, _account_key(app), cid, fields[0], fields[1])
+
+
+async def _cached_chat_target(app, channel_key: str) -> Optional[int]:
+    """Numeric id із кешу; peer повертається в session storage, якщо його там немає."""
+    from parser.storage.db_pool import db_read
+    from parser.storage.chat_targets import get_cached_chat_target
+
+    cached = await db_read(
+        get_cached_chat_target, channel_key, _account_key(app), PARSER_CHAT_TARGET_TTL_HOURS * 3600
+    )
+    if not cached:
+        return None
+    cid = cached["peer_id"]
+    try:
+        await app.storage.get_peer_by_id(cid)
+    except KeyError:
+        # Нова / очищена сесія — access_hash з кешу, без CheckChatInvite.
+        await app.storage.update_peers([(cid, cached["access_hash"], cached["peer_type"], None)])
+    return cid
+
+
+async def invalidate_chat_target(app, channel: str) -> None:
+    """Скинути кеш резолву каналу для акаунта app (після PEER_ID_INVALID тощо)."""
+    from parser.storage.db_pool import db_write
+    from parser.storage.chat_targets import delete_chat_target
+
+    channel_key = normalize_channel_key(channel)
+    if channel_key and await db_write(delete_chat_target, channel_key, _account_key(app)):
+        logger.info("Кеш резолву %s скинуто (%s)", channel, _account_key(app))
+
+
 async def resolve_pyrogram_chat_target(app, channel: str) -> PyrogramChatTarget:
     """
     Резолвить канал/групу для Pyrogram.
-    Invite: ніколи не повертає None (preview без id) — CheckChatInvite / join_chat.
+    Invite: ніколи не повертає None (preview без id) — кеш parser_chat_targets,
+    на промах — CheckChatInvite / join_chat.
     """
     ref = resolve_pyrogram_chat_ref(channel)
     if not is_invite_link(ref):
         return ref
 
+    channel_key = normalize_channel_key(channel)
+    if PARSER_CHAT_TARGET_TTL_HOURS > 0 and channel_key:
+        try:
+            cid = await _cached_chat_target(app, channel_key)
+        except Exception as cache_err:
+            logger.warning("Кеш резолву %s недоступний: %s", channel, cache_err)
+            cid = None
+        if cid is not None:
+            metrics.inc("chat_target_cache_hits")
+            return cid
+        metrics.inc("chat_target_cache_misses")
+
+    cid = await _resolve_invite_uncached(app, channel, ref)
+    if PARSER_CHAT_TARGET_TTL_HOURS > 0 and channel_key:
+        try:
+            await _remember_chat_target(app, channel_key, cid)
+        except Exception as cache_err:
+            logger.warning("Не вдалося зберегти резолв %s: %s", channel, cache_err)
+    return cid
+
+
+async def _resolve_invite_uncached(app, channel: str, ref: str) -> int:
     invite_hash = extract_invite_hash(ref)
     if invite_hash:
         try:
@@ -1,16 +1,87 @@
-"""Утиліти обробки тексту оголошень."""
+"""
+Утиліти обробки тексту оголошень.
+
+Один пост проходить extract_title, fingerprint-и дедупу, parse_price, detect_condition,
+а при approve — ще раз polish / format опису. Спільні проміжні форми тексту (lower, без URL,
+без емодзі, lines, форми для fingerprint) рахує PostText один раз на текст — post_text()
+повертає той самий об'єкт для того самого рядка. Чисті перетворення str → str мемоізовані.
+"""
 
 import re
+import unicodedata
+from functools import cached_property, lru_cache
 from typing import Optional
 
 from parser.config.channels import CHANNELS_STRIP_TRAILING_LINK, normalize_channel_key
 from parser.core.patterns import (
+    EMOJI_BLOCK_RE,
     FREE_GIVEAWAY_RE,
     GENERIC_TITLE_RE,
-    ONE_EMOJI_RE,
+    LEADING_EMOJI_RE,
     PRICE_RE,
 )
 
+_TEXT_MEMO_SIZE = 2048
+
+_LINE_SPLIT_RE = re.compile(r"\n+")
+_WS_RE = re.compile(r"\s+")
+_MENTION_RE = re.compile(r"@[\w\d_]{2,}")
+# Застосовується до lower-форми — IGNORECASE не потрібен (і помітно повільніший)
+_URL_RE = re.compile(r"https?://\S+")
+# Що лишається у формі для fingerprint_parsed_text (ціни / розділювачі — так, інша пунктуація — ні)
+_FINGERPRINT_DROP_RE = re.compile(r"[^\w\s\u0400-\u04FF€$£.,:/+-]")
+_DEDUP_DROP_RE = re.compile(r"[^\w\s\u0400-\u04FF]")
+
+
+class PostText:
+    """Нормалізовані форми одного тексту; кожна рахується при першому зверненні."""
+
+    def __init__(self, raw: str):
+        self.raw = raw or ""
+
+    @cached_property
+    def lower(self) -> str:
+        return self.raw.lower()
+
+    @cached_property
+    def no_urls(self) -> str:
+        """lower без посилань (t.me / instagram / будь-які http)."""
+        return _URL_RE.sub(" ", self.lower)
+
+    @cached_property
+    def no_emoji(self) -> str:
+        return EMOJI_BLOCK_RE.sub(" ", self.no_urls)
+
+    @cached_property
+    def plain(self) -> str:
+        """Форма для fingerprint_parsed_text: без URL, емодзі та зайвої пунктуації, пробіли згорнуто."""
+        return _WS_RE.sub(" ", _FINGERPRINT_DROP_RE.sub(" ", self.no_emoji)).strip()
+
+    @cached_property
+    def dedup_form(self) -> str:
+        """Форма для fingerprint_title_desc: ще й без діакритики, @згадок і пунктуації."""
+        s = self.lower
+        try:
+            s = unicodedata.normalize("NFKD", s)
+            s = "".join(c for c in s if not unicodedata.combining(c))
+        except Exception:
+            pass
+        s = EMOJI_BLOCK_RE.sub(" ", s)
+        s = _URL_RE.sub(" ", s)
+        s = _MENTION_RE.sub(" ", s)
+        s = _DEDUP_DROP_RE.sub(" ", s)
+        return _WS_RE.sub(" ", s).strip()
+
+    @cached_property
+    def lines(self) -> tuple[str, ...]:
+        """Непорожні рядки (strip) тексту без крайових пробілів."""
+        return tuple(ln.strip() for ln in _LINE_SPLIT_RE.split(self.raw.strip()) if ln.strip())
+
+
+@lru_cache(maxsize=_TEXT_MEMO_SIZE)
+def post_text(text: str) -> PostText:
+    return PostText(text)
+
 
 def to_plain_str(s) -> str:
     if s is None:
@@ -19,7 +90,7 @@ def to_plain_str(s) -> str:
 
 
 def detect_lang(text: str) -> str:
-    t = text.lower()
+    t = post_text(text).lower
     uk = len(re.findall(r"[іїєґ']", t))
     ru = len(re.findall(r"[ыэё]", t))
     return "uk" if uk >= ru else "ru"
@@ -40,7 +111,7 @@ def parse_price(text: str) -> tuple[Optional[str], Optional[str], bool]:
                 currency = "EUR"
             return raw, currency, False
 
-    lower = text.lower()
+    lower = post_text(text).lower
     if re.search(r"договір|договор|торг\b|по домовленост", lower):
         return "Договірна", None, False
 
@@ -55,12 +126,13 @@ def _is_generic_title(title: str) -> bool:
     return len(t) < 25 and bool(GENERIC_TITLE_RE.match(t))
 
 
+@lru_cache(maxsize=_TEXT_MEMO_SIZE)
 def extract_title(text: str) -> str:
     from parser.core.patterns import GREETING_TITLE_RE, PRICE_RE
     from parser.marketplace_categories import clean_title
 
+    lines = post_text(text).lines
     text = text.strip()
-    lines = [ln.strip() for ln in re.split(r"\n+", text) if ln.strip()]
     candidates: list[str] = []
 
     first = re.split(r"[\n!?]|(?<=[.])\s", text, maxsplit=1)[0].strip()
@@ -140,16 +212,21 @@ _LEADING_PRICE_RE = re.compile(
 )
 
 
+_TRAILING_MENTION_RE = re.compile(r"(?:^|\n)\s*@[a-zA-Z0-9_]{4,32}\s*$", re.MULTILINE)
+_MANY_NEWLINES_RE = re.compile(r"\n{3,}")
+
+
+@lru_cache(maxsize=_TEXT_MEMO_SIZE)
 def strip_listing_body_metadata(text: str) -> str:
     """Прибрати з опису ціну на початку, автора, emoji-алерти (ціна — окреме поле)."""
     t = (text or "").strip()
     if not t:
         return ""
     t = _AUTHOR_IN_BODY_RE.sub("", t).strip()
-    t = re.sub(r"(?:^|\n)\s*@[a-zA-Z0-9_]{4,32}\s*$", "", t, flags=re.MULTILINE)
+    t = _TRAILING_MENTION_RE.sub("", t)
     # Алерти на кшталт 🚨 на початку
     while True:
-        m = re.match(rf"^\s*(?:{ONE_EMOJI_RE.pattern}\s*)+", t)
+        m = LEADING_EMOJI_RE.match(t)
         if not m:
             break
         t = t[m.end() :].strip()
@@ -158,7 +235,7 @@ def strip_listing_body_metadata(text: str) -> str:
         if nxt == t:
             break
         t = nxt
-    t = re.sub(r"\n{3,}", "\n\n", t)
+    t = _MANY_NEWLINES_RE.sub("\n\n", t)
     return t.strip()
 
 
@@ -239,6 +316,7 @@ def rebuild_description_from_raw(
     return "\n".join(parts).strip()
 
 
+@lru_cache(maxsize=_TEXT_MEMO_SIZE)
 def polish_listing_description(
     description: str,
     *,
@@ -260,6 +338,18 @@ def polish_listing_description(
     return base or format_listing_description(strip_listing_body_metadata(raw_text or ""))
 
 
+_TG_LINK_RE = re.compile(r"https?://t\.me/\S+", re.IGNORECASE)
+# «Продам авто» як перший рядок, якщо далі є суть (модель) — прибрати заглушку
+_PLACEHOLDER_FIRST_LINE_RE = re.compile(
+    r"(?is)^(продам|продаю|отдам|віддам)\s+"
+    r"(?:авто|машину|автомобиль|автомобіль|товар)\s*[\n\r]+"
+)
+_PROMO_LINE_RE = re.compile(r"(?im)^(?:підпишіть?ся|подпишитесь|subscribe|реклама\s+канала).*$")
+_TRAILING_SPACES_RE = re.compile(r"[ \t]+\n")
+_MANY_SPACES_RE = re.compile(r"[ \t]{2,}")
+
+
+@lru_cache(maxsize=_TEXT_MEMO_SIZE)
 def format_listing_description(description: str, *, max_len: int = 1800) -> str:
     """
     Охайний опис для маркетплейсу: прибрати промо, згорнути порожні рядки,
@@ -272,23 +362,12 @@ def format_listing_description(description: str, *, max_len: int = 1800) -> str:
         return ""
     t = strip_listing_body_metadata(t)
     t = GREETING_TITLE_RE.sub("", t, count=1).strip()
-    t = re.sub(r"https?://t\.me/\S+", "", t, flags=re.I)
-    # «Продам авто» як перший рядок, якщо далі є суть (модель) — прибрати заглушку
-    t = re.sub(
-        r"(?is)^(продам|продаю|отдам|віддам)\s+"
-        r"(?:авто|машину|автомобиль|автомобіль|товар)\s*[\n\r]+",
-        "",
-        t,
-        count=1,
-    ).strip()
-    t = re.sub(
-        r"(?im)^(?:підпишіть?ся|подпишитесь|subscribe|реклама\s+канала).*$",
-        "",
-        t,
-    )
-    t = re.sub(r"[ \t]+\n", "\n", t)
-    t = re.sub(r"\n{3,}", "\n\n", t)
-    t = re.sub(r"[ \t]{2,}", " ", t).strip()
+    t = _TG_LINK_RE.sub("", t)
+    t = _PLACEHOLDER_FIRST_LINE_RE.sub("", t, count=1).strip()
+    t = _PROMO_LINE_RE.sub("", t)
+    t = _TRAILING_SPACES_RE.sub("\n", t)
+    t = _MANY_NEWLINES_RE.sub("\n\n", t)
+    t = _MANY_SPACES_RE.sub(" ", t).strip()
     if len(t) <= max_len:
         return t
 
@@ -306,7 +385,7 @@ def detect_condition(text: str, category: str) -> Optional[str]:
         return "new"
     if category == "realestate":
         return None
-    lower = text.lower()
+    lower = post_text(text).lower
     if re.search(r"\bнов(ий|ая|ое|і)\b|brand.?new|у коробці|в упаковке|запечатан", lower):
         return "new"
     return "used"
@@ -7,6 +7,9 @@ AI при approve має повертати саме ці id, інакше ог
 from __future__ import annotations
 
 import re
+from functools import lru_cache
+
+from parser.core.keyword_matcher import KeywordMatcher
 
 # category_id -> { sub_id: "RU label for AI" | None for leaf-only categories }
 MARKETPLACE_TAXONOMY: dict[str, dict[str, str] | None] = {
@@ -372,23 +375,25 @@ _GENERIC_SUB_IDS = frozenset({
 })
 
 
-def _keyword_hit(kw: str, lower: str) -> bool:
+@lru_cache(maxsize=1)
+def _sub_keyword_matcher() -> KeywordMatcher:
     """
-    Збіг ключового слова без false positive (шин⊂машин, игр⊂игрушк тощо).
-    Фрази з пробілом — звичайний substring; інакше — не всередині слова.
+    Фрази з пробілом — substring; інакше не всередині слова (шин⊂машин, игр⊂игрушк).
+    Вага — довші ключі важать більше (епіляц > «сайт »).
     """
-    kw = (kw or "").strip().lower()
-    if not kw or not lower:
-        return False
-    if " " in kw:
-        return kw in lower
-    return bool(
-        re.search(
-            rf"(?<![a-zа-яёіїєґ0-9]){re.escape(kw)}",
-            lower,
-            re.IGNORECASE,
-        )
-    )
+    entries = []
+    for category, subs in MARKETPLACE_SUB_KEYWORDS.items():
+        for sub_id, keywords in subs.items():
+            for kw in keywords:
+                norm = (kw or "").strip().lower()
+                entries.append(((category, sub_id), norm, max(1, len(kw) // 4), " " not in norm))
+    return KeywordMatcher(entries)
+
+
+@lru_cache(maxsize=256)
+def _sub_keyword_scores(lower: str) -> dict:
+    """Один прохід на текст для всіх категорій (_refine_subcategory питає 2–3 рази)."""
+    return _sub_keyword_matcher().scores(lower)
 
 
 def detect_marketplace_subcategory(category: str, text: str) -> str | None:
@@ -397,18 +402,14 @@ def detect_marketplace_subcategory(category: str, text: str) -> str | None:
     if not subs:
         return None
 
-    lower = (text or "").lower()
+    scores = _sub_keyword_scores((text or "").lower())
     best_sub: str | None = None
     best_score = 0
 
-    for sub_id, keywords in subs.items():
+    for sub_id in subs:
         if sub_id in ("vacancies", "part_time", "looking_for_work"):
             continue
-        score = 0
-        for kw in keywords:
-            if _keyword_hit(kw, lower):
-                # Довші ключі важать більше (епіляц > загальне «сайт »)
-                score += max(1, len(kw) // 4)
+        score = scores.get((category, sub_id), 0)
         if score > best_score:
             best_score = score
             best_sub = sub_id
@@ -420,13 +421,7 @@ def subcategory_keyword_score(category: str, subcategory: str | None, text: str)
     """Наскільки subcategory підтверджена текстом (0 = AI-галюцинація)."""
     if not subcategory:
         return 0
-    keywords = (MARKETPLACE_SUB_KEYWORDS.get(category) or {}).get(subcategory) or []
-    lower = (text or "").lower()
-    score = 0
-    for kw in keywords:
-        if _keyword_hit(kw, lower):
-            score += max(1, len(kw) // 4)
-    return score
+    return _sub_keyword_scores((text or "").lower()).get((category, subcategory), 0)
 
 
 def _refine_subcategory(category: str, subcategory: str | None, text: str) -> str | None:
@@ -767,6 +762,45 @@ def resolve_marketplace_category(
     return result if result[0] else ("home", "other")
 
 
+# Символи, для яких re.IGNORECASE і str.lower() розходяться на літерах назв міст
+# (İ, ı, ſ, старі варіанти кирилиці) — з ними перевірка «stem in lower» неточна.
+_CITY_CASEFOLD_UNSAFE_RE = re.compile("[\u0130\u0131\u017f\u1c80-\u1c88]")
+
+
+@lru_cache(maxsize=1)
+def _title_city_patterns() -> tuple[tuple[str, re.Pattern], ...]:
+    """(stem у lower, патерн) для чистки title — від довших до коротших, порядок важливий."""
+    city_tokens: set[str] = set()
+    try:
+        from parser.core.location import _KNOWN_CITIES
+        from utils.location_normalization import CITY_SYNONYMS
+
+        city_tokens.update(_KNOWN_CITIES)
+        city_tokens.update(CITY_SYNONYMS.keys())
+    except Exception:
+        pass
+    return tuple(
+        (
+            city.lower(),
+            re.compile(rf"(?i)(?:^|[\s,./|(])(?:в|у|in|из|із)?\s*{re.escape(city)}\w{{0,6}}\b"),
+        )
+        for city in sorted(city_tokens, key=len, reverse=True)
+        if len(city) >= 3
+    )
+
+
+def _strip_title_cities(t: str) -> str:
+    # sub лише для міст, що є в рядку: ~130 regex-проходів → ~130 перевірок підрядка.
+    check_all = bool(_CITY_CASEFOLD_UNSAFE_RE.search(t))
+    lower = t.lower()
+    for stem, city_re in _title_city_patterns():
+        if check_all or stem in lower:
+            nxt = city_re.sub(" ", t)
+            if nxt != t:
+                t, lower = nxt, nxt.lower()
+    return t
+
+
 def clean_title(title: str, raw_text: str = "") -> str:
     """
     Заголовок без префіксів «продам», привітань, ціни та міста.
@@ -822,24 +856,7 @@ def clean_title(title: str, raw_text: str = "") -> str:
             t,
         )
 
-        city_tokens: set[str] = set()
-        try:
-            from parser.core.location import _KNOWN_CITIES
-            from utils.location_normalization import CITY_SYNONYMS
-
-            city_tokens.update(_KNOWN_CITIES)
-            city_tokens.update(CITY_SYNONYMS.keys())
-        except Exception:
-            pass
-        for city in sorted(city_tokens, key=len, reverse=True):
-            if len(city) < 3:
-                continue
-            stem = re.escape(city)
-            t = re.sub(
-                rf"(?i)(?:^|[\s,./|(])(?:в|у|in|из|із)?\s*{stem}\w{{0,6}}\b",
-                " ",
-                t,
-            )
+        t = _strip_title_cities(t)
         t = re.sub(r"(?i)\b(?:germany|deutschland|нрв|nrw)\b", " ", t)
         t = re.sub(r"\b\d{5}\b", " ", t)
         # Хвости на кшталт «… — 50€» / «… Hamburg»
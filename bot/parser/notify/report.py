@@ -5,6 +5,53 @@ from __future__ import annotations
 import html
 
 
+# Порядок етапів у звіті (решта — за сумою часу).
+_STAGE_ORDER = (
+    "channel",
+    "telegram_history",
+    "dedup_prefetch",
+    "dedup",
+    "embedding_request",
+    "ai_screen",
+    "ai_screen_request",
+    "photos",
+    "photo_download",
+    "sqlite_insert",
+    "notify_rate_wait",
+    "moderation_send",
+)
+
+
+def _fmt_sec(sec: float) -> str:
+    return f"{sec * 1000:.0f}мс" if sec < 1 else f"{sec:.1f}с"
+
+
+def format_stage_summary(snapshot: dict | None, *, limit: int = 10) -> list[str]:
+    """Рядки «етап: p50 / p95 / сума (n)» зі знімка parser.core.metrics."""
+    stages = (snapshot or {}).get("stages") or {}
+    if not stages:
+        return []
+    order = {name: i for i, name in enumerate(_STAGE_ORDER)}
+    names = sorted(
+        stages,
+        key=lambda n: (order.get(n, len(order)), -float(stages[n].get("sum_sec") or 0)),
+    )
+    lines = []
+    for name in names[:limit]:
+        st = stages[name]
+        lines.append(
+            f"• {html.escape(name)}: {_fmt_sec(st.get('p50_sec') or 0)} / "
+            f"{_fmt_sec(st.get('p95_sec') or 0)} / {_fmt_sec(st.get('sum_sec') or 0)} "
+            f"({st.get('count', 0)})"
+        )
+    counters = snapshot.get("counters") or {}
+    hits = int(counters.get("ai_screen_cache_hit") or 0)
+    calls = int(counters.get("ai_screen_api_call") or 0)
+    if hits or calls:
+        lines.append(f"• AI screen: {calls} запитів, {hits} з кешу")
+    return lines
+
+
 def format_parser_stats(
     stats: dict | None,
     *,
@@ -47,7 +94,9 @@ def format_parser_stats(
             f"⏭ Пропущено: <b>{skipped}</b>",
         ]
     )
-    if effective_lookback:
+    if stats.get("adaptive"):
+        lines.append("📥 Адаптивно: кожна група за своїм інтервалом і лімітом постів")
+    elif effective_lookback:
         lines.append(f"📥 Останні <b>{effective_lookback}</b> постів на канал")
     else:
         from parser.config.settings import PARSER_ROLLING_LOOKBACK
@@ -57,7 +106,8 @@ def format_parser_stats(
         else:
             lines.append("📍 Інкрементально (cursor + overlap)")
     if channels is not None:
-        lines.append(f"📢 Груп/каналів: <b>{channels}</b>")
+        label = "Опитувань груп" if stats.get("adaptive") else "Груп/каналів"
+        lines.append(f"📢 {label}: <b>{channels}</b>")
 
     if reasons:
         lines.append("")
@@ -65,6 +115,12 @@ def format_parser_stats(
         for reason, count in sorted(reasons.items(), key=lambda x: -x[1])[:8]:
             lines.append(f"• {html.escape(reason)}: {count}")
 
+    stage_lines = format_stage_summary(stats.get("stages"))
+    if stage_lines:
+        lines.append("")
+        lines.append("<b>⏱ Етапи (p50 / p95 / сума):</b>")
+        lines.extend(stage_lines)
+
     if errors:
         lines.append("")
         lines.append(f"⚠️ Помилок каналів: <b>{len(errors)}</b>")
@@ -77,7 +133,10 @@ def format_parser_stats(
         from parser.config.settings import PARSER_INTERVAL_MIN
 
         lines.append("")
-        lines.append(f"⏱ Наступний плановий запуск через ~{PARSER_INTERVAL_MIN} хв.")
+        if stats.get("adaptive"):
+            lines.append(f"⏱ Наступний звіт через ~{PARSER_INTERVAL_MIN} хв.")
+        else:
+            lines.append(f"⏱ Наступний плановий запуск через ~{PARSER_INTERVAL_MIN} хв.")
     else:
         lines.append("")
         lines.append(
@@ -15,15 +15,21 @@ import logging
 import os
 import time
 import traceback
+from dataclasses import replace
 from pathlib import Path
 
 from dotenv import load_dotenv
 
 from parser.config.settings import (
     FETCH_LIMIT,
+    PARSER_ADAPTIVE_POLLING,
+    PARSER_ADAPTIVE_TICK_MIN,
+    PARSER_AI_BATCH_ENABLED,
+    PARSER_AI_BATCH_INTERVAL_MIN,
     PARSER_AUTO_APPROVE_ENABLED,
     PARSER_DEDUP_ENABLED,
     PARSER_INTERVAL_MIN,
+    PARSER_METRICS_FILE,
     PARSER_ROLLING_LOOKBACK,
 )
 
@@ -33,6 +39,52 @@ logger = logging.getLogger(__name__)
 
 BOT_TOKEN: str = os.getenv("TOKEN", "")
 
+# Адаптивні тіки зливаються в один плановий звіт раз на PARSER_INTERVAL_MIN.
+_adaptive_report: dict | None = None
+_adaptive_report_since: float = 0.0
+
+
+def _moderation_notify_callback(aiogram_bot):
+    """Новий parsed_item → auto-approve (якщо увімкнено), інакше в групу модерації."""
+    from parser.notify.admin import notify_admin_group
+
+    async def notify_callback(item_data: dict):
+        if PARSER_AUTO_APPROVE_ENABLED:
+            try:
+                from parser.moderation.auto_approve import maybe_auto_approve_and_notify
+
+                if await maybe_auto_approve_and_notify(aiogram_bot, item_data):
+                    return
+            except Exception:
+                logger.exception(
+                    "auto-approve parse-time failed parsed_item %s",
+                    item_data.get("id"),
+                )
+        await notify_admin_group(aiogram_bot, item_data)
+
+    return notify_callback
+
+
+def _accumulate_adaptive_report(stats: dict | None) -> dict | None:
+    """Додає тік до накопиченого звіту; повертає звіт, коли минуло PARSER_INTERVAL_MIN."""
+    global _adaptive_report, _adaptive_report_since
+    from parser.core.pyrogram_accounts import merge_channel_stats
+
+    now = time.monotonic()
+    if _adaptive_report is None:
+        _adaptive_report = {"added": 0, "skipped": 0, "reasons": {}, "errors": [], "channels": 0, "adaptive": True}
+        _adaptive_report_since = now
+    if stats:
+        merge_channel_stats(_adaptive_report, stats, channel="", city="")
+        _adaptive_report["errors"].extend(stats.get("errors") or [])
+        _adaptive_report["channels"] += int(stats.get("channels") or 0)
+        if stats.get("stages"):
+            _adaptive_report["stages"] = stats["stages"]
+    if now - _adaptive_report_since < PARSER_INTERVAL_MIN * 60:
+        return None
+    report, _adaptive_report = _adaptive_report, None
+    return report
+
 
 # ──────────────────────────────────────────────
 # Основна функція одного циклу парсингу
@@ -55,7 +107,6 @@ async def run_parser_cycle(
 
     from aiogram import Bot
     from parser.notify.admin import (
-        notify_admin_group,
         notify_parser_channel_errors,
         notify_parser_error_admins,
         notify_parser_scheduled_report,
@@ -90,6 +141,8 @@ async def run_parser_cycle(
     stats: dict | None = None
     effective_limit: int | None = None
     scheduled_skip_note: str | None = None
+    # Плановий тік без змін — адаптивний розклад бере лише канали, чий час настав.
+    adaptive = scheduled and PARSER_ADAPTIVE_POLLING and fetch_limit is None and not ignore_cursor
 
     try:
         await asyncio.to_thread(ensure_parser_storage)
@@ -125,23 +178,20 @@ async def run_parser_cycle(
             await _maybe_notify_no_accounts(msg)
             return None
 
+        from parser.config.channels import CHANNELS
+        from parser.core.embedding_index import reset_embedding_index
+        from parser.core.metrics import metrics
+        from parser.core.poll_schedule import plan_due_channels
         from parser.core.runner import ParseRunConfig, parse_run, run_all_channels
         from parser.core.services_ai_runner import ServicesParseRunConfig, services_parse_run
         from parser.storage.connection import parser_db_cycle
+        from parser.storage.ai_screen_cache import prune_ai_screen_cache
+        from parser.storage.ai_screen_labels import prune_ai_screen_labels
+        from parser.storage.embedding_cache import prune_embedding_cache
+        from parser.storage.listing_dedup import reset_ai_context_snapshot
+        from parser.storage.parsed_items import reset_parsed_item_state_cache
 
-        async def notify_callback(item_data: dict):
-            if PARSER_AUTO_APPROVE_ENABLED:
-                try:
-                    from parser.moderation.auto_approve import maybe_auto_approve_and_notify
-
-                    if await maybe_auto_approve_and_notify(aiogram_bot, item_data):
-                        return
-                except Exception:
-                    logger.exception(
-                        "auto-approve parse-time failed parsed_item %s",
-                        item_data.get("id"),
-                    )
-            await notify_admin_group(aiogram_bot, item_data)
+        notify_callback = _moderation_notify_callback(aiogram_bot)
 
         run_cfg = None
         services_cfg = None
@@ -162,11 +212,38 @@ async def run_parser_cycle(
                 fetch_limit=effective_limit,
                 ignore_cursor=True,
             )
+        if scheduled and PARSER_AI_BATCH_ENABLED:
+            # Плановий цикл — AI screen пачками (services-канали лишаються синхронними).
+            run_cfg = replace(run_cfg or ParseRunConfig(), defer_ai_screen=True)
         try:
             async with GLOBAL_PARSER_RUN_LOCK:
                 with parser_db_cycle():
                     await asyncio.to_thread(ensure_parser_storage)
-                    if effective_limit:
+                    plan = None
+                    if adaptive:
+                        plan = await asyncio.to_thread(
+                            plan_due_channels, dict(CHANNELS), effective_limit or FETCH_LIMIT
+                        )
+                        if not plan.channels:
+                            logger.debug("Адаптивний тік: жоден канал ще не настав")
+                            return None
+                    # Fuzzy-індекс перечитується раз на цикл, далі лише доповнюється.
+                    reset_embedding_index()
+                    reset_parsed_item_state_cache()
+                    reset_ai_context_snapshot()
+                    metrics.reset()
+                    await asyncio.to_thread(prune_embedding_cache)
+                    await asyncio.to_thread(prune_ai_screen_cache)
+                    await asyncio.to_thread(prune_ai_screen_labels)
+                    if plan is not None:
+                        logger.info(
+                            "🔍 Адаптивний тік: %s з %s груп (очікується %.0f…%.0f нових постів)…",
+                            len(plan.channels),
+                            plan.total,
+                            min(plan.expected_posts.values()),
+                            max(plan.expected_posts.values()),
+                        )
+                    elif effective_limit:
                         dedup_note = "dedup увімкнено" if PARSER_DEDUP_ENABLED else "dedup вимкнено (лише message_id)"
                         logger.info(
                             "🔍 Парсинг усіх груп (останні %s постів, %s)…",
@@ -180,7 +257,13 @@ async def run_parser_cycle(
                         )
                     async with parse_run(run_cfg):
                         async with services_parse_run(services_cfg):
-                            stats = await run_all_channels(notify_callback)
+                            stats = await run_all_channels(
+                                notify_callback,
+                                channels=plan.channels if plan is not None else None,
+                                weights=plan.expected_posts if plan is not None else None,
+                            )
+                stats["stages"] = metrics.snapshot()
+                await asyncio.to_thread(metrics.export, PARSER_METRICS_FILE)
                 logger.info(
                     "✅ Парсинг завершено: +%s нових, пропущено %s, груп %s",
                     stats["added"],
@@ -227,13 +310,16 @@ async def run_parser_cycle(
             )
         return stats
     finally:
-        if scheduled:
+        report_stats = stats
+        if adaptive:
+            report_stats = _accumulate_adaptive_report(stats)
+        if scheduled and (report_stats is not None or not adaptive):
             try:
                 await notify_parser_scheduled_report(
                     aiogram_bot,
-                    stats,
-                    lookback=effective_limit,
-                    skip_note=scheduled_skip_note,
+                    report_stats,
+                    lookback=None if adaptive else effective_limit,
+                    skip_note=None if adaptive and report_stats and report_stats["channels"] else scheduled_skip_note,
                 )
             except Exception as report_err:
                 logger.warning("Не вдалося надіслати звіт планового парсингу: %s", report_err)
@@ -253,6 +339,42 @@ async def run_services_ai_parser_cycle(
 # Реєстрація задачі в apscheduler (для інтеграції з main.py)
 # ──────────────────────────────────────────────
 
+def _scheduled_interval_min() -> float:
+    """Адаптивно — тік (канали мають власні інтервали), інакше PARSER_INTERVAL_MIN."""
+    if PARSER_ADAPTIVE_POLLING:
+        return float(min(PARSER_ADAPTIVE_TICK_MIN, PARSER_INTERVAL_MIN))
+    return PARSER_INTERVAL_MIN
+
+
+async def run_ai_batch_cycle() -> dict | None:
+    """Відправка / отримання AI-пачок (parser.ai.screen_batch) з власним aiogram Bot."""
+    if not BOT_TOKEN:
+        logger.error("TOKEN не встановлено в .env — AI batch не може сповіщати адмінів")
+        return None
+
+    from aiogram import Bot
+    from parser.ai.screen_batch import run_screen_batch_cycle
+
+    aiogram_bot = Bot(token=BOT_TOKEN)
+    try:
+        stats = await run_screen_batch_cycle(_moderation_notify_callback(aiogram_bot))
+        if any(stats.values()):
+            logger.info(
+                "🧺 AI batch: відправлено %s, прийнято %s, відхилено %s, fallback %s, у черзі знову %s",
+                stats["submitted"],
+                stats["accepted"],
+                stats["rejected"],
+                stats["fallback"],
+                stats["requeued"],
+            )
+        return stats
+    except Exception:
+        logger.exception("AI batch cycle failed")
+        return None
+    finally:
+        await aiogram_bot.session.close()
+
+
 def register_parser_job(scheduler):
     """
     Реєструє задачу парсингу в apscheduler.
@@ -262,17 +384,32 @@ def register_parser_job(scheduler):
         from parser.scheduler import register_parser_job
         register_parser_job(scheduler)
     """
+    interval_min = _scheduled_interval_min()
     scheduler.add_job(
         run_parser_cycle,
         trigger="interval",
-        minutes=PARSER_INTERVAL_MIN,
+        minutes=interval_min,
         id="telegram_parser",
         replace_existing=True,
-        misfire_grace_time=max(60, int(PARSER_INTERVAL_MIN * 60)),
+        misfire_grace_time=max(60, int(interval_min * 60)),
         max_instances=1,
         kwargs={"scheduled": True},
     )
-    logger.info(f"✅ Parser scheduler зареєстровано (усі групи, інтервал: {PARSER_INTERVAL_MIN} хв)")
+    if PARSER_ADAPTIVE_POLLING:
+        logger.info(f"✅ Parser scheduler зареєстровано (адаптивно, тік: {interval_min} хв)")
+    else:
+        logger.info(f"✅ Parser scheduler зареєстровано (усі групи, інтервал: {PARSER_INTERVAL_MIN} хв)")
+    if PARSER_AI_BATCH_ENABLED:
+        scheduler.add_job(
+            run_ai_batch_cycle,
+            trigger="interval",
+            minutes=PARSER_AI_BATCH_INTERVAL_MIN,
+            id="parser_ai_batch",
+            replace_existing=True,
+            misfire_grace_time=max(60, int(PARSER_AI_BATCH_INTERVAL_MIN * 60)),
+            max_instances=1,
+        )
+        logger.info(f"✅ AI batch screen зареєстровано (кожні {PARSER_AI_BATCH_INTERVAL_MIN} хв)")
     try:
         from parser.moderation.auto_approve import register_auto_approve_job
 
@@ -292,14 +429,16 @@ def register_services_ai_parser_job(scheduler):
 
 async def _standalone_loop():
     """Нескінченний цикл для самостійного запуску."""
-    interval_sec = PARSER_INTERVAL_MIN * 60
+    interval_min = _scheduled_interval_min()
     logger.info(
-        f"🚀 Парсер запущено в standalone-режимі. Інтервал: {PARSER_INTERVAL_MIN} хв."
+        f"🚀 Парсер запущено в standalone-режимі. Інтервал: {interval_min} хв."
     )
     while True:
         await run_parser_cycle(scheduled=True)
-        logger.info(f"⏳ Наступний запуск через {PARSER_INTERVAL_MIN} хвилин...")
-        await asyncio.sleep(interval_sec)
+        if PARSER_AI_BATCH_ENABLED:
+            await run_ai_batch_cycle()
+        logger.info(f"⏳ Наступний запуск через {interval_min} хвилин...")
+        await asyncio.sleep(interval_min * 60)
 
 
 if __name__ == "__main__":
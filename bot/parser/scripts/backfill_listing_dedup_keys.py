@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Разовий backfill Listing.dedupKey для наявних оголошень.
+
+За замовчуванням — усі активні без ключа; --all перераховує ключ для кожного рядка
+(після зміни fingerprint_title_desc). Далі ключі підтримує сам бот.
+
+  python3 -m parser.scripts.backfill_listing_dedup_keys
+  python3 -m parser.scripts.backfill_listing_dedup_keys --all -v
+
+Код виходу 1 — таблиці Listing немає.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
+
+from parser.storage.connection import get_connection  # noqa: E402
+from parser.storage.listing_dedup import (  # noqa: E402
+    ensure_listing_dedup_schema,
+    refresh_listing_dedup_keys,
+)
+
+
+def _key_stats() -> tuple[int, int, int]:
+    conn = get_connection()
+    row = conn.execute(
+        """
+        SELECT COUNT(*),
+               SUM(CASE WHEN status = 'active' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'active' AND dedupKey IS NULL THEN 1 ELSE 0 END)
+        FROM Listing
+        """
+    ).fetchone()
+    conn.close()
+    return int(row[0] or 0), int(row[1] or 0), int(row[2] or 0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--all", action="store_true", help="перерахувати dedupKey для всіх оголошень")
+    ap.add_argument("--batch", type=int, default=500, help="рядків на транзакцію")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    ensure_listing_dedup_schema()
+    conn = get_connection()
+    has_listing = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Listing'"
+    ).fetchone()
+    conn.close()
+    if not has_listing:
+        print("Таблиці Listing немає")
+        return 1
+
+    total, active, missing = _key_stats()
+    print(f"Listing: {total}, активних: {active}, активних без dedupKey: {missing}")
+    started = time.perf_counter()
+    updated = refresh_listing_dedup_keys(limit=None, all_rows=args.all, batch=max(1, args.batch))
+    elapsed = time.perf_counter() - started
+    _, _, missing = _key_stats()
+    print(f"Оновлено: {updated} за {elapsed:.2f} с; активних без dedupKey: {missing}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк detect_cities_in_text (trie-індекс) проти старої версії з regex на кожен синонім.
+Корпус — raw_text з parsed_items; якщо БД порожня — синтетичні тексти з синонімами.
+
+  python3 -m parser.scripts.bench_city_detect
+  python3 -m parser.scripts.bench_city_detect --limit 5000 --repeat 3 -v
+
+Код виходу 1 — результати розходяться.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
+
+from parser.core.location import (  # noqa: E402
+    _KNOWN_CITIES,
+    _WIDE_SOURCE_CITIES,
+    _ascii_fold,
+    _detect_cities_cached,
+    canonicalize_known_city,
+    detect_cities_in_text,
+)
+from utils.location_normalization import CITY_SYNONYMS  # noqa: E402
+
+
+def _legacy_detect_cities_in_text(text: str) -> list[str]:
+    """Попередня реалізація (еталон)."""
+    if not text:
+        return []
+    lower = text.lower()
+    lower_ascii = _ascii_fold(lower)
+    found: list[str] = []
+    for syn, canon in CITY_SYNONYMS.items():
+        if len(syn) < 3:
+            continue
+        if canon.lower() in _WIDE_SOURCE_CITIES:
+            continue
+        pattern = rf"(?<!\w){re.escape(syn)}\w{{0,4}}(?!\w)"
+        pattern_ascii = rf"(?<!\w){re.escape(_ascii_fold(syn))}\w{{0,4}}(?!\w)"
+        if re.search(pattern, lower) or re.search(pattern_ascii, lower_ascii):
+            name = canonicalize_known_city(canon)
+            if name and name not in found:
+                found.append(name)
+    for city in _KNOWN_CITIES:
+        c_lower = city.lower()
+        c_ascii = _ascii_fold(c_lower)
+        pattern = rf"(?<!\w){re.escape(c_lower)}\w{{0,4}}(?!\w)"
+        pattern_ascii = rf"(?<!\w){re.escape(c_ascii)}\w{{0,4}}(?!\w)"
+        if re.search(pattern, lower) or re.search(pattern_ascii, lower_ascii):
+            if city not in found:
+                found.append(city)
+    return found
+
+
+def _db_corpus(limit: int) -> list[str]:
+    from parser.storage.connection import get_connection
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            """
+            SELECT raw_text FROM parsed_items
+            WHERE raw_text IS NOT NULL AND TRIM(raw_text) != ''
+            ORDER BY id DESC LIMIT ?
+            """,
+            (max(1, int(limit)),),
+        ).fetchall()
+    except Exception as e:
+        print(f"parsed_items недоступна: {e}", file=sys.stderr)
+        return []
+    finally:
+        conn.close()
+    return [str(row[0]) for row in rows]
+
+
+def _synthetic_corpus(n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    keys = list(CITY_SYNONYMS) + [c.lower() for c in _KNOWN_CITIES] + list(_KNOWN_CITIES)
+    suffixes = ["", "е", "і", "у", "ом", "er", "ському", "ss"]
+    filler = (
+        "Продам диван у гарному стані, самовивіз. Ціна 50€, торг. "
+        "Віддам дитячі речі, пишіть в особисті. Шукаю майстра манікюру. "
+    ).split()
+    texts: list[str] = []
+    for _ in range(n):
+        words = rng.sample(filler, k=rng.randint(8, len(filler)))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keys) + rng.choice(suffixes))
+        texts.append(" ".join(words))
+    return texts
+
+
+def _time(fn, texts: list[str], repeat: int) -> float:
+    """мс на текст (найкращий з repeat проходів)."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        _detect_cities_cached.cache_clear()
+        started = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000 / max(1, len(texts))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Бенчмарк і паритет detect_cities_in_text.")
+    ap.add_argument("--limit", type=int, default=2000, help="Рядків parsed_items.raw_text (default 2000)")
+    ap.add_argument("--synthetic", type=int, default=0, help="Додати N синтетичних текстів")
+    ap.add_argument("--repeat", type=int, default=3, help="Проходів для заміру (default 3)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Усі розбіжності")
+    args = ap.parse_args()
+
+    texts = _db_corpus(args.limit)
+    source = f"parsed_items ({len(texts)})"
+    if args.synthetic or not texts:
+        extra = _synthetic_corpus(args.synthetic or 2000, seed=7)
+        texts.extend(extra)
+        source += f" + синтетичні ({len(extra)})"
+
+    mismatches = 0
+    for text in texts:
+        old, new = _legacy_detect_cities_in_text(text), detect_cities_in_text(text)
+        if old != new:
+            mismatches += 1
+            if args.verbose or mismatches <= 20:
+                print(f"MISMATCH {text[:80]!r}: old={old} new={new}", file=sys.stderr)
+
+    legacy_ms = _time(_legacy_detect_cities_in_text, texts, args.repeat)
+    index_ms = _time(detect_cities_in_text, texts, args.repeat)
+    print(
+        f"корпус: {source}; розбіжностей: {mismatches}; "
+        f"regex {legacy_ms:.3f} мс/текст → індекс {index_ms:.3f} мс/текст "
+        f"(×{legacy_ms / index_ms if index_ms else float('inf'):.0f})"
+    )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Мікробенчмарк і паритет нормалізації тексту (parser.core.text, fingerprint-и parsed_items)
+проти попередньої реалізації: окремі функції та повний шлях поста (парсинг + повтор при approve).
+
+Корпус — JSONL {"channel", "text"} (--corpus, за замовчуванням database/parser_text_corpus.jsonl);
+якщо файлу немає — parsed_items.raw_text, якщо й БД порожня — синтетичні пости.
+
+  python3 -m parser.scripts.bench_text_pipeline
+  python3 -m parser.scripts.bench_text_pipeline --save-corpus database/parser_text_corpus.jsonl --limit 5000
+  python3 -m parser.scripts.bench_text_pipeline --repeat 5 -v
+
+Код виходу 1 — результати розходяться.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import time
+import unicodedata
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
+
+from parser.config.settings import REPO_ROOT  # noqa: E402
+from parser.core import text as text_mod  # noqa: E402
+from parser.core.patterns import GREETING_TITLE_RE, ONE_EMOJI_RE, PRICE_RE  # noqa: E402
+from parser.core.text import (  # noqa: E402
+    _AUTHOR_IN_BODY_RE,
+    _LEADING_PRICE_RE,
+    _description_looks_unpolished,
+    _is_generic_title,
+    clean_channel_post_text,
+    enrich_description,
+    extract_description,
+    extract_title,
+    format_listing_description,
+    polish_listing_description,
+    rebuild_description_from_raw,
+    strip_listing_body_metadata,
+)
+from parser import marketplace_categories  # noqa: E402
+from parser.marketplace_categories import clean_title  # noqa: E402
+from parser.storage.parsed_items import fingerprint_parsed_text, fingerprint_title_desc  # noqa: E402
+
+_DEFAULT_CORPUS = REPO_ROOT / "database" / "parser_text_corpus.jsonl"
+
+
+# ── Попередня реалізація (еталон) ─────────
+
+
+def _legacy_strip_title_cities(t: str) -> str:
+    """Чистка міст у clean_title: множина й сортування на кожен виклик, sub для кожного міста."""
+    city_tokens: set[str] = set()
+    from parser.core.location import _KNOWN_CITIES
+    from utils.location_normalization import CITY_SYNONYMS
+
+    city_tokens.update(_KNOWN_CITIES)
+    city_tokens.update(CITY_SYNONYMS.keys())
+    for city in sorted(city_tokens, key=len, reverse=True):
+        if len(city) < 3:
+            continue
+        stem = re.escape(city)
+        t = re.sub(rf"(?i)(?:^|[\s,./|(])(?:в|у|in|из|із)?\s*{stem}\w{{0,6}}\b", " ", t)
+    return t
+
+
+@contextmanager
+def _legacy_mode():
+    current = marketplace_categories._strip_title_cities
+    marketplace_categories._strip_title_cities = _legacy_strip_title_cities
+    try:
+        yield
+    finally:
+        marketplace_categories._strip_title_cities = current
+
+
+def _legacy_fingerprint_parsed_text(raw_text: str) -> str:
+    t = (raw_text or "").lower()
+    t = re.sub(r"https?://t\.me/\S+", " ", t, flags=re.IGNORECASE)
+    t = re.sub(r"https?://(?:www\.)?instagram\.com/\S+", " ", t, flags=re.IGNORECASE)
+    t = re.sub(r"https?://\S+", " ", t)
+    t = re.sub(
+        r"[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F600-\U0001F64F"
+        r"\U0001F680-\U0001F6FF\U0001F900-\U0001F9FF]+",
+        " ",
+        t,
+    )
+    t = re.sub(r"[^\w\s\u0400-\u04FF€$£.,:/+-]", " ", t)
+    t = re.sub(r"\s+", " ", t).strip()
+    if len(t) < 24:
+        return ""
+    return hashlib.sha256(t.encode("utf-8")).hexdigest()
+
+
+def _legacy_fingerprint_title_desc(title: str, description: str, *, price=None, is_free=False) -> str:
+    emoji_re = re.compile(
+        r"[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F600-\U0001F64F"
+        r"\U0001F680-\U0001F6FF\U0001F900-\U0001F9FF]+",
+        re.UNICODE,
+    )
+
+    def norm(s: str) -> str:
+        s = (s or "").lower()
+        try:
+            s = unicodedata.normalize("NFKD", s)
+            s = "".join(c for c in s if not unicodedata.combining(c))
+        except Exception:
+            pass
+        s = emoji_re.sub(" ", s)
+        s = re.sub(r"https?://\S+", " ", s, flags=re.IGNORECASE)
+        s = re.sub(r"@[\w\d_]{2,}", " ", s)
+        s = re.sub(r"[^\w\s\u0400-\u04FF]", " ", s)
+        s = re.sub(r"\s+", " ", s).strip()
+        return s
+
+    t = norm(title)[:220]
+    d = norm(description)[:700]
+    if is_free:
+        price_part = "free"
+    elif price and str(price).strip():
+        price_part = re.sub(r"\s+", "", str(price).lower())[:40]
+    else:
+        price_part = ""
+    if len(t) + len(d) < 14:
+        return ""
+    return hashlib.sha256(f"{t}|{d}|p:{price_part}".encode("utf-8")).hexdigest()
+
+
+def _legacy_extract_title(text: str) -> str:
+    text = text.strip()
+    lines = [ln.strip() for ln in re.split(r"\n+", text) if ln.strip()]
+    candidates: list[str] = []
+    first = re.split(r"[\n!?]|(?<=[.])\s", text, maxsplit=1)[0].strip()
+    if first:
+        candidates.append(first)
+    candidates.extend(lines[:8])
+    for cand in candidates:
+        stripped = GREETING_TITLE_RE.sub("", cand).strip()
+        if not stripped or _is_generic_title(stripped) or _is_generic_title(cand):
+            continue
+        without_price = PRICE_RE.sub("", stripped).strip(" -–—,.")
+        if len(without_price) < 4:
+            continue
+        cleaned = clean_title(cand, text)
+        if cleaned and len(cleaned) >= 4:
+            return cleaned[:97].rstrip() + "…" if len(cleaned) > 100 else cleaned
+    cleaned = clean_title(first or (lines[0] if lines else ""), text)
+    if cleaned and len(cleaned) >= 4:
+        return cleaned[:97].rstrip() + "…" if len(cleaned) > 100 else cleaned
+    return cleaned or ""
+
+
+def _legacy_strip_listing_body_metadata(text: str) -> str:
+    t = (text or "").strip()
+    if not t:
+        return ""
+    t = _AUTHOR_IN_BODY_RE.sub("", t).strip()
+    t = re.sub(r"(?:^|\n)\s*@[a-zA-Z0-9_]{4,32}\s*$", "", t, flags=re.MULTILINE)
+    while True:
+        m = re.match(rf"^\s*(?:{ONE_EMOJI_RE.pattern}\s*)+", t)
+        if not m:
+            break
+        t = t[m.end() :].strip()
+    for _ in range(3):
+        nxt = _LEADING_PRICE_RE.sub("", t, count=1).strip()
+        if nxt == t:
+            break
+        t = nxt
+    t = re.sub(r"\n{3,}", "\n\n", t)
+    return t.strip()
+
+
+def _legacy_format_listing_description(description: str, *, max_len: int = 1800) -> str:
+    t = (description or "").strip()
+    if not t:
+        return ""
+    t = _legacy_strip_listing_body_metadata(t)
+    t = GREETING_TITLE_RE.sub("", t, count=1).strip()
+    t = re.sub(r"https?://t\.me/\S+", "", t, flags=re.I)
+    t = re.sub(
+        r"(?is)^(продам|продаю|отдам|віддам)\s+"
+        r"(?:авто|машину|автомобиль|автомобіль|товар)\s*[\n\r]+",
+        "",
+        t,
+        count=1,
+    ).strip()
+    t = re.sub(r"(?im)^(?:підпишіть?ся|подпишитесь|subscribe|реклама\s+канала).*$", "", t)
+    t = re.sub(r"[ \t]+\n", "\n", t)
+    t = re.sub(r"\n{3,}", "\n\n", t)
+    t = re.sub(r"[ \t]{2,}", " ", t).strip()
+    if len(t) <= max_len:
+        return t
+    cut = t[:max_len]
+    for sep in ("\n\n", "\n", ". ", "! ", "? "):
+        idx = cut.rfind(sep)
+        if idx >= int(max_len * 0.55):
+            cut = cut[: idx + (0 if sep.startswith("\n") else 1)].strip()
+            break
+    return cut.rstrip(" ,;") + "…"
+
+
+def _legacy_polish_listing_description(description: str, *, raw_text: str = "", title: str = "", price=None) -> str:
+    base = _legacy_strip_listing_body_metadata(description or "")
+    base = _legacy_format_listing_description(base)
+    if _description_looks_unpolished(base, title):
+        rebuilt = rebuild_description_from_raw(title=title, raw_text=raw_text, price=price)
+        if rebuilt and len(rebuilt) >= len(base or ""):
+            base = _legacy_format_listing_description(rebuilt)
+    return base or _legacy_format_listing_description(_legacy_strip_listing_body_metadata(raw_text or ""))
+
+
+_LEGACY = {
+    "fingerprint_parsed_text": _legacy_fingerprint_parsed_text,
+    "fingerprint_title_desc": _legacy_fingerprint_title_desc,
+    "extract_title": _legacy_extract_title,
+    "strip_listing_body_metadata": _legacy_strip_listing_body_metadata,
+    "format_listing_description": _legacy_format_listing_description,
+    "polish_listing_description": _legacy_polish_listing_description,
+}
+_CURRENT = {
+    "fingerprint_parsed_text": fingerprint_parsed_text,
+    "fingerprint_title_desc": fingerprint_title_desc,
+    "extract_title": extract_title,
+    "strip_listing_body_metadata": strip_listing_body_metadata,
+    "format_listing_description": format_listing_description,
+    "polish_listing_description": polish_listing_description,
+}
+
+
+# ── Корпус ─────────
+
+
+def _load_corpus(path: Path) -> list[dict]:
+    posts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                posts.append({"channel": row.get("channel") or "", "text": row.get("text") or ""})
+    return posts
+
+
+def _db_corpus(limit: int) -> list[dict]:
+    from parser.storage.connection import get_connection
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            """
+            SELECT source_channel, raw_text FROM parsed_items
+            WHERE raw_text IS NOT NULL AND TRIM(raw_text) != ''
+            ORDER BY id DESC LIMIT ?
+            """,
+            (max(1, int(limit)),),
+        ).fetchall()
+    except Exception as e:
+        print(f"parsed_items недоступна: {e}", file=sys.stderr)
+        return []
+    finally:
+        conn.close()
+    return [{"channel": r[0] or "", "text": r[1]} for r in rows]
+
+
+def _synthetic_corpus(n: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    items = ["диван", "iPhone 13 Pro", "дитяча коляска", "пральна машина Bosch", "велосипед", "шафа-купе"]
+    cities = ["Hamburg", "Berlin", "München", "Köln", "Düsseldorf", "Bremen"]
+    heads = ["🔥🔥 ", "🚨 ", "Добрий день! ", "Всем привет. ", "", ""]
+    tails = [
+        "\n\n👤 Автор: @seller{n}",
+        "\n@user_{n}",
+        "\nhttps://t.me/channel/{n}",
+        "\nПідпишіться на канал!",
+        "",
+    ]
+    posts = []
+    for i in range(n):
+        body = rng.choice([
+            "Продам {item}, стан відмінний.\n{price}€, торг.\n{city}, самовивіз",
+            "{price} € {item}\nСостояние хорошее, есть доставка\n\n\n{city}",
+            "Ціна: {price} євро\n{item} б/у, все працює. {city}",
+            "Віддам безкоштовно {item}.\nЗабрати в {city}",
+            "Продаю авто\nVolkswagen Golf {price}00€ {city}",
+        ]).format(item=rng.choice(items), price=rng.randint(5, 900), city=rng.choice(cities))
+        text = rng.choice(heads) + body + rng.choice(tails).format(n=i)
+        posts.append({"channel": rng.choice(["@hamburg_market", "@berlin_sale"]), "text": text})
+    return posts
+
+
+# ── Заміри ─────────
+
+
+def _clear_caches() -> None:
+    text_mod.post_text.cache_clear()
+    for fn in (extract_title, strip_listing_body_metadata, format_listing_description, polish_listing_description):
+        fn.cache_clear()
+
+
+def _calls(posts: list[dict]) -> dict[str, list[tuple[tuple, dict]]]:
+    """Аргументи кожної функції так, як їх передає runner / parse_pipeline."""
+    calls: dict[str, list[tuple[tuple, dict]]] = {name: [] for name in _CURRENT}
+    for post in posts:
+        text = clean_channel_post_text(post["text"], post["channel"])
+        title = extract_title(text)
+        description = enrich_description(title, extract_description(text, title))
+        price = PRICE_RE.search(text)
+        price_str = price.group(0) if price else None
+        calls["fingerprint_parsed_text"].append(((text,), {}))
+        calls["fingerprint_title_desc"].append(((title, description), {"price": price_str}))
+        calls["extract_title"].append(((text,), {}))
+        calls["strip_listing_body_metadata"].append(((description,), {}))
+        calls["format_listing_description"].append(((description,), {}))
+        calls["polish_listing_description"].append(((description,), {"raw_text": text, "title": title, "price": price_str}))
+    _clear_caches()
+    return calls
+
+
+def _time(fn, args_list: list[tuple[tuple, dict]], repeat: int, passes: int) -> float:
+    """мкс на виклик, найкращий з repeat; passes=2 — той самий пост вдруге (approve)."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        _clear_caches()
+        started = time.perf_counter()
+        for _ in range(passes):
+            for args, kwargs in args_list:
+                fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6 / max(1, len(args_list))
+
+
+def _pipeline(posts: list[dict], fns: dict) -> None:
+    """Шлях поста: парсинг (runner + parse_pipeline), потім approve (formatting + publish)."""
+    for post in posts:
+        text = clean_channel_post_text(post["text"], post["channel"])
+        fns["fingerprint_parsed_text"](text)
+        title = fns["extract_title"](text)
+        description = enrich_description(title, extract_description(text, title))
+        fns["fingerprint_title_desc"](title, description)
+        description = fns["polish_listing_description"](description, raw_text=text, title=title)
+        # approve: опис ще раз через polish / strip, dedup_key для Listing
+        fns["polish_listing_description"](description, raw_text=text, title=title)
+        fns["strip_listing_body_metadata"](description)
+        fns["fingerprint_title_desc"](title, description)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--corpus", type=Path, default=_DEFAULT_CORPUS, help="JSONL {channel, text}")
+    ap.add_argument("--save-corpus", type=Path, default=None, help="зберегти корпус з parsed_items і вийти")
+    ap.add_argument("--limit", type=int, default=3000, help="Рядків parsed_items (default 3000)")
+    ap.add_argument("--synthetic", type=int, default=0, help="Додати N синтетичних постів")
+    ap.add_argument("--repeat", type=int, default=3, help="Проходів для заміру (default 3)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Усі розбіжності")
+    args = ap.parse_args()
+
+    if args.save_corpus:
+        posts = _db_corpus(args.limit) or _synthetic_corpus(args.synthetic or 2000, seed=11)
+        args.save_corpus.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save_corpus, "w", encoding="utf-8") as f:
+            for post in posts:
+                f.write(json.dumps(post, ensure_ascii=False) + "\n")
+        print(f"збережено {len(posts)} постів: {args.save_corpus}")
+        return 0
+
+    if args.corpus.is_file():
+        posts = _load_corpus(args.corpus)
+        source = f"{args.corpus.name} ({len(posts)})"
+    else:
+        posts = _db_corpus(args.limit)
+        source = f"parsed_items ({len(posts)})"
+    if args.synthetic or not posts:
+        extra = _synthetic_corpus(args.synthetic or 2000, seed=11)
+        posts.extend(extra)
+        source += f" + синтетичні ({len(extra)})"
+    print(f"корпус: {source}")
+
+    calls = _calls(posts)
+    mismatches = 0
+    for name, args_list in calls.items():
+        bad = 0
+        for call_args, kwargs in args_list:
+            with _legacy_mode():
+                old = _LEGACY[name](*call_args, **kwargs)
+            new = _CURRENT[name](*call_args, **kwargs)
+            if old != new:
+                bad += 1
+                if args.verbose or bad <= 5:
+                    print(f"MISMATCH {name} {str(call_args[0])[:60]!r}: {old!r} ≠ {new!r}", file=sys.stderr)
+        mismatches += bad
+        with _legacy_mode():
+            legacy_us = _time(_LEGACY[name], args_list, args.repeat, 1)
+        cold_us = _time(_CURRENT[name], args_list, args.repeat, 1)
+        warm_us = _time(_CURRENT[name], args_list, args.repeat, 2) - cold_us
+        print(
+            f"{name:30} попередня {legacy_us:8.1f} мкс | нова {cold_us:8.1f} мкс "
+            f"(повтор {warm_us:6.1f} мкс) | ×{legacy_us / max(cold_us, 1e-9):.2f}"
+            + (f" | розбіжностей {bad}" if bad else "")
+        )
+
+    timings = {}
+    for label, fns in (("попередня", _LEGACY), ("нова", _CURRENT)):
+        best = float("inf")
+        for _ in range(max(1, args.repeat)):
+            _clear_caches()
+            with _legacy_mode() if fns is _LEGACY else nullcontext():
+                started = time.perf_counter()
+                _pipeline(posts, fns)
+                best = min(best, time.perf_counter() - started)
+        timings[label] = best * 1e3 / max(1, len(posts))
+    print(
+        f"пост (парсинг + approve): попередня {timings['попередня']:.3f} мс, нова {timings['нова']:.3f} мс "
+        f"(×{timings['попередня'] / max(timings['нова'], 1e-9):.2f}); розбіжностей: {mismatches}"
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Паритет Aho–Corasick (parser.core.keyword_matcher) зі старими regex-циклами
+detect_category / detect_marketplace_subcategory / subcategory_keyword_score + час.
+
+  python3 -m parser.scripts.check_keyword_parity
+  python3 -m parser.scripts.check_keyword_parity --db 2000 -v
+
+Код виходу 1 — є розбіжності.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
+
+from parser.category_keywords import CATEGORY_KEYWORDS, detect_category  # noqa: E402
+from parser.marketplace_categories import (  # noqa: E402
+    MARKETPLACE_SUB_KEYWORDS,
+    detect_marketplace_subcategory,
+    subcategory_keyword_score,
+)
+
+
+# ── Старі реалізації (еталон) ─────────────────
+
+@lru_cache(maxsize=None)
+def _word_re(kw: str) -> re.Pattern[str]:
+    return re.compile(r"\b" + re.escape(kw) + r"\b")
+
+
+def _legacy_detect_category(
+    text: str,
+    skip_free: bool = False,
+    *,
+    precompiled: bool = True,
+) -> tuple[str, str | None]:
+    """precompiled=False — рівно як у проді (re.search з переповненим кешем re) для бенчмарку."""
+    from parser.core.patterns import VACANCY_RE
+
+    lower = text.lower()
+    if VACANCY_RE.search(lower):
+        if re.search(r"ищу\s+работ|шукаю\s+робот|ищу\s+подработ|шукаю\s+підробіт", lower):
+            return "services_work", "looking_for_work"
+        if re.search(r"подработ|підробіт|part.?time", lower):
+            return "services_work", "vacancies"
+        return "services_work", "vacancies"
+
+    best_category = "other"
+    best_subcategory = None
+    best_score = 0
+    for category, subcategories in CATEGORY_KEYWORDS.items():
+        if category == "free_stuff" and skip_free:
+            continue
+        for subcategory, keywords in subcategories.items():
+            score = 0
+            for kw in keywords:
+                if precompiled:
+                    word_hit = _word_re(kw).search(lower)
+                else:
+                    word_hit = re.search(r"\b" + re.escape(kw) + r"\b", lower)
+                if word_hit or kw in lower:
+                    score += 1
+            if score > best_score:
+                best_score = score
+                best_category = category
+                best_subcategory = subcategory if subcategory and not subcategory.startswith("other_") else None
+    return best_category, best_subcategory
+
+
+@lru_cache(maxsize=8192)
+def _legacy_keyword_hit(kw: str, lower: str) -> bool:
+    kw = (kw or "").strip().lower()
+    if not kw or not lower:
+        return False
+    if " " in kw:
+        return kw in lower
+    return bool(re.search(rf"(?<![a-zа-яёіїєґ0-9]){re.escape(kw)}", lower, re.IGNORECASE))
+
+
+def _legacy_detect_marketplace_subcategory(category: str, text: str) -> str | None:
+    subs = MARKETPLACE_SUB_KEYWORDS.get(category)
+    if not subs:
+        return None
+    lower = (text or "").lower()
+    best_sub: str | None = None
+    best_score = 0
+    for sub_id, keywords in subs.items():
+        if sub_id in ("vacancies", "part_time", "looking_for_work"):
+            continue
+        score = 0
+        for kw in keywords:
+            if _legacy_keyword_hit(kw, lower):
+                score += max(1, len(kw) // 4)
+        if score > best_score:
+            best_score = score
+            best_sub = sub_id
+    return best_sub if best_score > 0 else None
+
+
+def _legacy_subcategory_keyword_score(category: str, subcategory: str | None, text: str) -> int:
+    if not subcategory:
+        return 0
+    keywords = (MARKETPLACE_SUB_KEYWORDS.get(category) or {}).get(subcategory) or []
+    lower = (text or "").lower()
+    return sum(max(1, len(kw) // 4) for kw in keywords if _legacy_keyword_hit(kw, lower))
+
+
+# ── Корпус ────────────────────────────────────
+
+def _all_keywords() -> list[str]:
+    out: list[str] = []
+    for subs in (*CATEGORY_KEYWORDS.values(), *MARKETPLACE_SUB_KEYWORDS.values()):
+        for keywords in subs.values():
+            out.extend(keywords)
+    return out
+
+
+def _synthetic_corpus(n_random: int, seed: int) -> list[str]:
+    """Кожен ключ у різних оточеннях (межі слова, всередині слова, регістр) + випадкові суміші."""
+    rng = random.Random(seed)
+    keywords = _all_keywords()
+    texts: list[str] = []
+    for kw in keywords:
+        texts.extend(
+            (
+                kw,
+                f"Продам {kw}, ціна 50€",
+                f"за{kw}ка",
+                f"x{kw.strip()}",
+                f"1{kw.upper()}!",
+                f"({kw})\n{kw}",
+            )
+        )
+    fillers = ["продам", "б/у", "ціна", "торг", "Hamburg", "стан ідеальний", "📦", "—", "\n"]
+    for _ in range(n_random):
+        words = rng.sample(keywords, k=rng.randint(1, 8)) + rng.sample(fillers, k=3)
+        rng.shuffle(words)
+        sep = rng.choice([" ", "", ", ", "\n"])
+        texts.append(sep.join(words))
+    return texts
+
+
+def _db_corpus(limit: int) -> list[str]:
+    from parser.storage.connection import get_connection
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            """
+            SELECT title, description, raw_text FROM parsed_items
+            ORDER BY id DESC LIMIT ?
+            """,
+            (max(1, int(limit)),),
+        ).fetchall()
+    finally:
+        conn.close()
+    texts: list[str] = []
+    for row in rows:
+        texts.append(str(row[2] or ""))
+        texts.append(f"{row[0] or ''}\n{row[1] or ''}")
+    return texts
+
+
+# ── Перевірка ─────────────────────────────────
+
+def _compare(texts: list[str], verbose: bool) -> int:
+    mismatches = 0
+    pairs = [(cat, sub) for cat, subs in MARKETPLACE_SUB_KEYWORDS.items() for sub in subs]
+
+    def report(kind: str, text: str, old, new) -> None:
+        nonlocal mismatches
+        mismatches += 1
+        if verbose or mismatches <= 20:
+            print(f"MISMATCH {kind}: {text[:80]!r}: old={old!r} new={new!r}", file=sys.stderr)
+
+    for text in texts:
+        # Кеш лише в межах тексту: score по кожній парі не повторює ті самі regex.
+        _legacy_keyword_hit.cache_clear()
+        for skip_free in (False, True):
+            old, new = _legacy_detect_category(text, skip_free), detect_category(text, skip_free)
+            if old != new:
+                report(f"detect_category(skip_free={skip_free})", text, old, new)
+        for cat in MARKETPLACE_SUB_KEYWORDS:
+            old, new = _legacy_detect_marketplace_subcategory(cat, text), detect_marketplace_subcategory(cat, text)
+            if old != new:
+                report(f"detect_marketplace_subcategory({cat})", text, old, new)
+        for cat, sub in pairs:
+            old, new = _legacy_subcategory_keyword_score(cat, sub, text), subcategory_keyword_score(cat, sub, text)
+            if old != new:
+                report(f"subcategory_keyword_score({cat}/{sub})", text, old, new)
+    return mismatches
+
+
+def _bench(texts: list[str]) -> dict[str, float]:
+    """мс на текст: detect_category ×2 + підкатегорія маркетплейсу (як у parse_channel)."""
+    from parser.category_keywords import _category_scores
+    from parser.marketplace_categories import _sub_keyword_scores
+
+    def run(detect, sub_detect) -> float:
+        started = time.perf_counter()
+        for text in texts:
+            _legacy_keyword_hit.cache_clear()
+            detect(text, False)
+            detect(text, True)
+            sub_detect("services_work", text)
+        return (time.perf_counter() - started) * 1000 / max(1, len(texts))
+
+    legacy = run(
+        lambda text, skip_free: _legacy_detect_category(text, skip_free, precompiled=False),
+        _legacy_detect_marketplace_subcategory,
+    )
+    _category_scores.cache_clear()
+    _sub_keyword_scores.cache_clear()
+    matcher = run(detect_category, detect_marketplace_subcategory)
+    return {"legacy_ms": legacy, "matcher_ms": matcher}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Паритет і швидкість keyword matcher проти старих regex-циклів.")
+    ap.add_argument("--random", type=int, default=2000, help="Випадкових сумішей ключів (default 2000)")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--db", type=int, default=0, help="Також останні N parsed_items з БД")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Усі розбіжності")
+    args = ap.parse_args()
+
+    texts = _synthetic_corpus(args.random, args.seed)
+    if args.db:
+        texts.extend(_db_corpus(args.db))
+
+    mismatches = _compare(texts, args.verbose)
+    bench = _bench(texts[-500:])
+    print(
+        f"текстів: {len(texts)}, розбіжностей: {mismatches}; "
+        f"regex {bench['legacy_ms']:.3f} мс/пост → matcher {bench['matcher_ms']:.3f} мс/пост"
+    )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN QUERY PLAN для гарячих запитів парсера (дедуп, auto-approve, AI-контекст).
+
+Викликає справжні storage-функції на з'єднанні з trace callback, бере кожен SELECT
+з уже підставленими параметрами і перевіряє план: повний SCAN parsed_items / Listing
+без індексу — регресія (крім явно дозволених обмежених LIMIT-сканів).
+
+  python3 -m parser.scripts.check_query_plans
+  python3 -m parser.scripts.check_query_plans -v
+
+Код виходу 1 — є запити без індексу.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
+
+from parser.storage.ai_batches import (  # noqa: E402
+    list_batch_items,
+    list_overdue_screen_items,
+    list_screen_pending,
+)
+from parser.storage.connection import (  # noqa: E402
+    PooledConnection,
+    _raw_connect,
+    bind_thread_connection,
+    ensure_parser_storage,
+)
+from parser.storage.listing_dedup import (  # noqa: E402
+    active_listing_duplicate,
+    load_ai_context_snapshot,
+)
+from parser.storage.parsed_items import (  # noqa: E402
+    filter_blocking_parsed_items,
+    get_recent_parsed_embeddings,
+    list_pending_for_auto_approve,
+    marketplace_listing_is_live,
+    parsed_item_claimed_by_other_parser,
+    parsed_item_exists,
+    parsed_item_is_semantic_duplicate,
+    prefetch_parsed_item_states,
+    reset_parsed_item_state_cache,
+)
+
+_TABLES = ("parsed_items", "Listing")
+# Обмежені скани (ORDER BY id DESC LIMIT): фільтр блокування — OR по статусах, індекс не звужує.
+_ALLOWED_SCANS = {"get_recent_parsed_embeddings"}
+
+_PROBES = (
+    ("prefetch_parsed_item_states", prefetch_parsed_item_states, ("@probe", [1, 2, 3]), {}),
+    ("parsed_item_exists", parsed_item_exists, ("@probe", 1, "default"), {}),
+    ("parsed_item_claimed_by_other_parser", parsed_item_claimed_by_other_parser, ("@probe", 1, "default"), {}),
+    ("parsed_item_is_semantic_duplicate", parsed_item_is_semantic_duplicate, ("probe-key", "default", "@probe"), {}),
+    ("get_recent_parsed_embeddings", get_recent_parsed_embeddings, (), {"source_channel": "@probe", "limit": 10}),
+    ("get_recent_parsed_embeddings", get_recent_parsed_embeddings, (), {"limit": 10, "per_channel": True}),
+    ("filter_blocking_parsed_items", filter_blocking_parsed_items, ([1, 2, 3],), {}),
+    ("list_pending_for_auto_approve", list_pending_for_auto_approve, (24,), {"limit": 10}),
+    ("marketplace_listing_is_live", marketplace_listing_is_live, (1,), {}),
+    ("active_listing_duplicate", active_listing_duplicate, ("probe-key", "probe", "probe"), {}),
+    ("load_ai_context_snapshot", load_ai_context_snapshot, (), {}),
+    ("list_screen_pending", list_screen_pending, (10,), {}),
+    ("list_batch_items", list_batch_items, ("batch_probe",), {}),
+    ("list_overdue_screen_items", list_overdue_screen_items, (0, 10), {}),
+)
+
+
+def _aliases(sql: str) -> dict[str, str]:
+    """alias → таблиця для parsed_items / Listing (SCAN у плані показує alias)."""
+    out = {t: t for t in _TABLES}
+    for table in _TABLES:
+        for m in re.finditer(rf"\b{table}\s+(?:AS\s+)?([A-Za-z_]\w*)", sql):
+            alias = m.group(1)
+            if alias.upper() not in ("WHERE", "SET", "ON", "ORDER", "LIMIT", "JOIN", "GROUP"):
+                out[alias] = table
+    return out
+
+
+def _full_scans(conn, sql: str) -> tuple[list[str], list[str]]:
+    plan = [str(row[3]) for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+    aliases = _aliases(sql)
+    bad = []
+    for detail in plan:
+        m = re.match(r"SCAN (\w+)(.*)$", detail)
+        if m and m.group(1) in aliases and "USING" not in m.group(2):
+            bad.append(f"{aliases[m.group(1)]}: {detail}")
+    return plan, bad
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-v", "--verbose", action="store_true", help="друкувати SQL і повний план")
+    args = ap.parse_args()
+
+    ensure_parser_storage()
+    conn = _raw_connect()
+    conn.execute("PRAGMA query_only = ON;")
+    captured: list[str] = []
+    conn.set_trace_callback(captured.append)
+    bind_thread_connection(PooledConnection(conn))
+
+    failures = 0
+    try:
+        for name, fn, fn_args, fn_kwargs in _PROBES:
+            reset_parsed_item_state_cache()
+            captured.clear()
+            fn(*fn_args, **fn_kwargs)
+            statements = [s for s in captured if s.lstrip().upper().startswith(("SELECT", "WITH"))]
+            if not statements:
+                print(f"?  {name}: запитів не перехоплено")
+                continue
+            conn.set_trace_callback(None)
+            for sql in statements:
+                plan, bad = _full_scans(conn, sql)
+                allowed = name in _ALLOWED_SCANS
+                status = "OK" if not bad else ("~" if allowed else "FAIL")
+                if bad and not allowed:
+                    failures += 1
+                print(f"{status:<4} {name}")
+                for line in bad:
+                    print(f"       {line}")
+                if args.verbose:
+                    print("       " + " ".join(sql.split())[:400])
+                    for detail in plan:
+                        print(f"       | {detail}")
+            conn.set_trace_callback(captured.append)
+    finally:
+        bind_thread_connection(None)
+        conn.close()
+
+    print(f"\nЗапитів без індексу: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,6 +6,7 @@
   python3 -m parser.scripts.cleanup_parsed_photos -v
   python3 -m parser.scripts.cleanup_parsed_photos --dry-run -v
   python3 -m parser.scripts.cleanup_parsed_photos --days 7 --public -v
+  python3 -m parser.scripts.cleanup_parsed_photos --rebuild-manifest -v
 """
 from __future__ import annotations
 
@@ -18,6 +19,7 @@ _BOT_ROOT = Path(__file__).resolve().parent.parent.parent
 if str(_BOT_ROOT) not in sys.path:
     sys.path.insert(0, str(_BOT_ROOT))
 
+from parser.storage.photo_store import ensure_photo_store_table, rebuild_photo_manifest  # noqa: E402
 from parser.storage.photos_cleanup import cleanup_old_unused_parser_photos  # noqa: E402
 
 
@@ -49,6 +51,11 @@ def main() -> None:
         action="store_true",
         help="Також parser_* / pi* у public/listings/originals",
     )
+    ap.add_argument(
+        "--rebuild-manifest",
+        action="store_true",
+        help="Спершу перерахувати маніфест фото (файли на диску + посилання в БД)",
+    )
     # зворотна сумісність
     ap.add_argument("--all", action="store_true", help=argparse.SUPPRESS)
     ap.add_argument("--public-orphans", action="store_true", help=argparse.SUPPRESS)
@@ -64,6 +71,11 @@ def main() -> None:
 
         on_progress("cleanup: start")
 
+    if args.rebuild_manifest:
+        ensure_photo_store_table()
+        manifest = rebuild_photo_manifest()
+        print(f"Маніфест: {json.dumps(manifest, ensure_ascii=False)}", file=sys.stderr)
+
     result = cleanup_old_unused_parser_photos(
         days=args.days,
         dry_run=args.dry_run,
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Локальний OpenAI-сумісний Batch API для перевірки parser.ai.screen_batch без OpenAI.
+
+Реалізує POST /v1/files, POST /v1/batches, GET /v1/batches/{id}, GET /v1/files/{id}/content.
+Пачка перший GET — in_progress, далі completed; відповідь на кожен рядок — «прийняти»
+з title = перший рядок POST TEXT (--reject-every N — кожен N-й відхилити, --fail-every N —
+кожен N-й з помилкою 500, щоб перевірити повернення в чергу).
+
+  python3 -m parser.scripts.fake_openai_batch --port 8787
+  PARSER_AI_BATCH_BASE_URL=http://127.0.0.1:8787/v1 ...
+  python3 -m parser.scripts.fake_openai_batch --port 0 --cycle 3 --fail-every 3
+
+--cycle N — підняти сервер у фоні й прогнати N проходів run_screen_batch_cycle
+(сповіщення модерації лише логуються).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import email.parser
+import email.policy
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
+
+logger = logging.getLogger("fake_openai_batch")
+
+_ids = itertools.count(1)
+
+
+class _State:
+    def __init__(self, reject_every: int, fail_every: int):
+        self.files: dict[str, bytes] = {}
+        self.batches: dict[str, dict] = {}
+        self.reject_every = reject_every
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+
+
+def _screen_reply(body: dict, n: int, state: _State) -> dict:
+    prompt = next((m["content"] for m in body.get("messages", []) if m.get("role") == "user"), "")
+    post = prompt.split("POST TEXT:\n", 1)[-1].split("\n\nParser hints", 1)[0].strip()
+    title = next((ln.strip() for ln in post.splitlines() if ln.strip()), "Оголошення")[:80]
+    if state.reject_every and n % state.reject_every == 0:
+        data = {"accept": False, "reject_reason": "fake: не оголошення"}
+    else:
+        data = {"accept": True, "title": title, "description": post[:500]}
+    return {
+        "id": f"chatcmpl-fake-{n}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(data, ensure_ascii=False)},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+
+
+def _complete_batch(batch: dict, state: _State) -> None:
+    lines_out: list[str] = []
+    for n, line in enumerate(state.files[batch["input_file_id"]].decode("utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        req = json.loads(line)
+        if state.fail_every and n % state.fail_every == 0:
+            response = {"status_code": 500, "request_id": f"req-{n}", "body": {"error": {"message": "fake"}}}
+        else:
+            response = {"status_code": 200, "request_id": f"req-{n}", "body": _screen_reply(req["body"], n, state)}
+        lines_out.append(
+            json.dumps({"id": f"batch_req_{n}", "custom_id": req["custom_id"], "response": response, "error": None})
+        )
+    out_id = f"file-out-{next(_ids)}"
+    state.files[out_id] = ("\n".join(lines_out) + "\n").encode("utf-8")
+    batch.update(status="completed", output_file_id=out_id, completed_at=int(time.time()))
+
+
+def _make_handler(state: _State):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            logger.debug(fmt, *args)
+
+        def _json(self, code: int, payload: dict) -> None:
+            raw = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_POST(self):
+            raw = self._body()
+            with state.lock:
+                if self.path.endswith("/files"):
+                    head = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+                    msg = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(head + raw)
+                    content = b""
+                    for part in msg.iter_parts():
+                        if part.get_param("name", header="content-disposition") == "file":
+                            content = part.get_payload(decode=True) or b""
+                    file_id = f"file-in-{next(_ids)}"
+                    state.files[file_id] = content
+                    return self._json(200, {
+                        "id": file_id, "object": "file", "bytes": len(content),
+                        "created_at": int(time.time()), "filename": "screen_batch.jsonl",
+                        "purpose": "batch",
+                    })
+                if self.path.endswith("/batches"):
+                    req = json.loads(raw or b"{}")
+                    batch_id = f"batch_fake_{next(_ids)}"
+                    batch = {
+                        "id": batch_id, "object": "batch", "endpoint": req.get("endpoint"),
+                        "input_file_id": req.get("input_file_id"), "completion_window": "24h",
+                        "status": "validating", "created_at": int(time.time()),
+                        "output_file_id": None, "error_file_id": None, "metadata": req.get("metadata"),
+                    }
+                    state.batches[batch_id] = batch
+                    return self._json(200, batch)
+            self._json(404, {"error": {"message": f"unknown {self.path}"}})
+
+        def do_GET(self):
+            parts = self.path.rstrip("/").split("/")
+            with state.lock:
+                if len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in state.batches:
+                    batch = state.batches[parts[-1]]
+                    if batch["status"] == "validating":
+                        batch["status"] = "in_progress"
+                    elif batch["status"] == "in_progress":
+                        _complete_batch(batch, state)
+                    return self._json(200, batch)
+                if parts[-1] == "content" and parts[-2] in state.files:
+                    raw = state.files[parts[-2]]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(raw)))
+                    self.end_headers()
+                    self.wfile.write(raw)
+                    return
+            self._json(404, {"error": {"message": f"unknown {self.path}"}})
+
+    return Handler
+
+
+async def _run_cycles(n: int, base_url: str) -> None:
+    from parser.ai.screen_batch import run_screen_batch_cycle
+
+    async def notify(item: dict) -> None:
+        logger.info(
+            "notify parsed_item %s → %s (%s/%s)",
+            item.get("id"), (item.get("title") or "")[:50], item.get("category"), item.get("subcategory"),
+        )
+
+    for i in range(n):
+        stats = await run_screen_batch_cycle(notify, base_url=base_url)
+        logger.info("прохід %s: %s", i + 1, stats)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8787)
+    ap.add_argument("--reject-every", type=int, default=0)
+    ap.add_argument("--fail-every", type=int, default=0)
+    ap.add_argument("--cycle", type=int, default=0, help="прогнати N проходів screen_batch проти сервера")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+    state = _State(args.reject_every, args.fail_every)
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(state))
+    base_url = f"http://{args.host}:{server.server_address[1]}/v1"
+    if not args.cycle:
+        logger.info("fake Batch API: %s", base_url)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        asyncio.run(_run_cycles(args.cycle, base_url))
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
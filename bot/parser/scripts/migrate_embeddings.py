@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Перенесення embeddings parsed_items з JSON (text_embedding) у BLOB (text_embedding_blob).
+Партіями, кожна в окремій транзакції — можна перервати й запустити знову.
+
+  python3 -m parser.scripts.migrate_embeddings --dry-run -v
+  python3 -m parser.scripts.migrate_embeddings --format f16 -v
+  python3 -m parser.scripts.migrate_embeddings --vacuum
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
+
+from parser.config.settings import PARSER_EMBEDDING_STORAGE  # noqa: E402
+from parser.storage.connection import get_connection  # noqa: E402
+from parser.storage.embeddings import migrate_embeddings_to_blob  # noqa: E402
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description="Конвертувати JSON-embeddings parsed_items у бінарний BLOB (in-place)."
+    )
+    ap.add_argument(
+        "--format",
+        choices=("f16", "f32", "i8"),
+        default=PARSER_EMBEDDING_STORAGE if PARSER_EMBEDDING_STORAGE != "json" else "f16",
+        help="Формат BLOB (default — PARSER_EMBEDDING_STORAGE або f16)",
+    )
+    ap.add_argument("--batch", type=int, default=500, help="Рядків на транзакцію (default 500)")
+    ap.add_argument("--dry-run", action="store_true", help="Лише звіт, без запису")
+    ap.add_argument("--vacuum", action="store_true", help="VACUUM після міграції (повертає місце на диску)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="Прогрес")
+    args = ap.parse_args()
+
+    on_progress = None
+    if args.verbose:
+        def on_progress(msg: str) -> None:
+            print(msg, file=sys.stderr, flush=True)
+
+    result = migrate_embeddings_to_blob(
+        fmt=args.format,
+        batch_size=args.batch,
+        dry_run=args.dry_run,
+        on_progress=on_progress,
+    )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+    if args.vacuum and not args.dry_run:
+        conn = get_connection()
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    mode = "прогноз" if args.dry_run else "готово"
+    print(
+        f"\n{mode}: {result['converted']} embeddings → {args.format}, "
+        f"{_format_bytes(result['bytes_before'])} → {_format_bytes(result['bytes_after'])}"
+        + (f", пошкоджених {result['invalid']}" if result["invalid"] else ""),
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
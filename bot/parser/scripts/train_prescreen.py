@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Навчання й оцінка локального pre-screen (parser.ai.prescreen) на вердиктах AI.
+
+Датасет — parser_ai_screen_labels (пише AI screen, PARSER_AI_SCREEN_LABELS=1). Поділ за часом:
+train → --val (поріг під --min-precision) → --test (найсвіжіші, лише звіт: поріг їх не бачив).
+Звіт: precision / recall відсіву проти AI, частка постів без виклику AI, латентність моделі.
+
+  python3 -m parser.scripts.train_prescreen train
+  python3 -m parser.scripts.train_prescreen train --since-days 60 --min-precision 0.99 --dry-run
+  python3 -m parser.scripts.train_prescreen eval --since-days 7 --show-errors 10
+
+--with-parsed-items N — додати N останніх прийнятих AI записів parsed_items як «accept»
+(на старті, поки вердиктів мало). Код виходу 1 — замало даних або precision на test нижче
+цілі (модель тоді не зберігається).
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
+
+import numpy as np  # noqa: E402
+
+from parser.ai.prescreen import (  # noqa: E402
+    PrescreenModel,
+    choose_threshold,
+    evaluate_prescreen,
+    train_prescreen,
+)
+from parser.config.settings import (  # noqa: E402
+    PARSER_PRESCREEN_MIN_PRECISION,
+    PARSER_PRESCREEN_MODEL_PATH,
+)
+from parser.storage.ai_screen_labels import ai_screen_label_key, list_ai_screen_labels  # noqa: E402
+
+_MIN_ROWS = 200
+
+
+def _parsed_items_accepts(limit: int) -> list[dict]:
+    """Записи, що пройшли AI screen синхронно або з пачки (модератор міг потім відхилити — це не вердикт AI)."""
+    from parser.storage.connection import get_connection
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            """
+            SELECT raw_text, created_ts FROM parsed_items
+            WHERE ai_screen_status IS NULL
+              AND raw_text IS NOT NULL AND TRIM(raw_text) != ''
+              AND NOT (status = 'rejected' AND moderated_by IS NULL)
+            ORDER BY id DESC LIMIT ?
+            """,
+            (int(limit),),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {"raw_text": r["raw_text"], "accept": 1, "reason": "", "created_ts": int(r["created_ts"] or 0)}
+        for r in rows
+    ]
+
+
+def _load_rows(since_days: int, with_parsed_items: int) -> list[dict]:
+    since_ts = int(time.time()) - since_days * 86400 if since_days > 0 else 0
+    rows = list_ai_screen_labels(since_ts=since_ts)
+    if with_parsed_items > 0:
+        seen = {ai_screen_label_key(r["raw_text"]) for r in rows}
+        for r in _parsed_items_accepts(with_parsed_items):
+            if r["created_ts"] >= since_ts and ai_screen_label_key(r["raw_text"]) not in seen:
+                rows.append(r)
+        rows.sort(key=lambda r: r["created_ts"])
+    return rows
+
+
+def _latency_us(model: PrescreenModel, texts: list[str]) -> tuple[float, float]:
+    sample = texts[:2000]
+    timings = []
+    for text in sample:
+        started = time.perf_counter()
+        model.reject_proba(text)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return float(np.median(timings)), float(np.percentile(timings, 99))
+
+
+def _report(title: str, model: PrescreenModel, rows: list[dict], threshold: float, show_errors: int) -> dict:
+    texts = [r["raw_text"] for r in rows]
+    rejects = np.array([0 if r["accept"] else 1 for r in rows])
+    probas = model.reject_probas(texts)
+    stats = evaluate_prescreen(probas, rejects, threshold)
+    p50, p99 = _latency_us(model, texts)
+    print(f"\n== {title} ==")
+    print(f"рядків {stats['total']}, AI відхилив {stats['ai_rejects']}, поріг {threshold:.4f}")
+    print(
+        f"відсічено {stats['cut']} ({stats['coverage']:.1%} постів без виклику AI): "
+        f"precision {stats['precision']:.4f}, recall {stats['recall']:.4f}, "
+        f"помилково відсічено {stats['false_rejects']}"
+    )
+    print(f"модель: p50 {p50:.0f} мкс, p99 {p99:.0f} мкс на пост")
+    cut = probas >= threshold
+    reasons = Counter(rows[i].get("reason") or "?" for i in np.flatnonzero(cut & (rejects == 1)))
+    if reasons:
+        print("відсічене за причиною AI: " + ", ".join(f"{k} {v}" for k, v in reasons.most_common()))
+    if show_errors:
+        errors = sorted(np.flatnonzero(cut & (rejects == 0)), key=lambda i: -probas[i])[:show_errors]
+        for i in errors:
+            preview = " ".join(texts[i].split())[:120]
+            print(f"  FP p={probas[i]:.3f}: {preview}")
+    return stats
+
+
+def _cmd_train(args) -> int:
+    rows = _load_rows(args.since_days, args.with_parsed_items)
+    n_rejects = sum(1 for r in rows if not r["accept"])
+    if len(rows) < _MIN_ROWS or n_rejects < 20 or n_rejects == len(rows):
+        print(f"Замало даних: {len(rows)} рядків, {n_rejects} відхилень (потрібно ≥ {_MIN_ROWS} і обидва класи)")
+        return 1
+    if args.val <= 0 or args.test <= 0 or args.val + args.test >= 1:
+        print("--val і --test мають бути > 0, а разом < 1")
+        return 1
+    val_start = int(len(rows) * (1 - args.val - args.test))
+    test_start = int(len(rows) * (1 - args.test))
+    train_rows, val_rows, test_rows = rows[:val_start], rows[val_start:test_start], rows[test_start:]
+
+    started = time.perf_counter()
+    model = train_prescreen(
+        [r["raw_text"] for r in train_rows],
+        [0 if r["accept"] else 1 for r in train_rows],
+        n_bits=args.bits,
+        epochs=args.epochs,
+    )
+    print(f"навчено на {len(train_rows)} рядках за {time.perf_counter() - started:.1f} с")
+
+    val_rejects = np.array([0 if r["accept"] else 1 for r in val_rows])
+    val_probas = model.reject_probas([r["raw_text"] for r in val_rows])
+    model.threshold = choose_threshold(val_probas, val_rejects, min_precision=args.min_precision)
+    if model.threshold > 1.0:
+        print(f"Порогу з precision ≥ {args.min_precision} на val немає — модель нічого не відсікатиме")
+    stats = _report("test (найсвіжіші, поріг з val)", model, test_rows, model.threshold, args.show_errors)
+
+    model.meta = {
+        "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "train_rows": len(train_rows),
+        "val_rows": len(val_rows),
+        "test_rows": len(test_rows),
+        "min_precision": args.min_precision,
+        "test_precision": round(stats["precision"], 4),
+        "test_recall": round(stats["recall"], 4),
+        "test_coverage": round(stats["coverage"], 4),
+    }
+    if stats["precision"] < args.min_precision:
+        print(f"Precision на test {stats['precision']:.4f} < {args.min_precision}: модель не збережено")
+        return 1
+    if args.dry_run:
+        print("--dry-run: модель не збережено")
+        return 0
+    model.save(args.model)
+    print(f"збережено: {args.model}")
+    return 0
+
+
+def _cmd_eval(args) -> int:
+    try:
+        model = PrescreenModel.load(args.model)
+    except OSError as e:
+        print(f"Немає моделі {args.model}: {e}")
+        return 1
+    rows = _load_rows(args.since_days, 0)
+    if not rows:
+        print("Немає вердиктів AI за період")
+        return 1
+    threshold = args.threshold if args.threshold is not None else model.threshold
+    print(f"модель {args.model.name}: {model.meta}")
+    stats = _report(f"вердикти AI за {args.since_days or 'усі'} дн.", model, rows, threshold, args.show_errors)
+    return 0 if stats["precision"] >= args.min_precision else 1
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--model", type=Path, default=PARSER_PRESCREEN_MODEL_PATH)
+    common.add_argument("--min-precision", type=float, default=PARSER_PRESCREEN_MIN_PRECISION)
+    common.add_argument("--show-errors", type=int, default=0, help="показати N помилково відсічених постів")
+
+    train = sub.add_parser("train", parents=[common], help="навчити й зберегти модель")
+    train.add_argument("--since-days", type=int, default=0, help="0 — усі вердикти")
+    train.add_argument("--val", type=float, default=0.15, help="частка для підбору порогу")
+    train.add_argument("--test", type=float, default=0.15, help="найсвіжіша частка лише для звіту")
+    train.add_argument("--bits", type=int, default=18, help="розмір хеш-простору 2^bits")
+    train.add_argument("--epochs", type=int, default=6)
+    train.add_argument("--with-parsed-items", type=int, default=0)
+    train.add_argument("--dry-run", action="store_true")
+    train.set_defaults(func=_cmd_train)
+
+    ev = sub.add_parser("eval", parents=[common], help="precision збереженої моделі на свіжих вердиктах")
+    ev.add_argument("--since-days", type=int, default=7)
+    ev.add_argument("--threshold", type=float, default=None, help="інший поріг замість збереженого")
+    ev.set_defaults(func=_cmd_eval)
+
+    args = ap.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,12 +5,14 @@ from parser.storage.marketplace import (
     get_or_create_bot_user,
 )
 from parser.storage.parsed_items import (
+    add_to_embedding_index,
     ensure_parsed_items_table,
     fingerprint_parsed_text,
     fingerprint_title_desc,
     get_parsed_item_by_admin_msg,
     get_parsed_item_by_id,
     insert_parsed_item,
+    insert_parsed_items,
     parsed_item_content_hash_exists,
     parsed_item_exists,
     parsed_item_is_raw_duplicate,
@@ -23,6 +25,7 @@ from parser.storage.photos_cleanup import cleanup_stale_parsed_photos
 
 __all__ = [
     "BASE_DIR",
+    "add_to_embedding_index",
     "DB_PATH",
     "cleanup_stale_parsed_photos",
     "copy_parser_images_to_public",
@@ -38,6 +41,7 @@ __all__ = [
     "get_parsed_item_by_admin_msg",
     "get_parsed_item_by_id",
     "insert_parsed_item",
+    "insert_parsed_items",
     "parsed_item_content_hash_exists",
     "parsed_item_exists",
     "parsed_item_is_raw_duplicate",
@@ -0,0 +1,233 @@
+"""
+Відкладений AI screen через OpenAI Batch API: стан пачок і parsed_items у черзі.
+
+parsed_items.ai_screen_status: screen_pending — чекає відправки, screen_submitted — у пачці
+ai_batch_id; NULL — перевірено (синхронно чи з результату пачки). status лишається 'pending',
+тож дедуп блокує такі записи як звичайні, а модерація / auto-approve їх не бачать до результату.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from parser.storage.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+SCREEN_PENDING = "screen_pending"
+SCREEN_SUBMITTED = "screen_submitted"
+
+# Термінальні статуси пачки OpenAI (інші — validating / in_progress / finalizing / cancelling).
+BATCH_DONE_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+_batches_table_ready = False
+
+
+def ensure_ai_batches_table() -> None:
+    global _batches_table_ready
+    if _batches_table_ready:
+        return
+    from parser.storage.parsed_items import ensure_parsed_items_table
+
+    ensure_parsed_items_table()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parser_ai_batches (
+            batch_id        TEXT PRIMARY KEY,
+            status          TEXT NOT NULL,
+            input_file_id   TEXT,
+            output_file_id  TEXT,
+            error_file_id   TEXT,
+            item_count      INTEGER NOT NULL DEFAULT 0,
+            created_ts      INTEGER NOT NULL,
+            updated_ts      INTEGER NOT NULL
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parser_ai_batches_status "
+        "ON parser_ai_batches(status, created_ts)"
+    )
+    conn.commit()
+    conn.close()
+    _batches_table_ready = True
+
+
+def list_screen_pending(limit: int) -> list[dict[str, Any]]:
+    """Найстаріші parsed_items, що чекають відправки в пачку."""
+    ensure_ai_batches_table()
+    conn = get_connection()
+    rows = conn.execute(
+        """
+        SELECT * FROM parsed_items
+        WHERE ai_screen_status = ? AND ai_batch_id IS NULL AND status = 'pending'
+        ORDER BY created_ts
+        LIMIT ?
+        """,
+        (SCREEN_PENDING, int(limit)),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def record_submitted_batch(batch_id: str, status: str, input_file_id: str, item_ids: list[int]) -> None:
+    ensure_ai_batches_table()
+    now = int(time.time())
+    conn = get_connection()
+    # У writer пулу транзакція вже відкрита (group commit).
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    conn.execute(
+        """
+        INSERT INTO parser_ai_batches (batch_id, status, input_file_id, item_count, created_ts, updated_ts)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (batch_id, status, input_file_id, len(item_ids), now, now),
+    )
+    conn.executemany(
+        "UPDATE parsed_items SET ai_screen_status = ?, ai_batch_id = ? WHERE id = ? AND ai_screen_status = ?",
+        [(SCREEN_SUBMITTED, batch_id, int(i), SCREEN_PENDING) for i in item_ids],
+    )
+    conn.commit()
+    conn.close()
+
+
+def list_open_batches() -> list[dict[str, Any]]:
+    ensure_ai_batches_table()
+    conn = get_connection()
+    rows = conn.execute(
+        f"""
+        SELECT * FROM parser_ai_batches
+        WHERE status NOT IN ({",".join("?" * len(BATCH_DONE_STATUSES))})
+        ORDER BY created_ts
+        """,
+        tuple(BATCH_DONE_STATUSES),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def update_batch_status(
+    batch_id: str,
+    status: str,
+    *,
+    output_file_id: Optional[str] = None,
+    error_file_id: Optional[str] = None,
+) -> None:
+    conn = get_connection()
+    conn.execute(
+        """
+        UPDATE parser_ai_batches
+        SET status = ?, output_file_id = COALESCE(?, output_file_id),
+            error_file_id = COALESCE(?, error_file_id), updated_ts = ?
+        WHERE batch_id = ?
+        """,
+        (status, output_file_id, error_file_id, int(time.time()), batch_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def list_batch_items(batch_id: str) -> list[dict[str, Any]]:
+    """Ще не застосовані записи пачки (fallback міг перевірити частину синхронно)."""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT * FROM parsed_items WHERE ai_screen_status = ? AND ai_batch_id = ?",
+        (SCREEN_SUBMITTED, batch_id),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def requeue_batch_items(batch_id: str, item_ids: Optional[list[int]] = None) -> int:
+    """Пачка впала / прострочена — записи знову чекають відправки."""
+    conn = get_connection()
+    if item_ids is None:
+        cur = conn.execute(
+            """
+            UPDATE parsed_items SET ai_screen_status = ?, ai_batch_id = NULL
+            WHERE ai_screen_status = ? AND ai_batch_id = ?
+            """,
+            (SCREEN_PENDING, SCREEN_SUBMITTED, batch_id),
+        )
+        n = cur.rowcount or 0
+    else:
+        n = 0
+        for item_id in item_ids:
+            cur = conn.execute(
+                """
+                UPDATE parsed_items SET ai_screen_status = ?, ai_batch_id = NULL
+                WHERE id = ? AND ai_screen_status = ? AND ai_batch_id = ?
+                """,
+                (SCREEN_PENDING, int(item_id), SCREEN_SUBMITTED, batch_id),
+            )
+            n += cur.rowcount or 0
+    conn.commit()
+    conn.close()
+    return n
+
+
+def list_overdue_screen_items(older_than_ts: int, limit: int) -> list[dict[str, Any]]:
+    """Записи, що чекають AI довше за поріг — швидка смуга перевіряє їх синхронно."""
+    ensure_ai_batches_table()
+    conn = get_connection()
+    rows = conn.execute(
+        """
+        SELECT * FROM parsed_items
+        WHERE ai_screen_status IN (?, ?) AND created_ts < ? AND status = 'pending'
+        ORDER BY created_ts
+        LIMIT ?
+        """,
+        (SCREEN_PENDING, SCREEN_SUBMITTED, int(older_than_ts), int(limit)),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+_SCREENED_FIELDS = (
+    "title", "description", "category", "subcategory", "price", "currency",
+    "is_free", "condition", "location", "parser_type",
+)
+
+
+def apply_screened_item(item_id: int, fields: dict[str, Any], *, expected_status: str) -> bool:
+    """Поля з AI → parsed_items, ai_screen_status = NULL. False — запис уже оброблено іншим шляхом."""
+    updates = {k: fields[k] for k in _SCREENED_FIELDS if k in fields}
+    if "is_free" in updates:
+        updates["is_free"] = int(bool(updates["is_free"]))
+    assignments = ", ".join(f"{k} = ?" for k in updates)
+    conn = get_connection()
+    cur = conn.execute(
+        f"""
+        UPDATE parsed_items
+        SET {assignments}{", " if assignments else ""}ai_screen_status = NULL
+        WHERE id = ? AND ai_screen_status = ?
+        """,
+        (*updates.values(), int(item_id), expected_status),
+    )
+    conn.commit()
+    changed = cur.rowcount == 1
+    conn.close()
+    return changed
+
+
+def reject_screened_item(item_id: int, *, expected_status: str) -> bool:
+    """AI відхилив — як відхилення модератором, але без модератора."""
+    now = datetime.now(timezone.utc).isoformat()
+    conn = get_connection()
+    cur = conn.execute(
+        """
+        UPDATE parsed_items
+        SET status = 'rejected', marketplace_mod_status = 'rejected', channel_mod_status = 'rejected',
+            moderated_at = ?, ai_screen_status = NULL
+        WHERE id = ? AND ai_screen_status = ?
+        """,
+        (now, int(item_id), expected_status),
+    )
+    conn.commit()
+    changed = cur.rowcount == 1
+    conn.close()
+    return changed
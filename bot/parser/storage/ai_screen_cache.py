@@ -0,0 +1,154 @@
+"""
+Кеш відповідей AI screen: fingerprint(raw_text) + модель + версія промпту → JSON моделі.
+
+Rolling lookback і крос-пости не оплачують той самий текст вдруге.
+TTL — PARSER_AI_SCREEN_CACHE_TTL_HOURS, розмір — PARSER_AI_SCREEN_CACHE_MAX_ROWS (LRU за last_used_at).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from typing import Any, Optional
+
+from parser.config.settings import (
+    PARSER_AI_SCREEN_CACHE_MAX_ROWS,
+    PARSER_AI_SCREEN_CACHE_TTL_HOURS,
+)
+from parser.storage.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+_cache_table_ready = False
+
+
+def ai_screen_cache_key(fingerprint: str, model: str, prompt_version: str) -> str:
+    return hashlib.sha256(f"{fingerprint}\n{model}\n{prompt_version}".encode("utf-8")).hexdigest()
+
+
+def ensure_ai_screen_cache_table() -> None:
+    global _cache_table_ready
+    if _cache_table_ready:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parser_ai_screen_cache (
+            cache_key       TEXT PRIMARY KEY,
+            model           TEXT NOT NULL,
+            prompt_version  TEXT NOT NULL,
+            response_json   TEXT NOT NULL,
+            accept          INTEGER NOT NULL DEFAULT 0,
+            hits            INTEGER NOT NULL DEFAULT 0,
+            created_at      TEXT DEFAULT (datetime('now')),
+            last_used_at    TEXT DEFAULT (datetime('now'))
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parser_ai_screen_cache_last_used "
+        "ON parser_ai_screen_cache(last_used_at)"
+    )
+    conn.commit()
+    conn.close()
+    _cache_table_ready = True
+
+
+def get_cached_ai_screen(cache_key: str) -> Optional[dict[str, Any]]:
+    """JSON моделі, якщо запис ще в межах TTL."""
+    if not cache_key:
+        return None
+    ensure_ai_screen_cache_table()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT response_json FROM parser_ai_screen_cache
+        WHERE cache_key = ?
+          AND datetime(created_at) >= datetime('now', ?)
+        """,
+        (cache_key, f"-{PARSER_AI_SCREEN_CACHE_TTL_HOURS} hours"),
+    )
+    row = cursor.fetchone()
+    if row:
+        cursor.execute(
+            """
+            UPDATE parser_ai_screen_cache
+            SET hits = hits + 1, last_used_at = datetime('now')
+            WHERE cache_key = ?
+            """,
+            (cache_key,),
+        )
+        conn.commit()
+    conn.close()
+    if not row:
+        return None
+    try:
+        data = json.loads(row[0])
+    except (TypeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def put_cached_ai_screen(
+    cache_key: str,
+    *,
+    model: str,
+    prompt_version: str,
+    data: dict[str, Any],
+) -> None:
+    if not cache_key:
+        return
+    ensure_ai_screen_cache_table()
+    conn = get_connection()
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO parser_ai_screen_cache (
+            cache_key, model, prompt_version, response_json, accept, hits, created_at, last_used_at
+        ) VALUES (?, ?, ?, ?, ?, 0, datetime('now'), datetime('now'))
+        """,
+        (
+            cache_key,
+            model,
+            prompt_version,
+            json.dumps(data, ensure_ascii=False),
+            int(data.get("accept") is True),
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def prune_ai_screen_cache(
+    *,
+    ttl_hours: int | None = None,
+    max_rows: int | None = None,
+) -> int:
+    """Прострочені за TTL + найдавніше використані понад max_rows (раз на цикл парсингу)."""
+    ensure_ai_screen_cache_table()
+    ttl = max(1, int(ttl_hours or PARSER_AI_SCREEN_CACHE_TTL_HOURS))
+    limit = max(1, int(max_rows or PARSER_AI_SCREEN_CACHE_MAX_ROWS))
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM parser_ai_screen_cache WHERE datetime(created_at) < datetime('now', ?)",
+        (f"-{ttl} hours",),
+    )
+    removed = cursor.rowcount or 0
+    cursor.execute(
+        """
+        DELETE FROM parser_ai_screen_cache
+        WHERE cache_key IN (
+            SELECT cache_key FROM parser_ai_screen_cache
+            ORDER BY last_used_at DESC
+            LIMIT -1 OFFSET ?
+        )
+        """,
+        (limit,),
+    )
+    removed += cursor.rowcount or 0
+    conn.commit()
+    conn.close()
+    if removed:
+        logger.info("AI screen cache: видалено %s записів", removed)
+    return removed
@@ -0,0 +1,124 @@
+"""
+Вердикти AI screen з текстом поста — датасет для локального pre-screen (parser.ai.prescreen).
+
+Один рядок на текст (sha256 raw_text): accept 1/0 і причина відхилення, як у AiScreenResult.
+Відповіді «дублікат» не пишуться — вони залежать від черги, а не від тексту.
+Розмір — PARSER_AI_SCREEN_LABELS_MAX_ROWS (найстаріші видаляються).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Any, Optional
+
+from parser.config.settings import PARSER_AI_SCREEN_LABELS_MAX_ROWS
+from parser.storage.connection import get_connection
+
+_labels_table_ready = False
+
+
+def ai_screen_label_key(raw_text: str) -> str:
+    return hashlib.sha256((raw_text or "").strip().encode("utf-8")).hexdigest()
+
+
+def ensure_ai_screen_labels_table() -> None:
+    global _labels_table_ready
+    if _labels_table_ready:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parser_ai_screen_labels (
+            text_key        TEXT PRIMARY KEY,
+            raw_text        TEXT NOT NULL,
+            accept          INTEGER NOT NULL,
+            reason          TEXT,
+            model           TEXT,
+            source_channel  TEXT,
+            created_ts      INTEGER NOT NULL
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parser_ai_screen_labels_created "
+        "ON parser_ai_screen_labels(created_ts)"
+    )
+    conn.commit()
+    conn.close()
+    _labels_table_ready = True
+
+
+def put_ai_screen_label(
+    raw_text: str,
+    *,
+    accept: bool,
+    reason: str = "",
+    model: str = "",
+    source_channel: str = "",
+) -> None:
+    raw_text = (raw_text or "").strip()
+    if not raw_text:
+        return
+    ensure_ai_screen_labels_table()
+    conn = get_connection()
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO parser_ai_screen_labels (
+            text_key, raw_text, accept, reason, model, source_channel, created_ts
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            ai_screen_label_key(raw_text),
+            raw_text,
+            int(bool(accept)),
+            reason or None,
+            model or None,
+            source_channel or None,
+            int(time.time()),
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def list_ai_screen_labels(
+    *,
+    since_ts: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> list[dict[str, Any]]:
+    """Від найстаріших до найновіших (train/val/test ділимо за часом)."""
+    ensure_ai_screen_labels_table()
+    conn = get_connection()
+    rows = conn.execute(
+        """
+        SELECT raw_text, accept, reason, source_channel, created_ts
+        FROM parser_ai_screen_labels
+        WHERE created_ts >= ?
+        ORDER BY created_ts, rowid
+        LIMIT ?
+        """,
+        (int(since_ts or 0), int(limit) if limit else -1),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def prune_ai_screen_labels(max_rows: int | None = None) -> int:
+    ensure_ai_screen_labels_table()
+    limit = max(1, int(max_rows or PARSER_AI_SCREEN_LABELS_MAX_ROWS))
+    conn = get_connection()
+    cur = conn.execute(
+        """
+        DELETE FROM parser_ai_screen_labels
+        WHERE text_key IN (
+            SELECT text_key FROM parser_ai_screen_labels
+            ORDER BY created_ts DESC
+            LIMIT -1 OFFSET ?
+        )
+        """,
+        (limit,),
+    )
+    removed = cur.rowcount or 0
+    conn.commit()
+    conn.close()
+    return removed
@@ -0,0 +1,166 @@
+"""
+Стан адаптивного опитування каналів: швидкість постингу (EWMA приросту message_id
+за годину), останній head і час наступного опитування. Політика — parser.core.poll_schedule.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from parser.storage.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+_schedule_table_ready = False
+
+
+def ensure_channel_schedule_table() -> None:
+    global _schedule_table_ready
+    if _schedule_table_ready:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parser_channel_schedule (
+            source_channel  TEXT PRIMARY KEY,
+            rate_per_hour   REAL,
+            interval_sec    INTEGER NOT NULL DEFAULT 0,
+            last_head_id    INTEGER NOT NULL DEFAULT 0,
+            last_polled_ts  INTEGER NOT NULL DEFAULT 0,
+            next_due_ts     INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.commit()
+    conn.close()
+    _schedule_table_ready = True
+
+
+def load_channel_schedule(channels: list[str], *, history_days: int = 7) -> dict[str, dict[str, Any]]:
+    """
+    Стан для кожного каналу. Каналів без рядка ще немає в розкладі — для них
+    last_head_id / last_polled_ts беруться з parser_channel_cursors, а rate_hint —
+    з кількості parsed_items за history_days (нижня оцінка до першого виміру).
+    """
+    ensure_channel_schedule_table()
+    from parser.storage.channel_cursors import ensure_parser_cursors_table
+
+    ensure_parser_cursors_table()
+    conn = get_connection()
+    out: dict[str, dict[str, Any]] = {}
+    for row in conn.execute(
+        "SELECT source_channel, rate_per_hour, interval_sec, last_head_id, last_polled_ts, next_due_ts "
+        "FROM parser_channel_schedule"
+    ).fetchall():
+        out[row["source_channel"]] = dict(row)
+
+    missing = [ch for ch in channels if ch not in out]
+    if missing:
+        cursors = {
+            row["source_channel"]: row
+            for row in conn.execute(
+                """
+                SELECT source_channel, MAX(last_message_id) AS head,
+                       MAX(CAST(strftime('%s', updated_at) AS INTEGER)) AS ts
+                FROM parser_channel_cursors
+                GROUP BY source_channel
+                """
+            ).fetchall()
+        }
+        since = int(time.time()) - history_days * 86400
+        counts = {
+            row[0]: int(row[1])
+            for row in conn.execute(
+                """
+                SELECT source_channel, COUNT(*) FROM parsed_items
+                WHERE created_ts >= ?
+                GROUP BY source_channel
+                """,
+                (since,),
+            ).fetchall()
+        }
+        for ch in missing:
+            cur = cursors.get(ch)
+            out[ch] = {
+                "source_channel": ch,
+                "rate_per_hour": None,
+                "interval_sec": 0,
+                "last_head_id": int(cur["head"] or 0) if cur else 0,
+                "last_polled_ts": int(cur["ts"] or 0) if cur else 0,
+                "next_due_ts": 0,
+                "rate_hint": counts[ch] / (history_days * 24.0) if ch in counts else None,
+            }
+    conn.close()
+    return out
+
+
+def defer_channels(due: dict[str, int]) -> None:
+    """Попередній next_due_ts для взятих у цикл каналів — збій каналу не опитується щотіку."""
+    if not due:
+        return
+    ensure_channel_schedule_table()
+    conn = get_connection()
+    conn.executemany(
+        """
+        INSERT INTO parser_channel_schedule (source_channel, next_due_ts) VALUES (?, ?)
+        ON CONFLICT(source_channel) DO UPDATE SET next_due_ts = excluded.next_due_ts
+        """,
+        list(due.items()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def save_channel_poll(
+    source_channel: str,
+    *,
+    rate_per_hour: float | None,
+    interval_sec: int,
+    head_id: int,
+    polled_ts: int,
+    next_due_ts: int,
+) -> None:
+    ensure_channel_schedule_table()
+    conn = get_connection()
+    conn.execute(
+        """
+        INSERT INTO parser_channel_schedule
+            (source_channel, rate_per_hour, interval_sec, last_head_id, last_polled_ts, next_due_ts)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(source_channel) DO UPDATE SET
+            rate_per_hour = excluded.rate_per_hour,
+            interval_sec = excluded.interval_sec,
+            last_head_id = MAX(last_head_id, excluded.last_head_id),
+            last_polled_ts = excluded.last_polled_ts,
+            next_due_ts = excluded.next_due_ts
+        """,
+        (source_channel, rate_per_hour, int(interval_sec), int(head_id), int(polled_ts), int(next_due_ts)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_channel_schedule_row(source_channel: str, parser_type: str = "default") -> dict[str, Any]:
+    """Попередній вимір каналу; до першого — head і час із parser_channel_cursors."""
+    ensure_channel_schedule_table()
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT rate_per_hour, last_head_id, last_polled_ts FROM parser_channel_schedule WHERE source_channel = ?",
+        (source_channel,),
+    ).fetchone()
+    out = dict(row) if row else {"rate_per_hour": None, "last_head_id": 0, "last_polled_ts": 0}
+    if not out["last_head_id"]:
+        cur = conn.execute(
+            """
+            SELECT last_message_id, CAST(strftime('%s', updated_at) AS INTEGER)
+            FROM parser_channel_cursors
+            WHERE source_channel = ? AND parser_type = ?
+            """,
+            (source_channel, parser_type),
+        ).fetchone()
+        if cur:
+            out["last_head_id"] = int(cur[0] or 0)
+            out["last_polled_ts"] = int(cur[1] or 0)
+    conn.close()
+    return out
@@ -0,0 +1,112 @@
+"""
+Кеш резолву invite-посилань для Pyrogram: (channel_key, акаунт) → numeric peer id + access_hash.
+
+Лише invite: без кешу кожен цикл іде CheckChatInvite / get_chat / join_chat, що рахуються
+у flood-ліміти; @username Pyrogram резолвить сам. Запис живе PARSER_CHAT_TARGET_TTL_HOURS
+і скидається на PEER_ID_INVALID / CHANNEL_PRIVATE тощо (telegram_meta.invalidate_chat_target).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Optional
+
+from parser.storage.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+_chat_targets_table_ready = False
+
+
+def ensure_chat_targets_table() -> None:
+    global _chat_targets_table_ready
+    if _chat_targets_table_ready:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parser_chat_targets (
+            channel_key  TEXT NOT NULL,
+            account      TEXT NOT NULL,
+            peer_id      INTEGER NOT NULL,
+            access_hash  INTEGER NOT NULL DEFAULT 0,
+            peer_type    TEXT NOT NULL,
+            resolved_ts  INTEGER NOT NULL,
+            PRIMARY KEY (channel_key, account)
+        )
+    """)
+    conn.commit()
+    conn.close()
+    _chat_targets_table_ready = True
+
+
+def get_cached_chat_target(
+    channel_key: str,
+    account: str,
+    ttl_sec: int,
+) -> Optional[dict[str, Any]]:
+    """peer_id / access_hash / peer_type, якщо запис молодший за ttl_sec."""
+    if not channel_key or ttl_sec <= 0:
+        return None
+    ensure_chat_targets_table()
+    conn = get_connection()
+    row = conn.execute(
+        """
+        SELECT peer_id, access_hash, peer_type FROM parser_chat_targets
+        WHERE channel_key = ? AND account = ? AND resolved_ts >= ?
+        """,
+        (channel_key, account, int(time.time()) - int(ttl_sec)),
+    ).fetchone()
+    conn.close()
+    if not row:
+        return None
+    return {
+        "peer_id": int(row["peer_id"]),
+        "access_hash": int(row["access_hash"] or 0),
+        "peer_type": str(row["peer_type"]),
+    }
+
+
+def save_chat_target(
+    channel_key: str,
+    account: str,
+    peer_id: int,
+    access_hash: int,
+    peer_type: str,
+) -> None:
+    if not channel_key:
+        return
+    ensure_chat_targets_table()
+    conn = get_connection()
+    conn.execute(
+        """
+        INSERT INTO parser_chat_targets (channel_key, account, peer_id, access_hash, peer_type, resolved_ts)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(channel_key, account) DO UPDATE SET
+            peer_id = excluded.peer_id,
+            access_hash = excluded.access_hash,
+            peer_type = excluded.peer_type,
+            resolved_ts = excluded.resolved_ts
+        """,
+        (channel_key, account, int(peer_id), int(access_hash or 0), peer_type, int(time.time())),
+    )
+    conn.commit()
+    conn.close()
+
+
+def delete_chat_target(channel_key: str, account: str | None = None) -> int:
+    """account=None — для всіх акаунтів (канал змінив посилання / видалений)."""
+    ensure_chat_targets_table()
+    conn = get_connection()
+    if account is None:
+        cur = conn.execute("DELETE FROM parser_chat_targets WHERE channel_key = ?", (channel_key,))
+    else:
+        cur = conn.execute(
+            "DELETE FROM parser_chat_targets WHERE channel_key = ? AND account = ?",
+            (channel_key, account),
+        )
+    conn.commit()
+    deleted = cur.rowcount or 0
+    conn.close()
+    return deleted
@@ -23,6 +23,12 @@ _EXECUTE_RETRIES = 15
 _cycle_conn: sqlite3.Connection | None = None
 _cycle_depth = 0
 
+# Потоки пулу (parser.storage.db_pool): get_connection() віддає з'єднання свого потоку.
+_pool_local = threading.local()
+
+# journal_mode=WAL зберігається у файлі БД, checkpoint робить writer пулу — раз на процес.
+_wal_ready = False
+
 
 def is_sqlite_locked_error(err: BaseException) -> bool:
     cur: BaseException | None = err
@@ -38,6 +44,7 @@ def is_sqlite_locked_error(err: BaseException) -> bool:
 
 
 def _raw_connect() -> sqlite3.Connection:
+    global _wal_ready
     last_err: Exception | None = None
     for attempt in range(_CONNECT_RETRIES):
         try:
@@ -48,11 +55,13 @@ def _raw_connect() -> sqlite3.Connection:
                 isolation_level=None,
             )
             conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA journal_mode = WAL;")
             conn.execute("PRAGMA busy_timeout = 120000;")
+            if not _wal_ready:
+                conn.execute("PRAGMA journal_mode = WAL;")
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE);")
+                _wal_ready = True
             conn.execute("PRAGMA foreign_keys = ON;")
             conn.execute("PRAGMA synchronous = NORMAL;")
-            conn.execute("PRAGMA wal_checkpoint(PASSIVE);")
             return conn
         except sqlite3.OperationalError as e:
             last_err = e
@@ -115,6 +124,27 @@ class ParserConnection:
             _DB_LOCK.release()
 
 
+class PooledConnection(ParserConnection):
+    """
+    З'єднання потоку пулу: close() — no-op; commit() теж — транзакцію writer
+    закриває сам після пачки операцій (group commit).
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        super().__init__(conn, managed_close=False)
+
+    def commit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def bind_thread_connection(conn: PooledConnection | None) -> None:
+    """Лише для потоків db_pool: з'єднання, яке get_connection() поверне в цьому потоці."""
+    _pool_local.conn = conn
+
+
 class ParserCycleConnection(ParserConnection):
     """Під час parser_db_cycle(): close() лише зменшує лічильник."""
 
@@ -155,6 +185,10 @@ def parser_db_cycle() -> Iterator[None]:
 
 
 def get_connection() -> sqlite3.Connection:
+    pooled = getattr(_pool_local, "conn", None)
+    if pooled is not None:
+        return pooled  # type: ignore[return-value]
+
     if _cycle_conn is not None:
         global _cycle_depth
         _cycle_depth += 1
@@ -174,14 +208,25 @@ def get_connection() -> sqlite3.Connection:
 
 def ensure_parser_storage() -> None:
     """Один раз на цикл парсингу: таблиці + міграції."""
+    from parser.storage.ai_batches import ensure_ai_batches_table
     from parser.storage.channel_cursors import ensure_parser_cursors_table
+    from parser.storage.channel_schedule import ensure_channel_schedule_table
+    from parser.storage.chat_targets import ensure_chat_targets_table
+    from parser.storage.listing_dedup import ensure_listing_dedup_schema, refresh_listing_dedup_keys
     from parser.storage.parsed_items import ensure_parsed_items_table
+    from parser.storage.photo_store import ensure_photo_store_table
     from parser.storage.parser_accounts_db import (
         ensure_parser_accounts_table,
         migrate_env_accounts_if_empty,
     )
 
     ensure_parsed_items_table()
+    ensure_listing_dedup_schema(recheck=True)
+    refresh_listing_dedup_keys()
     ensure_parser_cursors_table()
+    ensure_channel_schedule_table()
+    ensure_chat_targets_table()
+    ensure_ai_batches_table()
+    ensure_photo_store_table()
     ensure_parser_accounts_table()
     migrate_env_accounts_if_empty()
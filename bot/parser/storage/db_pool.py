@@ -0,0 +1,240 @@
+"""
+Пул SQLite для парсера: паралельні read-only WAL-читачі + один writer-потік.
+
+await db_read(fn, ...) / await db_write(fn, ...) виконують звичайну storage-функцію
+(parsed_item_is_semantic_duplicate, insert_parsed_items, ...) у потоці пулу: get_connection()
+там повертає з'єднання цього потоку, тож event loop не блокується на sqlite3, а глобальний
+_DB_LOCK не серіалізує читання.
+
+Writer забирає з черги все, що накопичилось (до PARSER_DB_WRITE_BATCH), і виконує
+однією транзакцією BEGIN IMMEDIATE … COMMIT; кожна операція — у своєму SAVEPOINT,
+тож помилка однієї не відкочує інші. Результат віддається лише після COMMIT.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import functools
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from parser.config.settings import (
+    PARSER_DB_POOL_ENABLED,
+    PARSER_DB_READERS,
+    PARSER_DB_WRITE_BATCH,
+)
+from parser.storage.connection import (
+    PooledConnection,
+    _raw_connect,
+    _retry_execute,
+    bind_thread_connection,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_STOP = object()
+# PASSIVE checkpoint з writer — замість checkpoint на кожне нове з'єднання.
+_CHECKPOINT_EVERY_SEC = 60.0
+
+
+class _WriteOp:
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+
+
+class ParserDbPool:
+    def __init__(
+        self,
+        *,
+        readers: int = PARSER_DB_READERS,
+        write_batch: int = PARSER_DB_WRITE_BATCH,
+    ):
+        self.write_batch = max(1, int(write_batch))
+        self._readers = ThreadPoolExecutor(
+            max_workers=max(1, int(readers)),
+            thread_name_prefix="parser-db-read",
+            initializer=self._init_reader,
+        )
+        self._reader_conns: list[sqlite3.Connection] = []
+        self._reader_lock = threading.Lock()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._writer_loop, name="parser-db-write", daemon=True)
+        self._closed = False
+        self.stats = {"reads": 0, "writes": 0, "transactions": 0, "write_errors": 0}
+        self._writer.start()
+
+    # ── Читачі ─────────────────────────────────
+
+    def _init_reader(self) -> None:
+        conn = _raw_connect()
+        # Захист від випадкового запису через читача — такі виклики мають іти в db_write.
+        conn.execute("PRAGMA query_only = ON;")
+        with self._reader_lock:
+            self._reader_conns.append(conn)
+        bind_thread_connection(PooledConnection(conn))
+
+    async def read(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self._closed:
+            raise RuntimeError("parser DB pool закрито")
+        self.stats["reads"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, functools.partial(fn, *args, **kwargs))
+
+    # ── Writer ─────────────────────────────────
+
+    def submit_write(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+        """Future з результатом fn після COMMIT (можна .result() із sync-коду)."""
+        if self._closed:
+            raise RuntimeError("parser DB pool закрито")
+        op = _WriteOp(fn, args, kwargs)
+        self._queue.put(op)
+        return op.future
+
+    async def write(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await asyncio.wrap_future(self.submit_write(fn, *args, **kwargs))
+
+    def _writer_loop(self) -> None:
+        conn = _raw_connect()
+        bind_thread_connection(PooledConnection(conn))
+        last_checkpoint = time.monotonic()
+        try:
+            while True:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+                batch = [first]
+                stop = False
+                while len(batch) < self.write_batch:
+                    try:
+                        op = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if op is _STOP:
+                        stop = True
+                        break
+                    batch.append(op)
+                try:
+                    self._run_batch(conn, batch)
+                except Exception as e:  # потік writer не має падати
+                    logger.exception("parser DB writer: збій пачки")
+                    self._fail_batch(batch, e)
+                if time.monotonic() - last_checkpoint >= _CHECKPOINT_EVERY_SEC:
+                    try:
+                        conn.execute("PRAGMA wal_checkpoint(PASSIVE);")
+                    except sqlite3.Error as e:
+                        logger.debug("parser DB checkpoint: %s", e)
+                    last_checkpoint = time.monotonic()
+                if stop:
+                    break
+        finally:
+            bind_thread_connection(None)
+            conn.close()
+
+    def _run_batch(self, conn: sqlite3.Connection, batch: list[_WriteOp]) -> None:
+        results: list[tuple[_WriteOp, bool, Any]] = []
+        try:
+            _retry_execute(lambda: conn.execute("BEGIN IMMEDIATE"), op="begin")
+            for op in batch:
+                conn.execute("SAVEPOINT parser_write")
+                try:
+                    value = op.fn(*op.args, **op.kwargs)
+                except BaseException as e:  # noqa: BLE001 — віддаємо викликачу
+                    conn.execute("ROLLBACK TO parser_write")
+                    conn.execute("RELEASE parser_write")
+                    results.append((op, False, e))
+                else:
+                    conn.execute("RELEASE parser_write")
+                    results.append((op, True, value))
+            _retry_execute(conn.commit, op="commit")
+        except Exception as e:
+            # BEGIN / SAVEPOINT / COMMIT не вдалися (I/O, busy, операція сама завершила
+            # транзакцію) — пачку відкочуємо цілком, writer працює далі.
+            logger.error("parser DB writer: пачка з %s операцій не записана: %s", len(batch), e)
+            if conn.in_transaction:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    pass
+            self._fail_batch(batch, e)
+            return
+
+        self.stats["transactions"] += 1
+        for op, ok, value in results:
+            self.stats["writes"] += 1
+            if ok:
+                op.future.set_result(value)
+            else:
+                self.stats["write_errors"] += 1
+                op.future.set_exception(value)
+
+    def _fail_batch(self, batch: list[_WriteOp], exc: BaseException) -> None:
+        for op in batch:
+            if not op.future.done():
+                op.future.set_exception(exc)
+        self.stats["write_errors"] += len(batch)
+
+    # ── Життєвий цикл ──────────────────────────
+
+    def close(self) -> None:
+        """Дописує чергу writer, закриває з'єднання."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join(timeout=30.0)
+        self._readers.shutdown(wait=True)
+        with self._reader_lock:
+            for conn in self._reader_conns:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._reader_conns.clear()
+
+
+_pool: ParserDbPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_parser_db_pool() -> ParserDbPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParserDbPool()
+            atexit.register(close_parser_db_pool)
+        return _pool
+
+
+def close_parser_db_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+async def db_read(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Read-only storage-функція в потоці-читачі (PARSER_DB_POOL=0 — прямий виклик)."""
+    if not PARSER_DB_POOL_ENABLED:
+        return fn(*args, **kwargs)
+    return await get_parser_db_pool().read(fn, *args, **kwargs)
+
+
+async def db_write(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Storage-функція із записом у writer-потоці (group commit)."""
+    if not PARSER_DB_POOL_ENABLED:
+        return fn(*args, **kwargs)
+    return await get_parser_db_pool().write(fn, *args, **kwargs)
@@ -0,0 +1,112 @@
+"""Кеш embeddings за вмістом: sha256(модель + текст) → BLOB (репости й перечитування не платять вдруге)."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Iterable
+
+import numpy as np
+
+from parser.config.settings import PARSER_EMBEDDING_CACHE_DAYS, PARSER_EMBEDDING_STORAGE
+from parser.storage.connection import get_connection
+from parser.storage.embeddings import decode_embedding, encode_embedding
+
+logger = logging.getLogger(__name__)
+
+_cache_table_ready = False
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def ensure_embedding_cache_table() -> None:
+    global _cache_table_ready
+    if _cache_table_ready:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parser_embedding_cache (
+            cache_key   TEXT PRIMARY KEY,
+            model       TEXT NOT NULL,
+            vector      BLOB NOT NULL,
+            created_at  TEXT DEFAULT (datetime('now'))
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parser_embedding_cache_created "
+        "ON parser_embedding_cache(created_at)"
+    )
+    conn.commit()
+    conn.close()
+    _cache_table_ready = True
+
+
+def get_cached_embeddings(keys: Iterable[str]) -> dict[str, np.ndarray]:
+    keys = list(dict.fromkeys(k for k in keys if k))
+    if not keys:
+        return {}
+    ensure_embedding_cache_table()
+    conn = get_connection()
+    cursor = conn.cursor()
+    out: dict[str, np.ndarray] = {}
+    # SQLite: ≤ 999 параметрів у запиті
+    for i in range(0, len(keys), 500):
+        chunk = keys[i : i + 500]
+        cursor.execute(
+            f"""
+            SELECT cache_key, vector FROM parser_embedding_cache
+            WHERE cache_key IN ({",".join("?" * len(chunk))})
+            """,
+            chunk,
+        )
+        for row in cursor.fetchall():
+            vec = decode_embedding(row[1])
+            if vec is not None and vec.size:
+                out[str(row[0])] = vec
+    conn.close()
+    return out
+
+
+def put_cached_embeddings(model: str, items: dict[str, np.ndarray]) -> None:
+    if not items:
+        return
+    # JSON-режим зберігання для кешу не має сенсу — тоді float32.
+    fmt = PARSER_EMBEDDING_STORAGE if PARSER_EMBEDDING_STORAGE != "json" else "f32"
+    rows: list[tuple] = []
+    for key, vec in items.items():
+        blob = encode_embedding(vec, fmt)
+        if blob:
+            rows.append((key, model, blob))
+    if not rows:
+        return
+    ensure_embedding_cache_table()
+    conn = get_connection()
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO parser_embedding_cache (cache_key, model, vector, created_at)
+        VALUES (?, ?, ?, datetime('now'))
+        """,
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def prune_embedding_cache(days: int | None = None) -> int:
+    """Старші за N днів — видаляються (раз на цикл парсингу)."""
+    ensure_embedding_cache_table()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM parser_embedding_cache WHERE created_at < datetime('now', ?)",
+        (f"-{max(1, int(days or PARSER_EMBEDDING_CACHE_DAYS))} days",),
+    )
+    removed = cursor.rowcount or 0
+    conn.commit()
+    conn.close()
+    if removed:
+        logger.info("Embedding cache: видалено %s застарілих записів", removed)
+    return removed
@@ -0,0 +1,173 @@
+"""
+Бінарне зберігання embeddings у parsed_items.text_embedding_blob.
+
+Формат BLOB: 4 байти заголовка (b"EV" + код типу + резерв), для int8 ще float32 scale,
+далі вектор little-endian. Читання — np.frombuffer без копії (f32/f16).
+Старий JSON у text_embedding читається як раніше; migrate_embeddings_to_blob переносить його.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Callable, Optional, Sequence, Union
+
+import numpy as np
+
+from parser.config.settings import PARSER_EMBEDDING_STORAGE
+from parser.storage.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+EmbeddingPayload = Union[bytes, str]
+
+_MAGIC = b"EV"
+_HEADER_LEN = 4
+_SCALE_LEN = 4
+_CODES: dict[str, bytes] = {"f32": b"f", "f16": b"h", "i8": b"b"}
+_DTYPES: dict[bytes, np.dtype] = {
+    b"f": np.dtype("<f4"),
+    b"h": np.dtype("<f2"),
+    b"b": np.dtype("i1"),
+}
+STORAGE_FORMATS = ("json", *_CODES)
+
+
+def encode_embedding(
+    vec: Optional[Sequence[float] | np.ndarray],
+    fmt: str | None = None,
+) -> Optional[EmbeddingPayload]:
+    """bytes для f32/f16/i8, JSON-рядок для fmt=json (legacy)."""
+    if vec is None or len(vec) == 0:
+        return None
+    fmt = (fmt or PARSER_EMBEDDING_STORAGE).lower()
+    if fmt == "json":
+        return json.dumps([float(x) for x in vec], separators=(",", ":"))
+    code = _CODES.get(fmt)
+    if code is None:
+        raise ValueError(f"невідомий формат embeddings: {fmt!r} (очікується {STORAGE_FORMATS})")
+    arr = np.asarray(vec, dtype=np.float32).reshape(-1)
+    header = _MAGIC + code + b"\0"
+    if code == b"b":
+        peak = float(np.max(np.abs(arr))) if arr.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        quant = np.clip(np.rint(arr / scale), -127, 127).astype(np.int8)
+        return header + np.float32(scale).astype("<f4").tobytes() + quant.tobytes()
+    return header + arr.astype(_DTYPES[code]).tobytes()
+
+
+def decode_embedding(raw: Optional[EmbeddingPayload | memoryview]) -> Optional[np.ndarray]:
+    """
+    BLOB → np.frombuffer-view (f32/f16 без копії; i8 — деквантизація),
+    JSON-рядок → float32-масив. Пошкоджені дані → None.
+    """
+    if raw is None:
+        return None
+    if isinstance(raw, (bytes, memoryview)):
+        buf = bytes(raw) if isinstance(raw, memoryview) else raw
+        if len(buf) <= _HEADER_LEN or buf[:2] != _MAGIC:
+            return None
+        code = buf[2:3]
+        dtype = _DTYPES.get(code)
+        if dtype is None:
+            return None
+        if code == b"b":
+            if len(buf) <= _HEADER_LEN + _SCALE_LEN:
+                return None
+            scale = float(np.frombuffer(buf, dtype="<f4", count=1, offset=_HEADER_LEN)[0])
+            quant = np.frombuffer(buf, dtype=dtype, offset=_HEADER_LEN + _SCALE_LEN)
+            return quant.astype(np.float32) * np.float32(scale)
+        payload = len(buf) - _HEADER_LEN
+        if payload % dtype.itemsize:
+            return None
+        return np.frombuffer(buf, dtype=dtype, offset=_HEADER_LEN)
+    text = str(raw).strip()
+    if not text:
+        return None
+    try:
+        data = json.loads(text)
+    except Exception:
+        return None
+    if not isinstance(data, list) or not data:
+        return None
+    try:
+        return np.asarray(data, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+
+
+def migrate_embeddings_to_blob(
+    *,
+    fmt: str | None = None,
+    batch_size: int = 500,
+    dry_run: bool = False,
+    on_progress: Callable[[str], None] | None = None,
+) -> dict:
+    """
+    In-place: JSON text_embedding → text_embedding_blob, JSON-колонка обнуляється.
+    Партіями по batch_size, кожна в окремій транзакції (можна переривати й продовжувати).
+    """
+    from parser.storage.parsed_items import ensure_parsed_items_table
+
+    fmt = (fmt or PARSER_EMBEDDING_STORAGE).lower()
+    if fmt == "json":
+        raise ValueError("migrate_embeddings_to_blob: формат json — нема куди мігрувати")
+    ensure_parsed_items_table()
+
+    stats = {"converted": 0, "invalid": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = 0
+    while True:
+        conn = get_connection()
+        try:
+            rows = conn.execute(
+                """
+                SELECT id, text_embedding FROM parsed_items
+                WHERE id > ?
+                  AND text_embedding IS NOT NULL
+                  AND text_embedding_blob IS NULL
+                ORDER BY id
+                LIMIT ?
+                """,
+                (last_id, max(1, int(batch_size))),
+            ).fetchall()
+            if not rows:
+                break
+            updates: list[tuple] = []
+            for row in rows:
+                item_id, raw = int(row[0]), row[1]
+                last_id = item_id
+                vec = decode_embedding(raw)
+                blob = encode_embedding(vec, fmt) if vec is not None else None
+                stats["bytes_before"] += len(str(raw or "").encode("utf-8"))
+                if blob is None:
+                    stats["invalid"] += 1
+                    updates.append((None, item_id))
+                    continue
+                stats["converted"] += 1
+                stats["bytes_after"] += len(blob)
+                updates.append((blob, item_id))
+            if not dry_run:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    """
+                    UPDATE parsed_items
+                    SET text_embedding_blob = ?, text_embedding = NULL
+                    WHERE id = ?
+                    """,
+                    updates,
+                )
+                conn.execute("COMMIT")
+        finally:
+            conn.close()
+        if on_progress:
+            on_progress(
+                f"embeddings: до id={last_id} — конвертовано {stats['converted']}, "
+                f"пошкоджених {stats['invalid']}"
+            )
+    logger.info(
+        "migrate_embeddings_to_blob(%s%s): %s",
+        fmt,
+        ", dry-run" if dry_run else "",
+        stats,
+    )
+    return stats
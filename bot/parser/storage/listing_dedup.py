@@ -4,6 +4,9 @@ from __future__ import annotations
 
 import logging
 import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from parser.config.settings import PARSER_DEDUP_DAYS
@@ -12,6 +15,156 @@ from parser.storage.parsed_items import fingerprint_title_desc
 
 logger = logging.getLogger(__name__)
 
+# Скільки активних оголошень без dedupKey дораховуємо за цикл (решту — наступного разу
+# або parser.scripts.backfill_listing_dedup_keys).
+_REFRESH_PER_CYCLE = 2000
+_REFRESH_BATCH = 500
+
+_schema_ready = False
+
+# Об'єкти парсера на Prisma-таблиці Listing. У schema.prisma їх не виразити (expression- і
+# partial-індекси, тригер), тож `prisma db push` / `migrate dev` бачать їх як drift і можуть
+# видалити; ensure_parser_storage на старті циклу перевіряє їх і створює знову.
+_LISTING_PARSER_OBJECTS = (
+    "idx_listing_active_dedup_key",
+    "trg_listing_dedup_key_reset",
+    "idx_listing_status_created_dt",
+    "idx_listing_status_expires_dt",
+)
+
+
+def _utc_cutoff(**delta) -> str:
+    """Текст UTC у форматі datetime() SQLite: порівняння з параметром замість datetime('now', ?)."""
+    return (datetime.now(timezone.utc) - timedelta(**delta)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def listing_dedup_key(title: str, description: str, price: Optional[str], is_free) -> str:
+    """Listing.dedupKey — fingerprint_title_desc по збережених полях ('' — текст закороткий)."""
+    return fingerprint_title_desc(
+        str(title or ""),
+        str(description or ""),
+        price=str(price or ""),
+        is_free=is_free in (1, True, "1"),
+    )
+
+
+def ensure_listing_dedup_schema(*, recheck: bool = False) -> None:
+    """
+    Listing.dedupKey (є і в schema.prisma) + частковий індекс по активних і
+    expression-індекси під фільтри дедупу. Без таблиці Listing — пропускаємо.
+
+    Prisma/адмінка пишуть Listing без dedupKey: тригер скидає ключ у NULL при зміні
+    title/description/price/isFree, refresh_listing_dedup_keys дораховує його на старті циклу.
+    recheck — ще раз звірити _LISTING_PARSER_OBJECTS (раз на цикл: їх міг прибрати prisma db push).
+    """
+    global _schema_ready
+    if _schema_ready and not recheck:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Listing'")
+    if cursor.fetchone() is None:
+        conn.close()
+        return
+    if _schema_ready:
+        cursor.execute(
+            f"""
+            SELECT name FROM sqlite_master
+            WHERE tbl_name = 'Listing' AND name IN ({",".join("?" * len(_LISTING_PARSER_OBJECTS))})
+            """,
+            _LISTING_PARSER_OBJECTS,
+        )
+        present = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in _LISTING_PARSER_OBJECTS if name not in present]
+        if not missing:
+            conn.close()
+            return
+        logger.warning("listing_dedup: немає %s (prisma db push?) — створюємо знову", ", ".join(missing))
+    cursor.execute("PRAGMA table_info(Listing)")
+    if "dedupKey" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE Listing ADD COLUMN dedupKey TEXT")
+        logger.info("listing_dedup: додано колонку Listing.dedupKey")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_listing_active_dedup_key "
+        "ON Listing(dedupKey, status, datetime(createdAt)) WHERE status = 'active'"
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_listing_dedup_key_reset
+        AFTER UPDATE OF title, description, price, isFree ON Listing
+        WHEN NEW.dedupKey IS OLD.dedupKey
+          AND (
+            NEW.title IS NOT OLD.title
+            OR NEW.description IS NOT OLD.description
+            OR NEW.price IS NOT OLD.price
+            OR NEW.isFree IS NOT OLD.isFree
+          )
+        BEGIN
+            UPDATE Listing SET dedupKey = NULL WHERE id = NEW.id;
+        END
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_listing_status_created_dt "
+        "ON Listing(status, datetime(createdAt))"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_listing_status_expires_dt "
+        "ON Listing(status, datetime(expiresAt))"
+    )
+    conn.commit()
+    conn.close()
+    _schema_ready = True
+
+
+def refresh_listing_dedup_keys(
+    *,
+    limit: Optional[int] = _REFRESH_PER_CYCLE,
+    all_rows: bool = False,
+    batch: int = _REFRESH_BATCH,
+) -> int:
+    """
+    Рахує dedupKey для активних оголошень без ключа (all_rows — для всіх рядків Listing).
+    limit=None — без обмеження. Повертає кількість оновлених рядків.
+    """
+    ensure_listing_dedup_schema()
+    if not _schema_ready:
+        return 0
+    where = "1 = 1" if all_rows else "status = 'active' AND dedupKey IS NULL"
+    conn = get_connection()
+    cursor = conn.cursor()
+    last_id = 0
+    done = 0
+    while limit is None or done < limit:
+        take = batch if limit is None else min(batch, limit - done)
+        cursor.execute(
+            f"""
+            SELECT id, title, description, price, isFree
+            FROM Listing
+            WHERE {where} AND id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (last_id, take),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany(
+            "UPDATE Listing SET dedupKey = ? WHERE id = ?",
+            [
+                (listing_dedup_key(r["title"], r["description"], r["price"], r["isFree"]), r["id"])
+                for r in rows
+            ],
+        )
+        conn.commit()
+        last_id = int(rows[-1]["id"])
+        done += len(rows)
+    conn.close()
+    if done:
+        logger.info("listing_dedup: оновлено dedupKey для %s оголошень", done)
+    return done
+
 
 def _norm_token(s: str) -> str:
     s = (s or "").lower()
@@ -20,92 +173,147 @@ def _norm_token(s: str) -> str:
 
 
 def active_listing_duplicate(dedup_key: Optional[str], title: str, description: str) -> bool:
-    """Чи є активне оголошення з тим самим dedup_key."""
+    """Чи є активне оголошення з тим самим dedup_key (Listing.dedupKey, частковий індекс)."""
     if not dedup_key:
         return False
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
         """
-        SELECT id, title, description, price, isFree
+        SELECT id, title
         FROM Listing
-        WHERE status = 'active'
-          AND (expiresAt IS NULL OR datetime(expiresAt) > datetime('now'))
-          AND datetime(createdAt) >= datetime('now', ?)
-        ORDER BY id DESC
-        LIMIT 800
+        WHERE dedupKey = ?
+          AND status = 'active'
+          AND datetime(createdAt) >= ?
+          AND (expiresAt IS NULL OR datetime(expiresAt) > ?)
+        LIMIT 1
         """,
-        (f"-{PARSER_DEDUP_DAYS} days",),
+        (dedup_key, _utc_cutoff(days=PARSER_DEDUP_DAYS), _utc_cutoff()),
     )
-    rows = cursor.fetchall()
+    row = cursor.fetchone()
     conn.close()
-    for row in rows:
-        data = dict(row)
-        row_free = data.get("isFree") in (1, True, "1")
-        existing = fingerprint_title_desc(
-            str(data.get("title") or ""),
-            str(data.get("description") or ""),
-            price=str(data.get("price") or ""),
-            is_free=row_free,
-        )
-        if existing and existing == dedup_key:
-            logger.info(
-                "Marketplace dedup hit: listing #%s title=%r",
-                data.get("id"),
-                (data.get("title") or "")[:50],
-            )
-            return True
-    return False
+    if row is None:
+        return False
+    logger.info(
+        "Marketplace dedup hit: listing #%s title=%r",
+        row["id"],
+        (row["title"] or "")[:50],
+    )
+    return True
 
 
-def recent_listings_for_ai_context(
-    *,
-    title: str = "",
-    location: str = "",
-    limit_active: int = 15,
-    limit_pending: int = 12,
-) -> dict:
-    """Контекст для AI: активні listings + pending parsed_items."""
-    conn = get_connection()
-    cursor = conn.cursor()
+# Знімок контексту AI screen на цикл: два запити на цикл замість двох на кожен пост.
+# Фільтр за локацією / першим словом title — у пам'яті (ai_context_from_snapshot).
+_AI_CONTEXT_TTL_SEC = 10 * 60
+_AI_CONTEXT_ACTIVE_MAX = 1000
+_AI_CONTEXT_PENDING_MAX = 3000
+
+
+@dataclass
+class AiContextSnapshot:
+    active: list[dict] = field(default_factory=list)  # id DESC
+    pending: list[tuple[int, str]] = field(default_factory=list)  # (id, title), найновіші першими
+    loaded_at: float = 0.0
+
+
+_ai_context: Optional[AiContextSnapshot] = None
 
-    loc = (location or "").strip()
-    loc_clause = ""
-    params_active: list = [f"-{PARSER_DEDUP_DAYS} days"]
-    if loc and loc.lower() not in ("germany", "deutschland"):
-        loc_clause = " AND (location LIKE ? OR location IS NULL OR location = '')"
-        params_active.append(f"%{loc}%")
-    params_active.append(limit_active)
 
+def load_ai_context_snapshot() -> AiContextSnapshot:
+    conn = get_connection()
+    cursor = conn.cursor()
     cursor.execute(
-        f"""
+        """
         SELECT id, title, location, price
         FROM Listing
         WHERE status = 'active'
-          AND (expiresAt IS NULL OR datetime(expiresAt) > datetime('now'))
-          AND datetime(createdAt) >= datetime('now', ?)
-          {loc_clause}
+          AND datetime(createdAt) >= ?
+          AND (expiresAt IS NULL OR datetime(expiresAt) > ?)
         ORDER BY id DESC
         LIMIT ?
         """,
-        params_active,
+        (_utc_cutoff(days=PARSER_DEDUP_DAYS), _utc_cutoff(), _AI_CONTEXT_ACTIVE_MAX),
     )
     active = [dict(r) for r in cursor.fetchall()]
-
-    title_token = _norm_token(title).split()[:3]
-    like = f"%{title_token[0]}%" if title_token else "%"
     cursor.execute(
         """
-        SELECT title FROM parsed_items
+        SELECT id, title FROM parsed_items
         WHERE status = 'pending'
-          AND datetime(created_at) >= datetime('now', '-7 days')
-          AND title LIKE ?
-        ORDER BY id DESC
+          AND created_ts >= ?
+        ORDER BY created_ts DESC
         LIMIT ?
         """,
-        (like, limit_pending),
+        (int(time.time()) - 7 * 86400, _AI_CONTEXT_PENDING_MAX),
+    )
+    # Вибірка — індексом за created_ts, порядок у знімку — id DESC (найновіші першими).
+    pending = sorted(
+        ((int(r["id"]), str(r["title"] or "")) for r in cursor.fetchall()),
+        reverse=True,
     )
-    pending = [str(dict(r).get("title") or "") for r in cursor.fetchall() if r]
     conn.close()
+    return AiContextSnapshot(active=active, pending=pending, loaded_at=time.monotonic())
+
+
+def current_ai_context_snapshot() -> Optional[AiContextSnapshot]:
+    """Знімок цього циклу; None — ще не завантажено або застарів (поза циклом парсингу)."""
+    snap = _ai_context
+    if snap is None or time.monotonic() - snap.loaded_at > _AI_CONTEXT_TTL_SEC:
+        return None
+    return snap
+
+
+def set_ai_context_snapshot(snapshot: Optional[AiContextSnapshot]) -> None:
+    global _ai_context
+    _ai_context = snapshot
+
+
+def reset_ai_context_snapshot() -> None:
+    set_ai_context_snapshot(None)
+
+
+def note_ai_context_pending(items: list[tuple[int, str]]) -> None:
+    """Щойно вставлені parsed_items (id, title) — у знімок: наступні пости циклу бачать їх як дублікати."""
+    snap = _ai_context
+    if snap is None:
+        return
+    fresh = [(int(i), str(t)) for i, t in items if i and t]
+    if fresh:
+        snap.pending[:0] = reversed(fresh)
+        del snap.pending[_AI_CONTEXT_PENDING_MAX:]
+
+
+def ai_context_from_snapshot(
+    snapshot: AiContextSnapshot,
+    *,
+    title: str = "",
+    location: str = "",
+    limit_active: int = 15,
+    limit_pending: int = 12,
+    exclude_id: Optional[int] = None,
+) -> dict:
+    """
+    Контекст для AI (активні listings + pending parsed_items) зі знімка — без SQL.
+    exclude_id — сам пост, якщо він уже в parsed_items (черга AI batch).
+    """
+    loc = (location or "").strip().lower()
+    if loc in ("germany", "deutschland"):
+        loc = ""
+    active: list[dict] = []
+    for row in snapshot.active:
+        row_loc = str(row.get("location") or "").lower()
+        if not loc or not row_loc or loc in row_loc:
+            active.append(row)
+            if len(active) >= limit_active:
+                break
 
+    title_token = _norm_token(title).split()[:1]
+    token = title_token[0] if title_token else ""
+    pending: list[str] = []
+    for item_id, t in snapshot.pending:
+        if item_id == exclude_id:
+            continue
+        if not token or token in t.lower():
+            pending.append(t)
+            if len(pending) >= limit_pending:
+                break
     return {"active_listings": active, "pending_titles": pending}
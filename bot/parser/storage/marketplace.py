@@ -15,6 +15,8 @@ logger = logging.getLogger(__name__)
 
 
 def copy_parser_images_to_public(rel_paths: list[str], prefix: str = "parser") -> list[str]:
+    from parser.storage.photo_store import link_or_copy, register_photo_files
+
     rel_paths = list(rel_paths or [])[:PARSER_MAX_PHOTOS]
     if not rel_paths:
         return _copy_default_listing_photo(prefix)
@@ -46,12 +48,15 @@ def copy_parser_images_to_public(rel_paths: list[str], prefix: str = "parser") -
         name = f"{prefix}_{token}_{i}{ext}"
         dest = dest_dir / name
         try:
-            shutil.copy2(src, dest)
+            # Hardlink на blob parsed_photos (своє ім'я на оголошення — видалення одного
+            # не зачіпає інших); copy лише між різними розділами / bind mount.
+            link_or_copy(src, dest)
             out.append(f"/listings/originals/{name}")
         except OSError as e:
             logger.error("Не вдалося скопіювати фото %s → %s: %s", src, dest, e)
     if not out:
         return _copy_default_listing_photo(prefix)
+    register_photo_files(p.lstrip("/") for p in out)
     return out
 
 
@@ -78,6 +83,9 @@ def _copy_default_listing_photo(prefix: str) -> list[str]:
     try:
         shutil.copy2(src, dest)
         logger.info("Використано дефолтне фото для %s", prefix)
+        from parser.storage.photo_store import register_photo_files
+
+        register_photo_files([f"listings/originals/{name}"])
         return [f"/listings/originals/{name}"]
     except OSError as e:
         logger.error("Не вдалося скопіювати дефолтне фото: %s", e)
@@ -121,8 +129,10 @@ def create_marketplace_listing(
     images: list[str],
 ) -> int:
     from parser.core.location import canonicalize_known_city
+    from parser.storage.listing_dedup import ensure_listing_dedup_schema, listing_dedup_key
     from utils.location_normalization import normalize_city_name
 
+    ensure_listing_dedup_schema()
     conn = get_connection()
     cursor = conn.cursor()
 
@@ -164,18 +174,18 @@ def create_marketplace_listing(
             category, subcategory, condition, location,
             status, moderationStatus,
             images, optimizedImages,
-            createdAt, updatedAt, publishedAt, expiresAt
+            createdAt, updatedAt, publishedAt, expiresAt, dedupKey
         ) VALUES (
             ?, ?, ?, ?, ?, ?,
             ?, ?, ?, ?,
             'active', 'approved',
             ?, NULL,
-            datetime('now'), datetime('now'), datetime('now'), {expires_at_sql}
+            datetime('now'), datetime('now'), datetime('now'), {expires_at_sql}, ?
         )
     """, (
         user_id, title, description, price_str, currency, int(is_free),
         category, subcategory, condition or default_condition, loc,
-        images_json,
+        images_json, listing_dedup_key(title, description, price_str, is_free),
     ))
     conn.commit()
     listing_id = cursor.lastrowid
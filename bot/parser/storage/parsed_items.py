@@ -4,24 +4,52 @@ import hashlib
 import json
 import logging
 import re
-import unicodedata
+import time
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Sequence
 
 from parser.config.settings import (
     PARSER_DEDUP_DAYS,
     PARSER_PENDING_DEDUP_HOURS,
     PARSER_TEXT_DEDUP_DAYS,
 )
+from parser.core.text import post_text
 from parser.storage.connection import get_connection
 
 logger = logging.getLogger(__name__)
 
-_DEDUP_WINDOW = f"-{PARSER_DEDUP_DAYS} days"
-_TEXT_DEDUP_WINDOW = f"-{PARSER_TEXT_DEDUP_DAYS} days"
-_PENDING_DEDUP_WINDOW = f"-{PARSER_PENDING_DEDUP_HOURS} hours"
 _schema_ready = False
 
+# Межі вікон дедупу рахуються раз на запит у Python і потрапляють у SQL через однорядковий
+# CTE dedup_cut: now — текст UTC (для Listing.expiresAt), *_after — unix-секунди для created_ts.
+_CUTOFFS_CTE = "dedup_cut(now, dedup_after, pending_after, text_after) AS (SELECT ?, ?, ?, ?)"
+
+
+def _sqlite_utc(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _dedup_cutoffs(*, dedup_days: int | None = None) -> list:
+    """Параметри для _CUTOFFS_CTE: now, вікно дедупу, pending-вікно, вікно text-dedup."""
+    now = datetime.now(timezone.utc)
+    ts = int(now.timestamp())
+    return [
+        _sqlite_utc(now),
+        ts - int(dedup_days or PARSER_DEDUP_DAYS) * 86400,
+        ts - int(PARSER_PENDING_DEDUP_HOURS) * 3600,
+        ts - int(PARSER_TEXT_DEDUP_DAYS) * 86400,
+    ]
+
+
+def _sql_listing_live(alias: str = "pi") -> str:
+    """Оголошення запису ще активне на маркетплейсі (потрібен CTE dedup_cut)."""
+    return f"""EXISTS (
+        SELECT 1 FROM Listing l
+        WHERE l.id = {alias}.marketplace_listing_id
+          AND l.status = 'active'
+          AND (l.expiresAt IS NULL OR datetime(l.expiresAt) > dedup_cut.now)
+    )"""
+
 
 def marketplace_listing_is_live(listing_id: int) -> bool:
     """Чи оголошення ще активне на маркетплейсі (не прострочене)."""
@@ -30,39 +58,48 @@ def marketplace_listing_is_live(listing_id: int) -> bool:
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        """
-        SELECT 1 FROM Listing
-        WHERE id = ?
-          AND status = 'active'
-          AND (expiresAt IS NULL OR datetime(expiresAt) > datetime('now'))
-        LIMIT 1
+        f"""
+        WITH {_CUTOFFS_CTE}
+        SELECT 1 FROM dedup_cut, (SELECT ? AS marketplace_listing_id) pi
+        WHERE {_sql_listing_live("pi")}
         """,
-        (int(listing_id),),
+        (*_dedup_cutoffs(), int(listing_id)),
     )
     live = cursor.fetchone() is not None
     conn.close()
     return live
 
 
-def _is_within_dedup_window(created_at: Optional[str]) -> bool:
+def _created_ts(created_at: Optional[str]) -> Optional[int]:
+    """unix-секунди з тексту SQLite / ISO (як strftime('%s', created_at)); None — не розібрано."""
     if not created_at:
-        return False
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT 1 WHERE datetime(?) >= datetime('now', ?)",
-        (created_at, _DEDUP_WINDOW),
-    )
-    within = cursor.fetchone() is not None
-    conn.close()
-    return within
+        return None
+    try:
+        dt = datetime.fromisoformat(str(created_at).strip())
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _is_within_dedup_window(created_at: Optional[str]) -> bool:
+    """created_at не старший за PARSER_DEDUP_DAYS — без запиту до БД."""
+    ts = _created_ts(created_at)
+    return ts is not None and ts >= _dedup_cutoffs()[1]
 
 
 def parsed_item_row_blocks_duplicate(item: dict) -> bool:
     """
     Чи старий запис parsed_items ще блокує повторне додавання.
     Після деактивації на маркетплейсі (30 днів) — ні.
+
+    Рядки з prefetch / clear_repostable / claimed уже мають blocks_duplicate
+    (_sql_row_blocks_duplicate); нижче — та сама логіка для довільного dict.
     """
+    if item.get("blocks_duplicate") is not None:
+        return bool(item["blocks_duplicate"])
+
     parser_type = item.get("parser_type") or "default"
     if parser_type == "services_channel":
         mp = (item.get("marketplace_mod_status") or item.get("status") or "pending").lower()
@@ -72,8 +109,9 @@ def parsed_item_row_blocks_duplicate(item: dict) -> bool:
         if mp == "pending" or ch == "pending":
             return True
         if mp == "approved":
-            listing_id = item.get("marketplace_listing_id")
-            if listing_id and marketplace_listing_is_live(int(listing_id)):
+            if item.get("marketplace_listing_id") and marketplace_listing_is_live(
+                int(item["marketplace_listing_id"])
+            ):
                 return True
             if _is_within_dedup_window(item.get("created_at")):
                 return True
@@ -85,96 +123,180 @@ def parsed_item_row_blocks_duplicate(item: dict) -> bool:
     if status == "rejected":
         return False
 
-    listing_id = item.get("marketplace_listing_id")
-    if listing_id:
-        return marketplace_listing_is_live(int(listing_id))
+    if item.get("marketplace_listing_id"):
+        return marketplace_listing_is_live(int(item["marketplace_listing_id"]))
 
     if not _is_within_dedup_window(item.get("created_at")):
         return False
 
-    parser_type = item.get("parser_type") or "default"
-    if status == "pending":
-        return True
-    if status == "approved" and parser_type == "services_channel":
-        return True
-    return False
+    return status == "pending"
+
+
+def _sql_row_blocks_duplicate(alias: str = "pi") -> str:
+    """SQL-вираз (0/1), еквівалентний parsed_item_row_blocks_duplicate; потрібен CTE dedup_cut."""
+    mp = f"LOWER(COALESCE(NULLIF({alias}.marketplace_mod_status, ''), NULLIF({alias}.status, ''), 'pending'))"
+    ch = f"LOWER(COALESCE(NULLIF({alias}.channel_mod_status, ''), NULLIF({alias}.status, ''), 'pending'))"
+    status = f"LOWER(TRIM(COALESCE({alias}.status, '')))"
+    has_listing = f"COALESCE({alias}.marketplace_listing_id, 0) != 0"
+    live = f"({has_listing} AND {_sql_listing_live(alias)})"
+    within = f"({alias}.created_ts >= dedup_cut.dedup_after)"
+    return f"""(CASE
+        WHEN COALESCE(NULLIF({alias}.parser_type, ''), 'default') = 'services_channel' THEN CASE
+            WHEN {mp} = 'rejected' AND {ch} = 'rejected' THEN 0
+            WHEN {mp} = 'pending' OR {ch} = 'pending' THEN 1
+            WHEN {mp} = 'approved' AND ({live} OR {within}) THEN 1
+            WHEN {ch} = 'approved' AND {within} THEN 1
+            ELSE 0
+        END
+        WHEN {status} = 'rejected' THEN 0
+        WHEN {has_listing} THEN {live}
+        WHEN {status} = 'pending' AND {within} THEN 1
+        ELSE 0
+    END)"""
 
 
 def _sql_parsed_item_blocks_duplicates(alias: str = "pi") -> str:
-    """SQL-фрагмент: запис ще блокує повтор (clear_repostable, cross-parser)."""
+    """SQL-фрагмент: запис ще блокує повтор (індекс fuzzy-дедупу); потрібен CTE dedup_cut."""
     return f"""(
-        {alias}.marketplace_listing_id IS NOT NULL
-        AND EXISTS (
-            SELECT 1 FROM Listing l
-            WHERE l.id = {alias}.marketplace_listing_id
-              AND l.status = 'active'
-              AND (l.expiresAt IS NULL OR datetime(l.expiresAt) > datetime('now'))
-        )
+        ({alias}.marketplace_listing_id IS NOT NULL AND {_sql_listing_live(alias)})
     )
     OR (
         {alias}.marketplace_listing_id IS NULL
         AND {alias}.status = 'pending'
-        AND datetime({alias}.created_at) >= datetime('now', ?)
+        AND {alias}.created_ts >= dedup_cut.dedup_after
     )
     OR (
         {alias}.marketplace_listing_id IS NULL
         AND {alias}.status = 'approved'
-        AND COALESCE({alias}.parser_type, 'default') = 'services_channel'
-        AND datetime({alias}.created_at) >= datetime('now', ?)
+        AND {alias}.parser_type = 'services_channel'
+        AND {alias}.created_ts >= dedup_cut.dedup_after
     )"""
 
 
 def _sql_semantic_dedup_blocks(alias: str = "pi") -> str:
     """
-    М'якший дедуп за dedup_key:
+    М'якший дедуп за dedup_key (потрібен CTE dedup_cut):
     - активне оголошення на MP — завжди блокує;
     - pending — лише коротке вікно (repost з новим message_id не висить днями);
     - services approved без MP — коротке вікно TEXT_DEDUP.
     """
     return f"""(
-        {alias}.marketplace_listing_id IS NOT NULL
-        AND EXISTS (
-            SELECT 1 FROM Listing l
-            WHERE l.id = {alias}.marketplace_listing_id
-              AND l.status = 'active'
-              AND (l.expiresAt IS NULL OR datetime(l.expiresAt) > datetime('now'))
-        )
+        ({alias}.marketplace_listing_id IS NOT NULL AND {_sql_listing_live(alias)})
     )
     OR (
         {alias}.marketplace_listing_id IS NULL
         AND {alias}.status = 'pending'
-        AND datetime({alias}.created_at) >= datetime('now', ?)
+        AND {alias}.created_ts >= dedup_cut.pending_after
     )
     OR (
         {alias}.marketplace_listing_id IS NULL
         AND {alias}.status = 'approved'
-        AND COALESCE({alias}.parser_type, 'default') = 'services_channel'
-        AND datetime({alias}.created_at) >= datetime('now', ?)
+        AND {alias}.parser_type = 'services_channel'
+        AND {alias}.created_ts >= dedup_cut.text_after
     )"""
 
 
+# In-cycle кеш стану (source_channel, message_id) → рядок або None («немає в БД»).
+# Заповнюється prefetch_parsed_item_states одним IN (...) на сторінку історії.
+_STATE_CACHE_TTL_SEC = 10 * 60
+_MISS = object()
+_state_cache: dict[tuple[str, int], tuple[float, Optional[dict]]] = {}
+
+
+def reset_parsed_item_state_cache() -> None:
+    _state_cache.clear()
+
+
+def _cached_state(source_channel: str, message_id: int):
+    entry = _state_cache.get((source_channel, int(message_id)))
+    if entry is None:
+        return _MISS
+    fetched_at, row = entry
+    if time.monotonic() - fetched_at > _STATE_CACHE_TTL_SEC:
+        _state_cache.pop((source_channel, int(message_id)), None)
+        return _MISS
+    return row
+
+
+def _remember_state(source_channel: str, message_id: int, row: Optional[dict]) -> None:
+    _state_cache[(source_channel, int(message_id))] = (time.monotonic(), row)
+
+
+def _forget_state(source_channel: str, message_id: int) -> None:
+    _state_cache.pop((source_channel, int(message_id)), None)
+
+
+def prefetch_parsed_item_states(source_channel: str, message_ids: list[int]) -> int:
+    """
+    Один запит на сторінку історії: існування, parser_type, статуси
+    і рішення blocks_duplicate. Повертає кількість знайдених рядків.
+    """
+    ids = sorted({int(m) for m in message_ids if m})
+    if not ids:
+        return 0
+    cutoffs = _dedup_cutoffs()
+    conn = get_connection()
+    cursor = conn.cursor()
+    found: dict[int, dict] = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        cursor.execute(
+            f"""
+            WITH {_CUTOFFS_CTE}
+            SELECT pi.id, pi.message_id, pi.parser_type, pi.status,
+                   pi.marketplace_mod_status, pi.channel_mod_status,
+                   pi.marketplace_listing_id, pi.created_at,
+                   {_sql_row_blocks_duplicate("pi")} AS blocks_duplicate
+            FROM parsed_items pi, dedup_cut
+            WHERE pi.source_channel = ?
+              AND pi.message_id IN ({",".join("?" * len(chunk))})
+            """,
+            [*cutoffs, source_channel, *chunk],
+        )
+        for row in cursor.fetchall():
+            found[int(row["message_id"])] = dict(row)
+    conn.close()
+    for message_id in ids:
+        _remember_state(source_channel, message_id, found.get(message_id))
+    return len(found)
+
+
+def parsed_item_may_be_repostable(source_channel: str, message_id: int) -> bool:
+    """Лише in-cycle кеш: False — clear_repostable_parsed_item точно нічого не видалить (без походу у writer)."""
+    cached = _cached_state(source_channel, message_id)
+    return cached is _MISS or (cached is not None and not parsed_item_row_blocks_duplicate(cached))
+
+
 def clear_repostable_parsed_item(source_channel: str, message_id: int) -> bool:
     """
     Видаляє parsed_items, якщо попереднє оголошення вже не на платформі —
     дозволяє повторно спарсити той самий пост / текст.
     """
+    if not parsed_item_may_be_repostable(source_channel, message_id):
+        return False
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT * FROM parsed_items WHERE source_channel = ? AND message_id = ?",
-        (source_channel, message_id),
+        f"""
+        WITH {_CUTOFFS_CTE}
+        SELECT pi.id, {_sql_row_blocks_duplicate("pi")} AS blocks_duplicate
+        FROM parsed_items pi, dedup_cut
+        WHERE pi.source_channel = ? AND pi.message_id = ?
+        """,
+        (*_dedup_cutoffs(), source_channel, message_id),
     )
     row = cursor.fetchone()
     if not row:
         conn.close()
         return False
     item = dict(row)
-    if parsed_item_row_blocks_duplicate(item):
+    if item["blocks_duplicate"]:
         conn.close()
         return False
     cursor.execute("DELETE FROM parsed_items WHERE id = ?", (item["id"],))
     conn.commit()
     conn.close()
+    _remember_state(source_channel, message_id, None)
     logger.info(
         "parsed_items: видалено застарілий id=%s (%s/%s) — дозволено повторний парсинг",
         item["id"],
@@ -246,6 +368,8 @@ def ensure_parsed_items_table():
     col_names4 = {row[1] for row in cursor.fetchall()}
     if "text_embedding" not in col_names4:
         cursor.execute("ALTER TABLE parsed_items ADD COLUMN text_embedding TEXT")
+    if "text_embedding_blob" not in col_names4:
+        cursor.execute("ALTER TABLE parsed_items ADD COLUMN text_embedding_blob BLOB")
     cursor.execute("PRAGMA table_info(parsed_items)")
     col_names5 = {row[1] for row in cursor.fetchall()}
     if "moderation_chat_id" not in col_names5:
@@ -274,6 +398,11 @@ def ensure_parsed_items_table():
         cursor.execute(
             "ALTER TABLE parsed_items ADD COLUMN auto_approved INTEGER DEFAULT 0"
         )
+    if "ai_screen_status" not in col_names8:
+        # screen_pending / screen_submitted — AI screen відкладено в Batch API; NULL — перевірено.
+        cursor.execute("ALTER TABLE parsed_items ADD COLUMN ai_screen_status TEXT")
+    if "ai_batch_id" not in col_names8:
+        cursor.execute("ALTER TABLE parsed_items ADD COLUMN ai_batch_id TEXT")
     cursor.execute(
         "CREATE INDEX IF NOT EXISTS idx_parsed_items_auto_approved "
         "ON parsed_items(auto_approved, moderated_at) WHERE auto_approved = 1"
@@ -286,12 +415,81 @@ def ensure_parsed_items_table():
         "CREATE INDEX IF NOT EXISTS idx_parsed_items_created_at "
         "ON parsed_items(created_at)"
     )
+    _ensure_created_ts(cursor)
+    # Після _ensure_created_ts: на новій БД колонки created_ts до цього ще немає.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_items_ai_screen "
+        "ON parsed_items(ai_screen_status, ai_batch_id, created_ts) WHERE ai_screen_status IS NOT NULL"
+    )
     _cleanup_pending_service_channel_defaults(cursor)
     conn.commit()
     conn.close()
     _schema_ready = True
 
 
+def _ensure_created_ts(cursor) -> None:
+    """
+    created_ts — unix-секунди created_at: фільтри вікон без datetime(created_at),
+    тож індекси (status, …, created_ts) працюють. Пише insert_parsed_items; тригери —
+    для інших записувачів і зміни created_at.
+    """
+    cursor.execute("PRAGMA table_info(parsed_items)")
+    if "created_ts" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE parsed_items ADD COLUMN created_ts INTEGER")
+        cursor.execute(
+            """
+            UPDATE parsed_items
+            SET created_ts = CAST(strftime('%s', created_at) AS INTEGER)
+            WHERE created_ts IS NULL
+            """
+        )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_parsed_items_created_ts_insert
+        AFTER INSERT ON parsed_items
+        WHEN NEW.created_ts IS NULL
+        BEGIN
+            UPDATE parsed_items
+            SET created_ts = CAST(strftime('%s', NEW.created_at) AS INTEGER)
+            WHERE id = NEW.id;
+        END
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_parsed_items_created_ts_update
+        AFTER UPDATE OF created_at ON parsed_items
+        BEGIN
+            UPDATE parsed_items
+            SET created_ts = CAST(strftime('%s', NEW.created_at) AS INTEGER)
+            WHERE id = NEW.id;
+        END
+        """
+    )
+    # Гарячі запити: вікна дедупу / auto-approve, fuzzy-індекс, parsed_item_exists (covering).
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_items_status_type_created "
+        "ON parsed_items(status, parser_type, created_ts)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_items_status_created "
+        "ON parsed_items(status, created_ts)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_items_channel_msg_type "
+        "ON parsed_items(source_channel, message_id, parser_type)"
+    )
+    # Очищення фото / застарілих рядків (parser.storage.photos_cleanup).
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_items_created_ts "
+        "ON parsed_items(created_ts)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_items_listing "
+        "ON parsed_items(marketplace_listing_id) WHERE marketplace_listing_id IS NOT NULL"
+    )
+
+
 def _cleanup_pending_service_channel_defaults(cursor) -> None:
     """Звільняє pending-записи послугових каналів від основного парсера для AI→канал."""
     try:
@@ -328,6 +526,9 @@ def parsed_item_exists(
     message_id: int,
     parser_type: str = "default",
 ) -> bool:
+    cached = _cached_state(source_channel, message_id)
+    if cached is not _MISS:
+        return cached is not None and (cached.get("parser_type") or "default") == parser_type
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
@@ -349,45 +550,52 @@ def parsed_item_claimed_by_other_parser(
     parser_type: str,
 ) -> bool:
     """Чи інший парсер уже тримає це повідомлення і запис ще блокує повтор."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT * FROM parsed_items
-        WHERE source_channel = ? AND message_id = ?
-        LIMIT 1
-        """,
-        (source_channel, message_id),
-    )
-    row = cursor.fetchone()
-    conn.close()
-    if not row:
+    cached = _cached_state(source_channel, message_id)
+    if cached is not _MISS:
+        item = cached
+    else:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            WITH {_CUTOFFS_CTE}
+            SELECT pi.id, pi.parser_type, {_sql_row_blocks_duplicate("pi")} AS blocks_duplicate
+            FROM parsed_items pi, dedup_cut
+            WHERE pi.source_channel = ? AND pi.message_id = ?
+            LIMIT 1
+            """,
+            (*_dedup_cutoffs(), source_channel, message_id),
+        )
+        row = cursor.fetchone()
+        conn.close()
+        item = dict(row) if row else None
+    if not item:
         return False
-    item = dict(row)
     other_type = item.get("parser_type") or "default"
     if other_type == parser_type:
         return False
     return parsed_item_row_blocks_duplicate(item)
 
 
+def parsed_item_message_state(
+    source_channel: str,
+    message_id: int,
+    parser_type: str,
+) -> tuple[bool, bool]:
+    """(parsed_item_exists, parsed_item_claimed_by_other_parser) — одним викликом у reader пулу."""
+    return (
+        parsed_item_exists(source_channel, message_id, parser_type),
+        parsed_item_claimed_by_other_parser(source_channel, message_id, parser_type),
+    )
+
+
 def fingerprint_parsed_text(raw_text: str) -> str:
     """
     Hash для дедупу в межах каналу.
     Не викидаємо цифри/ціни — інакше різні оголошення зливаються в один hash.
     """
-    t = (raw_text or "").lower()
-    t = re.sub(r"https?://t\.me/\S+", " ", t, flags=re.IGNORECASE)
-    t = re.sub(r"https?://(?:www\.)?instagram\.com/\S+", " ", t, flags=re.IGNORECASE)
-    t = re.sub(r"https?://\S+", " ", t)
-    # Прибираємо лише емодзі, не чіпаючи латиницю/кирилицю/цифри
-    t = re.sub(
-        r"[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F600-\U0001F64F"
-        r"\U0001F680-\U0001F6FF\U0001F900-\U0001F9FF]+",
-        " ",
-        t,
-    )
-    t = re.sub(r"[^\w\s\u0400-\u04FF€$£.,:/+-]", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
+    # Без URL і емодзі, лише латиниця / кирилиця / цифри / ціни — PostText.plain
+    t = post_text(raw_text or "").plain
     if len(t) < 24:
         # Короткий текст — не дедупимо агресивно (порожній hash → skip check)
         return ""
@@ -401,28 +609,8 @@ def fingerprint_title_desc(
     price: str | None = None,
     is_free: bool = False,
 ) -> str:
-    emoji_re = re.compile(
-        r"[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F600-\U0001F64F"
-        r"\U0001F680-\U0001F6FF\U0001F900-\U0001F9FF]+",
-        re.UNICODE,
-    )
-
-    def norm(s: str) -> str:
-        s = (s or "").lower()
-        try:
-            s = unicodedata.normalize("NFKD", s)
-            s = "".join(c for c in s if not unicodedata.combining(c))
-        except Exception:
-            pass
-        s = emoji_re.sub(" ", s)
-        s = re.sub(r"https?://\S+", " ", s, flags=re.IGNORECASE)
-        s = re.sub(r"@[\w\d_]{2,}", " ", s)
-        s = re.sub(r"[^\w\s\u0400-\u04FF]", " ", s)
-        s = re.sub(r"\s+", " ", s).strip()
-        return s
-
-    t = norm(title)[:220]
-    d = norm(description)[:700]
+    t = post_text(title or "").dedup_form[:220]
+    d = post_text(description or "").dedup_form[:700]
     if is_free:
         price_part = "free"
     elif price and str(price).strip():
@@ -456,8 +644,8 @@ def parsed_item_is_semantic_duplicate(
     conn = get_connection()
     cursor = conn.cursor()
     blocking = _sql_semantic_dedup_blocks("pi")
-    clauses = ["pi.dedup_key = ?", blocking]
-    params: list = [dedup_key, _PENDING_DEDUP_WINDOW, _TEXT_DEDUP_WINDOW]
+    clauses = ["pi.dedup_key = ?", f"({blocking})"]
+    params: list = [*_dedup_cutoffs(), dedup_key]
     if parser_type:
         clauses.append("COALESCE(pi.parser_type, 'default') = ?")
         params.append(parser_type)
@@ -466,7 +654,8 @@ def parsed_item_is_semantic_duplicate(
         params.append(source_channel)
     cursor.execute(
         f"""
-        SELECT 1 FROM parsed_items pi
+        WITH {_CUTOFFS_CTE}
+        SELECT 1 FROM parsed_items pi, dedup_cut
         WHERE {" AND ".join(clauses)}
         LIMIT 1
         """,
@@ -481,51 +670,98 @@ def get_recent_parsed_embeddings(
     days: int | None = None,
     *,
     source_channel: str | None = None,
+    limit: int = 2500,
+    per_channel: bool = False,
 ) -> list[dict]:
-    """Embedding лише для записів, що ще блокують дедуп."""
-    window = f"-{days or PARSER_DEDUP_DAYS} days"
+    """
+    Embedding лише для записів, що ще блокують дедуп (новіші першими).
+    per_channel — limit на кожен source_channel, а не на всю вибірку.
+    embedding — np.ndarray (BLOB читається без копії; старі JSON-рядки теж підтримуються).
+    """
+    from parser.storage.embeddings import decode_embedding
+
     conn = get_connection()
     cursor = conn.cursor()
     blocking = _sql_parsed_item_blocks_duplicates("pi")
     channel_clause = ""
-    params: list = [window, window]
+    params: list = _dedup_cutoffs(dedup_days=days)
     if source_channel:
         channel_clause = " AND pi.source_channel = ?"
         params.append(source_channel)
+    rank = (
+        "ROW_NUMBER() OVER (PARTITION BY pi.source_channel ORDER BY pi.id DESC)"
+        if per_channel
+        else "ROW_NUMBER() OVER (ORDER BY pi.id DESC)"
+    )
     cursor.execute(
         f"""
-        SELECT pi.id, pi.text_embedding
-        FROM parsed_items pi
-        WHERE pi.text_embedding IS NOT NULL
-          AND TRIM(pi.text_embedding) != ''
-          AND {blocking}
-          {channel_clause}
+        WITH {_CUTOFFS_CTE},
+        ranked(id, rn) AS (
+            SELECT pi.id, {rank}
+            FROM parsed_items pi, dedup_cut
+            WHERE (
+                pi.text_embedding_blob IS NOT NULL
+                OR (pi.text_embedding IS NOT NULL AND TRIM(pi.text_embedding) != '')
+              )
+              AND ({blocking})
+              {channel_clause}
+        )
+        SELECT pi.id, COALESCE(pi.text_embedding_blob, pi.text_embedding), pi.source_channel
+        FROM ranked JOIN parsed_items pi ON pi.id = ranked.id
+        WHERE ranked.rn <= ?
         ORDER BY pi.id DESC
-        LIMIT 2500
         """,
-        params,
+        [*params, max(1, int(limit))],
     )
     rows = cursor.fetchall()
     conn.close()
     out: list[dict] = []
     for row in rows:
-        raw = row[1] if not isinstance(row, dict) else row.get("text_embedding")
-        item_id = row[0] if not isinstance(row, dict) else row.get("id")
-        if not raw:
-            continue
-        try:
-            vec = json.loads(raw)
-            if isinstance(vec, list) and vec:
-                out.append({"id": item_id, "embedding": [float(x) for x in vec]})
-        except Exception:
+        vec = decode_embedding(row[1])
+        if vec is None or not vec.size:
             continue
+        out.append({"id": row[0], "source_channel": row[2], "embedding": vec})
     return out
 
 
+def filter_blocking_parsed_items(item_ids: Sequence[int]) -> set[int]:
+    """Які з id ще блокують дедуп (fuzzy-індекс перевіряє збіг перед відмовою)."""
+    ids = [int(i) for i in item_ids]
+    if not ids:
+        return set()
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        WITH {_CUTOFFS_CTE}
+        SELECT pi.id FROM parsed_items pi, dedup_cut
+        WHERE pi.id IN ({",".join("?" * len(ids))})
+          AND ({_sql_parsed_item_blocks_duplicates("pi")})
+        """,
+        [*_dedup_cutoffs(), *ids],
+    )
+    alive = {int(row[0]) for row in cursor.fetchall()}
+    conn.close()
+    return alive
+
+
 def parsed_item_content_hash_exists(content_hash: str) -> bool:
     return parsed_item_is_raw_duplicate(content_hash)
 
 
+_INSERT_COLUMNS = (
+    "source_channel", "source_city", "message_id", "media_group_id",
+    "author_username", "author_id",
+    "title", "description", "price", "currency", "is_free",
+    "category", "subcategory", "condition", "location",
+    "images_json", "raw_text", "content_hash", "dedup_key", "parser_type",
+    "text_embedding", "text_embedding_blob", "msg_link", "status",
+    "created_at", "created_ts", "ai_screen_status",
+)
+# Рядків в одному INSERT … VALUES (…), (…) (ліміт змінних SQLite — 32766).
+_INSERT_CHUNK = 200
+
+
 def insert_parsed_item(
     source_channel: str,
     source_city: str,
@@ -547,56 +783,146 @@ def insert_parsed_item(
     content_hash: Optional[str] = None,
     dedup_key: Optional[str] = None,
     parser_type: str = "default",
-    text_embedding: Optional[str] = None,
+    text_embedding: Optional[str | bytes] = None,
     msg_link: Optional[str] = None,
 ) -> int:
+    """
+    text_embedding: bytes → text_embedding_blob, str (legacy JSON) → text_embedding.
+    Синхронний виклик поза writer пулу: після COMMIT одразу доповнює embedding-індекс.
+    """
+    item_ids, new_embeddings = insert_parsed_items([locals()])
+    add_to_embedding_index(new_embeddings)
+    return item_ids[0]
+
+
+def _insert_values(row: dict, now: datetime) -> tuple:
     from parser.core.location import channel_city_from_source, resolve_parsed_location
     from parser.config.settings import PARSER_MAX_PHOTOS
 
-    images = list(images or [])[:PARSER_MAX_PHOTOS]
+    images = list(row.get("images") or [])[:PARSER_MAX_PHOTOS]
+    title = row["title"]
+    description = row["description"]
+    raw_text = row["raw_text"]
 
     # source_city — завжди з реєстру каналу; location — за правилами local/Germany
-    source_city = channel_city_from_source(source_channel, source_city)
+    source_city = channel_city_from_source(row["source_channel"], row["source_city"])
     location = resolve_parsed_location(
         channel_city=source_city,
-        source_channel=source_channel,
-        suggested=location,
+        source_channel=row["source_channel"],
+        suggested=row.get("location"),
         text=f"{title or ''}\n{description or ''}\n{raw_text or ''}",
     )
 
+    text_embedding = row.get("text_embedding")
+    embedding_blob = text_embedding if isinstance(text_embedding, (bytes, bytearray)) else None
+    embedding_text = text_embedding if isinstance(text_embedding, str) else None
+    return (
+        row["source_channel"], source_city, row["message_id"], row.get("media_group_id"),
+        row.get("author_username"), row.get("author_id"),
+        title, description, row.get("price"), row.get("currency"), int(bool(row.get("is_free"))),
+        row.get("category"), row.get("subcategory"), row.get("condition"), location,
+        json.dumps(images, ensure_ascii=False), raw_text, row.get("content_hash"),
+        row.get("dedup_key"), row.get("parser_type") or "default",
+        embedding_text, embedding_blob, (row.get("msg_link") or "").strip() or None, "pending",
+        _sqlite_utc(now), int(now.timestamp()), row.get("ai_screen_status"),
+    )
+
+
+NewEmbedding = tuple[int, str, str | bytes]
+
+
+def insert_parsed_items(rows: Sequence[dict]) -> tuple[list[int], list[NewEmbedding]]:
+    """
+    Пачка рядків (поля як у insert_parsed_item) однією транзакцією: INSERT OR IGNORE … RETURNING.
+    Повертає id у порядку rows (для вже наявного (source_channel, message_id) — id існуючого
+    запису) і (id, source_channel, embedding) справді вставлених рядків. Індекс embeddings
+    тут не чіпаємо: у writer пулу COMMIT ще попереду, а top_k читає індекс з event loop —
+    викликач передає їх у add_to_embedding_index після db_write.
+    """
+    rows = list(rows)
+    if not rows:
+        return [], []
+    now = datetime.now(timezone.utc)
+    values = [_insert_values(row, now) for row in rows]
+    keys = [(v[0], int(v[2])) for v in values]
+    inserted: dict[tuple[str, int], int] = {}
+
+    placeholders = "(" + ", ".join("?" * len(_INSERT_COLUMNS)) + ")"
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR IGNORE INTO parsed_items (
-            source_channel, source_city, message_id, media_group_id,
-            author_username, author_id,
-            title, description, price, currency, is_free,
-            category, subcategory, condition, location,
-            images_json, raw_text, content_hash, dedup_key, parser_type, text_embedding, msg_link, status
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')
-    """, (
-        source_channel, source_city, message_id, media_group_id,
-        author_username, author_id,
-        title, description, price, currency, int(is_free),
-        category, subcategory, condition, location,
-        json.dumps(images, ensure_ascii=False), raw_text, content_hash, dedup_key, parser_type,
-        text_embedding, (msg_link or "").strip() or None,
-    ))
-    conn.commit()
-    item_id = cursor.lastrowid
-    if not item_id:
-        cursor.execute(
-            """
-            SELECT id FROM parsed_items
-            WHERE source_channel = ? AND message_id = ?
-            LIMIT 1
-            """,
-            (source_channel, message_id),
-        )
-        row = cursor.fetchone()
-        item_id = int(row[0]) if row else 0
+    # У writer пулу транзакція вже відкрита (group commit) — тоді лише виконуємо запити.
+    own_tx = not conn.in_transaction
+    if own_tx:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        for start in range(0, len(values), _INSERT_CHUNK):
+            chunk = values[start : start + _INSERT_CHUNK]
+            cursor.execute(
+                f"""
+                INSERT OR IGNORE INTO parsed_items ({", ".join(_INSERT_COLUMNS)})
+                VALUES {", ".join([placeholders] * len(chunk))}
+                RETURNING id, source_channel, message_id
+                """,
+                [v for row_values in chunk for v in row_values],
+            )
+            for item_id, channel, message_id in cursor.fetchall():
+                inserted[(channel, int(message_id))] = int(item_id)
+
+        missing = sorted({key for key in keys if key not in inserted})
+        existing: dict[tuple[str, int], int] = {}
+        for channel in {c for c, _ in missing}:
+            ids = [m for c, m in missing if c == channel]
+            cursor.execute(
+                f"""
+                SELECT id, message_id FROM parsed_items
+                WHERE source_channel = ? AND message_id IN ({",".join("?" * len(ids))})
+                """,
+                (channel, *ids),
+            )
+            for item_id, message_id in cursor.fetchall():
+                existing[(channel, int(message_id))] = int(item_id)
+        conn.commit()
+    except Exception:
+        if own_tx and conn.in_transaction:
+            conn.rollback()
+        conn.close()
+        raise
     conn.close()
-    return item_id
+
+    out: list[int] = []
+    new_embeddings: list[NewEmbedding] = []
+    seen: set[tuple[str, int]] = set()
+    for key, v in zip(keys, values):
+        item_id = inserted.get(key) or existing.get(key, 0)
+        # Повтор ключа в тій самій пачці отримує id першого (як проігнорований INSERT).
+        if key in inserted and key not in seen:
+            embedding = v[21] if v[21] is not None else v[20]
+            if embedding:
+                new_embeddings.append((item_id, key[0], embedding))
+        seen.add(key)
+        _forget_state(*key)
+        out.append(item_id)
+    return out, new_embeddings
+
+
+def add_to_embedding_index(new_embeddings: Sequence[NewEmbedding]) -> None:
+    """
+    Нові pending-записи одразу блокують схожі пости в межах поточного циклу.
+    Лише після COMMIT і з того ж потоку, що й top_k (event loop).
+    """
+    if not new_embeddings:
+        return
+    from parser.core.embedding_index import get_embedding_index
+    from parser.storage.embeddings import decode_embedding
+
+    index = get_embedding_index()
+    for item_id, source_channel, text_embedding in new_embeddings:
+        try:
+            vec = decode_embedding(text_embedding)
+            if vec is not None and vec.size:
+                index.add(item_id, source_channel, vec)
+        except Exception as e:
+            logger.debug("embedding index add skipped (item %s): %s", item_id, e)
 
 
 def get_parsed_item_by_admin_msg(admin_message_id: int) -> Optional[dict]:
@@ -822,6 +1148,7 @@ def try_claim_auto_approve(item_id: int) -> bool:
         SET auto_approved = ?
         WHERE id = ?
           AND status = 'pending'
+          AND ai_screen_status IS NULL
           AND marketplace_listing_id IS NULL
           AND IFNULL(auto_approved, 0) = 0
         """,
@@ -909,19 +1236,21 @@ def list_auto_approved_since(iso_start: str) -> list[dict]:
 
 def list_pending_for_auto_approve(max_age_hours: int, limit: int = 400) -> list[dict]:
     hours = max(1, int(max_age_hours))
+    created_after = int(time.time()) - hours * 3600
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute(
-        f"""
+        """
         SELECT * FROM parsed_items
         WHERE status = 'pending'
+          AND created_ts >= ?
+          AND ai_screen_status IS NULL
           AND marketplace_listing_id IS NULL
           AND IFNULL(auto_approved, 0) = 0
-          AND datetime(created_at) >= datetime('now', ?)
-        ORDER BY datetime(created_at) ASC
+        ORDER BY created_ts ASC
         LIMIT ?
         """,
-        (f"-{hours} hours", int(limit)),
+        (created_after, int(limit)),
     )
     rows = [hydrate_parsed_item(dict(r)) for r in cursor.fetchall()]
     conn.close()
@@ -0,0 +1,383 @@
+"""
+Content-addressed сховище фото парсера в database/parsed_photos.
+
+Файл зберігається один раз під іменем c_<sha256>.jpg; parsed_photo_blobs зіставляє
+Telegram file_unique_id з хешем, тож повторний пост із тим самим фото не завантажується
+вдруге. Публікація в app/public/listings/originals — hardlink на blob (copy, якщо
+інший розділ / bind mount).
+
+parsed_photo_manifest — файли, які створив парсер (blob-и parsed_photos і копії в
+listings/originals), з лічильником посилань. Лічильник ведуть тригери на
+parsed_items.images_json і Listing.images (адмінка/Prisma теж), тож очищення —
+індексований запит refcount = 0 замість обходу директорій.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from parser.config.settings import PHOTOS_DIR
+from parser.storage.connection import BASE_DIR, get_connection
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "c_"
+_HASH_CHUNK = 1 << 16
+
+PUBLIC_ORIGINALS_DIR = BASE_DIR / "app" / "public" / "listings" / "originals"
+# Ключі маніфесту: parsed_photos/<name> | listings/originals/<name>
+_MANIFEST_ROOTS = {
+    "parsed_photos/": PHOTOS_DIR,
+    "listings/originals/": PUBLIC_ORIGINALS_DIR,
+}
+# Копії парсера в public (copy_parser_images_to_public: prefix parser / pi<id>)
+_PUBLIC_PARSER_GLOBS = ("parser_*", "pi*")
+
+
+def _ref_key_sql(value: str) -> str:
+    """SQL: посилання з images JSON → ключ маніфесту (NULL для чужих URL)."""
+    return (
+        f"CASE WHEN instr({value}, 'parsed_photos/') > 0 "
+        f"THEN 'parsed_photos/' || substr({value}, instr({value}, 'parsed_photos/') + 14) "
+        f"WHEN instr({value}, 'listings/originals/') > 0 "
+        f"THEN 'listings/originals/' || substr({value}, instr({value}, 'listings/originals/') + 19) "
+        f"END"
+    )
+
+
+def _json_refs_sql(column: str) -> str:
+    # Битий JSON від сторонніх записувачів не має ламати INSERT/UPDATE у тригері.
+    return f"json_each(CASE WHEN json_valid({column}) THEN {column} ELSE '[]' END)"
+
+
+def _manifest_delta_sql(column: str, sign: str) -> str:
+    refs = _json_refs_sql(column)
+    return f"""
+            UPDATE parsed_photo_manifest
+            SET refcount = MAX(0, refcount {sign} (
+                SELECT COUNT(*) FROM {refs} j
+                WHERE j.type = 'text' AND {_ref_key_sql("j.value")} = parsed_photo_manifest.path
+            ))
+            WHERE path IN (SELECT {_ref_key_sql("value")} FROM {refs} WHERE type = 'text');"""
+
+
+def _manifest_triggers(table: str, column: str) -> dict[str, str]:
+    slug = "pi" if table == "parsed_items" else "listing"
+    return {
+        f"trg_photo_manifest_{slug}_insert": f"""
+            CREATE TRIGGER IF NOT EXISTS trg_photo_manifest_{slug}_insert
+            AFTER INSERT ON {table}
+            WHEN NEW.{column} IS NOT NULL
+            BEGIN{_manifest_delta_sql(f"NEW.{column}", "+")}
+            END
+        """,
+        f"trg_photo_manifest_{slug}_update": f"""
+            CREATE TRIGGER IF NOT EXISTS trg_photo_manifest_{slug}_update
+            AFTER UPDATE OF {column} ON {table}
+            WHEN NEW.{column} IS NOT OLD.{column}
+            BEGIN{_manifest_delta_sql(f"OLD.{column}", "-")}{_manifest_delta_sql(f"NEW.{column}", "+")}
+            END
+        """,
+        f"trg_photo_manifest_{slug}_delete": f"""
+            CREATE TRIGGER IF NOT EXISTS trg_photo_manifest_{slug}_delete
+            AFTER DELETE ON {table}
+            WHEN OLD.{column} IS NOT NULL
+            BEGIN{_manifest_delta_sql(f"OLD.{column}", "-")}
+            END
+        """,
+    }
+
+
+_photo_store_ready = False
+
+
+def ensure_photo_store_table() -> None:
+    global _photo_store_ready
+    if _photo_store_ready:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parsed_photo_blobs (
+            file_unique_id  TEXT PRIMARY KEY,
+            sha256          TEXT NOT NULL,
+            size            INTEGER,
+            created_at      TEXT DEFAULT (datetime('now'))
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_photo_blobs_sha256 "
+        "ON parsed_photo_blobs(sha256)"
+    )
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'parsed_photo_manifest'"
+    )
+    manifest_existed = cursor.fetchone() is not None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parsed_photo_manifest (
+            path        TEXT PRIMARY KEY,
+            refcount    INTEGER NOT NULL DEFAULT 0,
+            size        INTEGER,
+            created_ts  INTEGER NOT NULL
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_parsed_photo_manifest_garbage "
+        "ON parsed_photo_manifest(created_ts) WHERE refcount <= 0"
+    )
+    conn.commit()
+    ensure_photo_manifest_triggers(conn, force_rebuild=not manifest_existed)
+    conn.close()
+    _photo_store_ready = True
+
+
+def _expected_manifest_triggers(cursor) -> tuple[dict[str, str], set[str]]:
+    """Потрібні тригери (Listing — якщо таблиця є) і ті, що вже є в sqlite_master."""
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') "
+        "AND (name = 'Listing' OR name LIKE 'trg_photo_manifest_%')"
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    triggers = _manifest_triggers("parsed_items", "images_json")
+    if "Listing" in existing:
+        triggers.update(_manifest_triggers("Listing", "images"))
+    return triggers, existing
+
+
+def missing_photo_manifest_triggers(conn) -> list[str]:
+    """Лише читання: яких тригерів refcount зараз немає (для dry-run)."""
+    triggers, existing = _expected_manifest_triggers(conn.cursor())
+    return sorted(set(triggers) - existing)
+
+
+def ensure_photo_manifest_triggers(conn=None, *, force_rebuild: bool = False) -> bool:
+    """
+    Тригери refcount на parsed_items і Listing є в sqlite_master; яких бракує — створює
+    й перераховує маніфест (Prisma могла перестворити Listing разом із тригерами,
+    тоді лічильники розійшлися з даними). Викликати перед видаленням файлів — не лише
+    раз на процес. True — маніфест перераховано.
+    """
+    own = conn is None
+    if own:
+        conn = get_connection()
+    cursor = conn.cursor()
+    triggers, existing = _expected_manifest_triggers(cursor)
+    missing = sorted(set(triggers) - existing)
+    rebuilt = False
+    if missing or force_rebuild:
+        if missing and not force_rebuild:
+            logger.warning("photo_store: бракує тригерів %s — перераховую маніфест", ", ".join(missing))
+        for name in missing:
+            cursor.execute(triggers[name])
+        conn.commit()
+        rebuild_photo_manifest(conn)
+        rebuilt = True
+    if own:
+        conn.close()
+    return rebuilt
+
+
+def manifest_abs_path(path: str) -> Optional[Path]:
+    for prefix, root in _MANIFEST_ROOTS.items():
+        if path.startswith(prefix):
+            name = path[len(prefix):]
+            if not name or "/" in name or name in (".", ".."):
+                return None
+            return root / name
+    return None
+
+
+def register_photo_files(paths: Iterable[str]) -> None:
+    """Новий файл парсера в маніфесті (refcount рахують тригери); повтор — оновлює вік."""
+    now = int(time.time())
+    rows = []
+    for path in paths:
+        abs_path = manifest_abs_path(path)
+        if abs_path is None:
+            continue
+        try:
+            size = abs_path.stat().st_size
+        except OSError:
+            continue
+        rows.append((path, size, now))
+    _upsert_manifest_rows(rows)
+
+
+def _upsert_manifest_rows(rows: list[tuple[str, int, int]]) -> None:
+    if not rows:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        """
+        INSERT INTO parsed_photo_manifest (path, size, created_ts) VALUES (?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET size = excluded.size, created_ts = excluded.created_ts
+        """,
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def rebuild_photo_manifest(conn=None) -> dict[str, int]:
+    """
+    Повна синхронізація: файли на диску → маніфест, refcount — з parsed_items і Listing.
+    Разово (міграція / відновлення тригерів); звичайні зміни ведуть тригери.
+    """
+    own = conn is None
+    if own:
+        conn = get_connection()
+    cursor = conn.cursor()
+    files: list[tuple[str, int, int]] = []
+    scan = (
+        ("parsed_photos/", PHOTOS_DIR, ("*",)),
+        ("listings/originals/", PUBLIC_ORIGINALS_DIR, _PUBLIC_PARSER_GLOBS),
+    )
+    for prefix, root, patterns in scan:
+        if not root.is_dir():
+            continue
+        for pattern in patterns:
+            for path in root.glob(pattern):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                if path.is_file():
+                    files.append((prefix + path.name, st.st_size, int(st.st_mtime)))
+    cursor.executemany(
+        "INSERT OR IGNORE INTO parsed_photo_manifest (path, size, created_ts) VALUES (?, ?, ?)",
+        files,
+    )
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Listing'")
+    listing_refs = ""
+    if cursor.fetchone() is not None:
+        listing_refs = f"""
+            UNION ALL
+            SELECT {_ref_key_sql("j.value")} FROM Listing l, {_json_refs_sql("l.images")} j
+            WHERE j.type = 'text'"""
+    cursor.execute("UPDATE parsed_photo_manifest SET refcount = 0 WHERE refcount != 0")
+    cursor.execute(
+        f"""
+        WITH refs(path) AS (
+            SELECT {_ref_key_sql("j.value")} FROM parsed_items pi, {_json_refs_sql("pi.images_json")} j
+            WHERE pi.images_json IS NOT NULL AND j.type = 'text'{listing_refs}
+        ),
+        counts AS (SELECT path, COUNT(*) AS n FROM refs WHERE path IS NOT NULL GROUP BY path)
+        UPDATE parsed_photo_manifest
+        SET refcount = (SELECT n FROM counts WHERE counts.path = parsed_photo_manifest.path)
+        WHERE path IN (SELECT path FROM counts)
+        """
+    )
+    cursor.execute("SELECT COUNT(*), SUM(CASE WHEN refcount > 0 THEN 1 ELSE 0 END) FROM parsed_photo_manifest")
+    total, referenced = cursor.fetchone()
+    conn.commit()
+    if own:
+        conn.close()
+    stats = {"files_registered": len(files), "manifest_rows": int(total or 0), "referenced": int(referenced or 0)}
+    logger.info("photo_store: маніфест перераховано %s", stats)
+    return stats
+
+
+def blob_name(sha256: str) -> str:
+    return f"{BLOB_PREFIX}{sha256}.jpg"
+
+
+def blob_rel_path(sha256: str) -> str:
+    """Посилання для parsed_items.images_json (як і старі database/parsed_photos/...)."""
+    return f"database/parsed_photos/{blob_name(sha256)}"
+
+
+def _touch(path: Path) -> bool:
+    """Оновлює mtime (age-based cleanup рахує вік від останнього використання)."""
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def lookup_photo_blob(file_unique_id: Optional[str]) -> Optional[str]:
+    """Шлях blob для file_unique_id, якщо файл ще на диску (інакше None → завантажити)."""
+    if not file_unique_id:
+        return None
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT sha256 FROM parsed_photo_blobs WHERE file_unique_id = ?",
+        (file_unique_id,),
+    )
+    row = cursor.fetchone()
+    conn.close()
+    if row is None or not _touch(PHOTOS_DIR / blob_name(row[0])):
+        return None
+    return blob_rel_path(row[0])
+
+
+def place_photo_blob(tmp_path: str | Path) -> Optional[tuple[str, int]]:
+    """
+    Файлова частина: sha256 і перенесення у сховище — у потоці, не в writer пулу.
+    Однаковий вміст → один blob (тимчасовий файл видаляється). Повертає (sha256, size).
+    """
+    tmp = Path(tmp_path)
+    try:
+        sha256 = _file_sha256(tmp)
+        size = tmp.stat().st_size
+        dest = PHOTOS_DIR / blob_name(sha256)
+        if dest.is_file():
+            tmp.unlink()
+            _touch(dest)
+        else:
+            os.replace(tmp, dest)
+    except OSError as e:
+        logger.warning("photo_store: не вдалося зберегти %s: %s", tmp, e)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return None
+    return sha256, size
+
+
+def record_photo_blob(sha256: str, size: int, file_unique_id: Optional[str] = None) -> str:
+    """Лише БД (writer пулу): file_unique_id → blob і рядок маніфесту. Повертає посилання для images_json."""
+    if file_unique_id:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO parsed_photo_blobs (file_unique_id, sha256, size)
+            VALUES (?, ?, ?)
+            ON CONFLICT(file_unique_id) DO UPDATE SET sha256 = excluded.sha256, size = excluded.size
+            """,
+            (file_unique_id, sha256, size),
+        )
+        conn.commit()
+        conn.close()
+    _upsert_manifest_rows([(f"parsed_photos/{blob_name(sha256)}", int(size), int(time.time()))])
+    return blob_rel_path(sha256)
+
+
+def link_or_copy(src: Path, dest: Path) -> str:
+    """Hardlink src → dest; copy2, якщо посилання неможливе. Повертає 'link' / 'copy'."""
+    try:
+        os.link(src, dest)
+        return "link"
+    except FileExistsError:
+        raise
+    except OSError:
+        shutil.copy2(src, dest)
+        return "copy"
@@ -1,70 +1,34 @@
-"""Очищення застарілих і невикористовуваних фото парсера."""
+"""
+Очищення застарілих і невикористовуваних фото парсера.
+
+Працює через parsed_photo_manifest (parser.storage.photo_store): посилання зі старих
+parsed_items знімаються запитом по created_ts, тригери зменшують refcount, далі
+видаляються файли з refcount = 0, старші за поріг. Директорії не обходяться —
+вартість пропорційна сміттю, а не кількості фото.
+"""
 
 from __future__ import annotations
 
-import json
 import logging
-import os
-from datetime import datetime, timedelta, timezone
-from pathlib import Path
-from typing import Any, Callable, Optional
-
-from parser.storage.connection import BASE_DIR, get_connection
+import time
+from typing import Any, Callable
+
+from parser.storage.connection import get_connection
+from parser.storage.photo_store import (
+    PUBLIC_ORIGINALS_DIR,
+    _json_refs_sql,
+    _ref_key_sql,
+    ensure_photo_manifest_triggers,
+    ensure_photo_store_table,
+    manifest_abs_path,
+    missing_photo_manifest_triggers,
+)
 
 logger = logging.getLogger(__name__)
 
-PHOTOS_DIR = BASE_DIR / "database" / "parsed_photos"
-PUBLIC_ORIGINALS_DIR = BASE_DIR / "app" / "public" / "listings" / "originals"
-
 _BATCH_ROWS = 250
-_COMMIT_EVERY = 200
 _PROGRESS_EVERY = 500
-
-
-def _normalize_parsed_image_path(ref: str) -> Optional[Path]:
-    if not ref or not isinstance(ref, str):
-        return None
-    r = ref.replace("\\", "/").strip()
-    if ".." in r or r.startswith("http://") or r.startswith("https://"):
-        return None
-    r = r.lstrip("/")
-    if r.startswith("database/parsed_photos/"):
-        p = BASE_DIR / r
-    elif r.startswith("parsed_photos/"):
-        p = BASE_DIR / "database" / r
-    else:
-        return None
-    try:
-        resolved = p.resolve()
-        base_resolved = PHOTOS_DIR.resolve()
-        if not str(resolved).startswith(str(base_resolved)):
-            return None
-    except OSError:
-        return None
-    return resolved
-
-
-def _basename_from_image_ref(ref: str) -> Optional[str]:
-    if not ref or not isinstance(ref, str):
-        return None
-    r = ref.replace("\\", "/").strip().rstrip("/")
-    if not r or r.startswith("http://") or r.startswith("https://"):
-        return None
-    return Path(r).name or None
-
-
-def _load_images_json(raw: Any) -> list[str]:
-    if raw is None:
-        return []
-    if isinstance(raw, list):
-        return [str(x) for x in raw if x]
-    try:
-        parsed = json.loads(raw or "[]")
-    except (json.JSONDecodeError, TypeError):
-        return []
-    if not isinstance(parsed, list):
-        return []
-    return [str(x) for x in parsed if x]
+_HAS_IMAGES_SQL = "images_json IS NOT NULL AND images_json NOT IN ('', '[]')"
 
 
 def _progress(msg: str, on_progress: Callable[[str], None] | None) -> None:
@@ -74,255 +38,38 @@ def _progress(msg: str, on_progress: Callable[[str], None] | None) -> None:
         logger.info(msg)
 
 
-def _iter_query_rows(cursor, sql: str, params: tuple = ()) -> Any:
-    cursor.execute(sql, params)
-    while True:
-        rows = cursor.fetchmany(_BATCH_ROWS)
-        if not rows:
-            break
-        for row in rows:
-            yield row
-
-
-def _build_listing_image_basenames(cursor) -> frozenset[str]:
-    basenames: set[str] = set()
-    for row in _iter_query_rows(
-        cursor,
-        "SELECT images FROM Listing WHERE images IS NOT NULL AND TRIM(images) NOT IN ('', '[]')",
-    ):
-        for ref in _load_images_json(row["images"]):
-            bn = _basename_from_image_ref(ref)
-            if bn:
-                basenames.add(bn)
-    return frozenset(basenames)
-
-
-def _file_is_too_old(path: Path, cutoff: datetime) -> bool:
-    try:
-        mtime = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
-    except OSError:
-        return False
-    return mtime <= cutoff
-
-
-def _delete_file(
-    path: Path,
-    dry_run: bool,
-    stats: dict[str, Any],
-    pending_commits: list[int],
-    reason: str = "unused",
-) -> bool:
-    if not path.is_file():
-        return True
-    try:
-        size = path.stat().st_size
-    except OSError as e:
-        stats["errors"].append(f"stat {path}: {e}")
-        return False
-    if dry_run:
-        stats["files_deleted"] += 1
-        stats["bytes_freed"] += size
-        if reason == "too_old":
-            stats["too_old_deleted"] += 1
-        return True
-    try:
-        path.unlink()
-        stats["files_deleted"] += 1
-        stats["bytes_freed"] += size
-        if reason == "too_old":
-            stats["too_old_deleted"] += 1
-        pending_commits[0] += 1
-        return True
-    except OSError as e:
-        stats["errors"].append(f"unlink {path}: {e}")
-        return False
-
-
-def _maybe_commit(conn, pending_commits: list[int], dry_run: bool) -> None:
-    if dry_run or pending_commits[0] < _COMMIT_EVERY:
-        return
-    conn.commit()
-    pending_commits[0] = 0
-
-
-def _clear_parsed_item_images(
+def _expire_old_parsed_item_images(
     cursor,
     conn,
-    item_id: int,
     dry_run: bool,
     stats: dict[str, Any],
-    pending_commits: list[int],
-) -> None:
-    if dry_run:
-        stats["parsed_items_cleared"] += 1
-        return
-    cursor.execute(
-        "UPDATE parsed_items SET images_json = '[]' WHERE id = ?",
-        (item_id,),
-    )
-    stats["parsed_items_cleared"] += 1
-    pending_commits[0] += 1
-    _maybe_commit(conn, pending_commits, dry_run)
-
-
-def _update_parsed_item_images(
-    cursor,
-    conn,
-    item_id: int,
-    refs: list[str],
-    dry_run: bool,
-    stats: dict[str, Any],
-    pending_commits: list[int],
-) -> None:
-    if dry_run:
-        stats["parsed_items_images_trimmed"] += 1
-        return
-    cursor.execute(
-        "UPDATE parsed_items SET images_json = ? WHERE id = ?",
-        (json.dumps(refs, ensure_ascii=False), item_id),
-    )
-    stats["parsed_items_images_trimmed"] += 1
-    pending_commits[0] += 1
-    _maybe_commit(conn, pending_commits, dry_run)
-
-
-def _delete_parsed_item_row(
-    cursor,
-    conn,
-    item_id: int,
-    dry_run: bool,
-    stats: dict[str, Any],
-    pending_commits: list[int],
-) -> None:
-    if dry_run:
-        stats["parsed_items_deleted"] += 1
-        return
-    cursor.execute("DELETE FROM parsed_items WHERE id = ?", (item_id,))
-    stats["parsed_items_deleted"] += 1
-    pending_commits[0] += 1
-    _maybe_commit(conn, pending_commits, dry_run)
-
-
-def _cleanup_old_parsed_photos_on_disk(
-    conn,
-    dry_run: bool,
-    stats: dict[str, Any],
-    listing_basenames: frozenset[str],
-    cutoff: datetime,
-    pending_commits: list[int],
+    cutoff_ts: int,
     on_progress: Callable[[str], None] | None,
 ) -> None:
-    """Видалити файли parsed_photos/: не в Listing і старіші за cutoff."""
-    if not PHOTOS_DIR.is_dir():
+    """parsed_items старші за поріг більше не тримають свої фото (images_json = '[]')."""
+    if dry_run:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM parsed_items WHERE created_ts < ? AND {_HAS_IMAGES_SQL}",
+            (cutoff_ts,),
+        )
+        stats["parsed_items_cleared"] = int(cursor.fetchone()[0] or 0)
         return
-
-    scanned = 0
-    try:
-        with os.scandir(PHOTOS_DIR) as it:
-            for entry in it:
-                if not entry.is_file(follow_symlinks=False):
-                    continue
-                scanned += 1
-                name = entry.name
-                path = Path(entry.path)
-
-                if name in listing_basenames:
-                    stats["skipped_in_use"] += 1
-                    continue
-
-                if not _file_is_too_old(path, cutoff):
-                    stats["skipped_too_recent"] += 1
-                    continue
-
-                stats["too_old_candidates"] += 1
-                if not _delete_file(path, dry_run, stats, pending_commits, reason="too_old"):
-                    continue
-                _maybe_commit(conn, pending_commits, dry_run)
-
-                if scanned % _PROGRESS_EVERY == 0:
-                    _progress(
-                        f"cleanup: надто старі — переглянуто {scanned}, "
-                        f"видалено {stats['too_old_deleted']}",
-                        on_progress,
-                    )
-    except OSError as e:
-        stats["errors"].append(f"scandir {PHOTOS_DIR}: {e}")
-
-
-def _sync_parsed_items_images_in_db(
-    cursor,
-    conn,
-    dry_run: bool,
-    stats: dict[str, Any],
-    listing_basenames: frozenset[str],
-    cutoff: datetime,
-    time_mod: str,
-    pending_commits: list[int],
-    on_progress: Callable[[str], None] | None,
-) -> None:
-    """Синхронізувати parsed_items.images_json з диском після видалення фото."""
-    processed = 0
-    for row in _iter_query_rows(
-        cursor,
-        """
-        SELECT id, images_json, created_at
-        FROM parsed_items
-        WHERE images_json IS NOT NULL
-          AND TRIM(images_json) NOT IN ('', '[]')
-        """,
-    ):
-        refs = _load_images_json(row["images_json"])
-        if not refs:
-            continue
-
-        basenames: list[str] = []
-        kept_refs: list[str] = []
-        for ref in refs:
-            path = _normalize_parsed_image_path(ref)
-            if path is None:
-                continue
-            basenames.append(path.name)
-            if path.name in listing_basenames:
-                kept_refs.append(ref)
-                continue
-            if path.is_file() and not _file_is_too_old(path, cutoff):
-                kept_refs.append(ref)
-
-        if _any_in_listing(basenames, listing_basenames):
-            if kept_refs != refs:
-                processed += 1
-                if kept_refs:
-                    _update_parsed_item_images(
-                        cursor, conn, row["id"], kept_refs, dry_run, stats, pending_commits
-                    )
-                else:
-                    _clear_parsed_item_images(
-                        cursor, conn, row["id"], dry_run, stats, pending_commits
-                    )
-            continue
-
-        row_old = _row_created_before(row["created_at"], time_mod, cursor)
-        all_gone = all(
-            (p := _normalize_parsed_image_path(ref)) is None or not p.is_file()
-            for ref in refs
+    while True:
+        cursor.execute(
+            f"SELECT id FROM parsed_items WHERE created_ts < ? AND {_HAS_IMAGES_SQL} LIMIT ?",
+            (cutoff_ts, _BATCH_ROWS),
         )
-
-        if row_old or all_gone or not kept_refs:
-            processed += 1
-            _clear_parsed_item_images(cursor, conn, row["id"], dry_run, stats, pending_commits)
-        elif kept_refs != refs:
-            processed += 1
-            _update_parsed_item_images(
-                cursor, conn, row["id"], kept_refs, dry_run, stats, pending_commits
-            )
-
-        if processed % _PROGRESS_EVERY == 0:
-            _progress(
-                f"cleanup: БД images_json — оновлено {processed} "
-                f"(очищено {stats['parsed_items_cleared']}, "
-                f"підрізано {stats['parsed_items_images_trimmed']})",
-                on_progress,
-            )
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            break
+        cursor.execute(
+            f"UPDATE parsed_items SET images_json = '[]' WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        )
+        stats["parsed_items_cleared"] += len(ids)
+        conn.commit()
+        if stats["parsed_items_cleared"] % _PROGRESS_EVERY < len(ids):
+            _progress(f"cleanup: БД images_json — очищено {stats['parsed_items_cleared']}", on_progress)
 
 
 def _delete_old_parsed_items_from_db(
@@ -330,157 +77,198 @@ def _delete_old_parsed_items_from_db(
     conn,
     dry_run: bool,
     stats: dict[str, Any],
-    time_mod: str,
-    pending_commits: list[int],
+    cutoff_ts: int,
     on_progress: Callable[[str], None] | None,
 ) -> None:
     """
     Видалити застарілі рядки parsed_items (> N днів):
     rejected, опубліковані (є listing), або без фото (images_json порожній).
     """
-    deleted_batch = 0
-    for row in _iter_query_rows(
-        cursor,
-        """
-        SELECT id, status, marketplace_mod_status, channel_mod_status,
-               marketplace_listing_id, images_json
-        FROM parsed_items
-        WHERE datetime(created_at) < datetime('now', ?)
-        """,
-        (time_mod,),
-    ):
-        status = (row["status"] or "").strip().lower()
-        mp = (row["marketplace_mod_status"] or status or "pending").strip().lower()
-        ch = (row["channel_mod_status"] or status or "pending").strip().lower()
-        images_raw = (row["images_json"] or "").strip()
-        has_listing = row["marketplace_listing_id"] is not None
-        no_images = images_raw in ("", "[]")
-
-        should_delete = (
-            status == "rejected"
-            or (mp == "rejected" and ch == "rejected")
-            or has_listing
-            or no_images
+    # Keyset по (created_ts, id) — іде індексом idx_parsed_items_created_ts, залишені рядки не перечитуються.
+    last = (-1, 0)
+    while True:
+        cursor.execute(
+            """
+            SELECT id, created_ts, status, marketplace_mod_status, channel_mod_status,
+                   marketplace_listing_id, images_json
+            FROM parsed_items
+            WHERE created_ts < ? AND (created_ts, id) > (?, ?)
+            ORDER BY created_ts, id
+            LIMIT ?
+            """,
+            (cutoff_ts, *last, _BATCH_ROWS),
         )
-        if not should_delete:
-            stats["parsed_items_kept"] += 1
-            continue
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last = (int(rows[-1]["created_ts"]), int(rows[-1]["id"]))
+        to_delete: list[int] = []
+        for row in rows:
+            status = (row["status"] or "").strip().lower()
+            mp = (row["marketplace_mod_status"] or status or "pending").strip().lower()
+            ch = (row["channel_mod_status"] or status or "pending").strip().lower()
+            # dry_run: попередній крок фото не знімав, але в реальному прогоні вони вже '[]'.
+            images_raw = "[]" if dry_run else (row["images_json"] or "").strip()
+            should_delete = (
+                status == "rejected"
+                or (mp == "rejected" and ch == "rejected")
+                or row["marketplace_listing_id"] is not None
+                or images_raw in ("", "[]")
+            )
+            if should_delete:
+                to_delete.append(int(row["id"]))
+            else:
+                stats["parsed_items_kept"] += 1
+        if to_delete:
+            if not dry_run:
+                cursor.execute(
+                    f"DELETE FROM parsed_items WHERE id IN ({','.join('?' * len(to_delete))})",
+                    to_delete,
+                )
+                conn.commit()
+            stats["parsed_items_deleted"] += len(to_delete)
+            if stats["parsed_items_deleted"] % _PROGRESS_EVERY < len(to_delete):
+                _progress(
+                    f"cleanup: БД parsed_items — видалено {stats['parsed_items_deleted']} застарілих рядків",
+                    on_progress,
+                )
 
-        deleted_batch += 1
-        _delete_parsed_item_row(cursor, conn, row["id"], dry_run, stats, pending_commits)
 
-        if deleted_batch % _PROGRESS_EVERY == 0:
-            _progress(
-                f"cleanup: БД parsed_items — видалено {stats['parsed_items_deleted']} застарілих рядків",
-                on_progress,
-            )
+def _file_candidate(path: str):
+    """(abs_path, stat) файлу-кандидата; stat None — файлу вже немає."""
+    abs_path = manifest_abs_path(path)
+    try:
+        st = abs_path.stat() if abs_path is not None else None
+    except OSError:
+        st = None
+    return abs_path, st
+
+
+def _count_deleted(stats: dict[str, Any], path: str, st) -> None:
+    stats["files_deleted"] += 1
+    stats["too_old_deleted"] += 1
+    stats["bytes_freed"] += int(st.st_size)
+    if path.startswith("listings/"):
+        stats["public_too_old_deleted"] += 1
 
 
-def _cleanup_old_parsed_item_rows(
+def _delete_unreferenced_files(
     cursor,
     conn,
-    dry_run: bool,
     stats: dict[str, Any],
-    listing_basenames: frozenset[str],
-    cutoff: datetime,
-    time_mod: str,
-    pending_commits: list[int],
+    cutoff_ts: int,
+    include_public: bool,
     on_progress: Callable[[str], None] | None,
 ) -> None:
-    """Видалити файли з parsed_items старіших за N днів (допоміжний прохід перед sync БД)."""
-    processed = 0
-    for row in _iter_query_rows(
-        cursor,
-        """
-        SELECT id, images_json, created_at
-        FROM parsed_items
-        WHERE images_json IS NOT NULL
-          AND TRIM(images_json) NOT IN ('', '[]')
-          AND datetime(created_at) < datetime('now', ?)
-        """,
-        (time_mod,),
-    ):
-        refs = _load_images_json(row["images_json"])
-        if not refs:
-            continue
-
-        basenames: list[str] = []
-        paths: list[Path] = []
-        for ref in refs:
-            path = _normalize_parsed_image_path(ref)
-            if path is not None:
-                basenames.append(path.name)
-                paths.append(path)
-
-        if _any_in_listing(basenames, listing_basenames):
-            stats["skipped_rows_in_use"] += 1
-            continue
-
-        processed += 1
-        stats["stale_parsed_rows"] += 1
-
-        for path in paths:
-            if not path.is_file():
+    """Файли маніфесту з refcount = 0, старші за поріг (індекс idx_parsed_photo_manifest_garbage)."""
+    public_clause = "" if include_public else " AND path LIKE 'parsed_photos/%'"
+    while True:
+        cursor.execute(
+            f"""
+            SELECT path, size FROM parsed_photo_manifest
+            WHERE refcount <= 0 AND created_ts < ?{public_clause}
+            ORDER BY created_ts
+            LIMIT ?
+            """,
+            (cutoff_ts, _BATCH_ROWS),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        gone: list[str] = []
+        touched: list[tuple[int, str]] = []
+        for row in rows:
+            path = str(row["path"])
+            stats["too_old_candidates"] += 1
+            abs_path, st = _file_candidate(path)
+            if st is None:
+                gone.append(path)
                 continue
-            if path.name in listing_basenames:
+            # Blob перевикористано (lookup_photo_blob оновлює mtime) — ще не сміття.
+            if int(st.st_mtime) >= cutoff_ts:
+                stats["skipped_too_recent"] += 1
+                touched.append((int(st.st_mtime), path))
                 continue
-            if not _file_is_too_old(path, cutoff):
+            try:
+                abs_path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                stats["errors"].append(f"unlink {abs_path}: {e}")
+                touched.append((int(time.time()), path))
                 continue
-            _delete_file(path, dry_run, stats, pending_commits, reason="too_old")
-            _maybe_commit(conn, pending_commits, dry_run)
-
-        if processed % _PROGRESS_EVERY == 0:
-            _progress(f"cleanup: parsed_items файли — оброблено {processed}", on_progress)
-
-
-def _any_in_listing(basenames: list[str], listing_basenames: frozenset[str]) -> bool:
-    return any(bn in listing_basenames for bn in basenames)
-
-
-def _row_created_before(created_at: Any, time_mod: str, cursor) -> bool:
-    if not created_at:
-        return True
-    cursor.execute(
-        "SELECT 1 WHERE datetime(?) < datetime('now', ?)",
-        (str(created_at), time_mod),
-    )
-    return cursor.fetchone() is not None
+            _count_deleted(stats, path, st)
+            gone.append(path)
+        if gone:
+            cursor.execute(
+                f"DELETE FROM parsed_photo_manifest WHERE path IN ({','.join('?' * len(gone))})",
+                gone,
+            )
+        if touched:
+            cursor.executemany(
+                "UPDATE parsed_photo_manifest SET created_ts = ? WHERE path = ?",
+                touched,
+            )
+        conn.commit()
+        if stats["too_old_candidates"] % _PROGRESS_EVERY < len(rows):
+            _progress(
+                f"cleanup: маніфест — переглянуто {stats['too_old_candidates']}, "
+                f"видалено {stats['files_deleted']}",
+                on_progress,
+            )
 
 
-def _cleanup_old_public_parser_photos(
-    conn,
-    dry_run: bool,
+def _estimate_unreferenced_files(
+    cursor,
     stats: dict[str, Any],
-    listing_basenames: frozenset[str],
-    cutoff: datetime,
-    pending_commits: list[int],
+    cutoff_ts: int,
+    include_public: bool,
     on_progress: Callable[[str], None] | None,
 ) -> None:
-    if not PUBLIC_ORIGINALS_DIR.is_dir():
-        return
-
-    scanned = 0
-    for pattern in ("parser_*", "pi*"):
-        for path in PUBLIC_ORIGINALS_DIR.glob(pattern):
-            if not path.is_file():
-                continue
-            scanned += 1
-            if path.name in listing_basenames:
-                stats["skipped_in_use"] += 1
+    """
+    dry_run: ті самі кандидати лише SELECT-ами. refcount зменшується на посилання старих
+    parsed_items, які реальний прогін зняв би першим кроком.
+    """
+    public_clause = "" if include_public else " AND m.path LIKE 'parsed_photos/%'"
+    last = (-1, "")
+    while True:
+        cursor.execute(
+            f"""
+            WITH dropped(path) AS (
+                SELECT {_ref_key_sql("j.value")}
+                FROM parsed_items pi, {_json_refs_sql("pi.images_json")} j
+                WHERE pi.created_ts < ? AND {_HAS_IMAGES_SQL} AND j.type = 'text'
+            ),
+            drops AS (SELECT path, COUNT(*) AS n FROM dropped WHERE path IS NOT NULL GROUP BY path)
+            SELECT m.path, m.created_ts FROM parsed_photo_manifest m
+            LEFT JOIN drops d ON d.path = m.path
+            WHERE m.created_ts < ? AND (m.created_ts, m.path) > (?, ?)
+              AND m.refcount - COALESCE(d.n, 0) <= 0{public_clause}
+            ORDER BY m.created_ts, m.path
+            LIMIT ?
+            """,
+            (cutoff_ts, cutoff_ts, *last, _BATCH_ROWS),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last = (int(rows[-1]["created_ts"]), str(rows[-1]["path"]))
+        for row in rows:
+            path = str(row["path"])
+            stats["too_old_candidates"] += 1
+            _, st = _file_candidate(path)
+            if st is None:
                 continue
-            if not _file_is_too_old(path, cutoff):
+            if int(st.st_mtime) >= cutoff_ts:
                 stats["skipped_too_recent"] += 1
                 continue
-            stats["public_too_old_deleted"] += 1
-            if not _delete_file(path, dry_run, stats, pending_commits, reason="too_old"):
-                continue
-            _maybe_commit(conn, pending_commits, dry_run)
-            if scanned % _PROGRESS_EVERY == 0:
-                _progress(
-                    f"cleanup: public надто старі — переглянуто {scanned}, "
-                    f"видалено {stats['public_too_old_deleted']}",
-                    on_progress,
-                )
+            _count_deleted(stats, path, st)
+        if stats["too_old_candidates"] % _PROGRESS_EVERY < len(rows):
+            _progress(
+                f"cleanup: маніфест — переглянуто {stats['too_old_candidates']}, "
+                f"було б видалено {stats['files_deleted']}",
+                on_progress,
+            )
 
 
 def cleanup_old_unused_parser_photos(
@@ -492,10 +280,10 @@ def cleanup_old_unused_parser_photos(
 ) -> dict[str, Any]:
     """
     Видалити фото парсера, які:
-    - не використовуються в Listing.images
-    - старіші за `days` днів (за mtime файлу або created_at parsed_items)
+    - не використовуються в Listing.images (refcount маніфесту)
+    - старіші за `days` днів (реєстрація / mtime файлу; parsed_items — за created_ts)
 
-    Без підтвердження — dry_run=False видаляє одразу.
+    Без підтвердження — dry_run=False видаляє одразу. dry_run лише читає (без блокування запису).
     """
     if days < 1 or days > 3650:
         raise ValueError("days must be between 1 and 3650")
@@ -507,60 +295,50 @@ def cleanup_old_unused_parser_photos(
         "too_old_candidates": 0,
         "public_too_old_deleted": 0,
         "parsed_items_cleared": 0,
-        "parsed_items_images_trimmed": 0,
         "parsed_items_deleted": 0,
         "parsed_items_kept": 0,
-        "stale_parsed_rows": 0,
-        "skipped_in_use": 0,
         "skipped_too_recent": 0,
-        "skipped_rows_in_use": 0,
         "errors": [],
         "days": days,
         "reason": "надто старі та не використовуються в оголошеннях",
     }
 
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    time_mod = f"-{days} days"
-
+    cutoff_ts = int(time.time()) - days * 86400
     _progress(f"cleanup: правило — старіші {days} дн., не в Listing → видалити", on_progress)
-    _progress("cleanup: завантаження індексу Listing…", on_progress)
 
+    ensure_photo_store_table()
     conn = get_connection()
     cursor = conn.cursor()
-    listing_basenames = _build_listing_image_basenames(cursor)
-    _progress(f"cleanup: фото в оголошеннях (захищені): {len(listing_basenames)}", on_progress)
-
-    pending_commits = [0]
-
-    _progress("cleanup: parsed_photos/ — надто старі…", on_progress)
-    _cleanup_old_parsed_photos_on_disk(
-        conn, dry_run, stats, listing_basenames, cutoff, pending_commits, on_progress
-    )
+    try:
+        # Тригери могли зникнути посеред роботи процесу (Prisma перестворила Listing) —
+        # тоді refcount не враховує нові оголошення, і видаляти за ним не можна.
+        if dry_run:
+            missing = missing_photo_manifest_triggers(conn)
+            if missing:
+                stats["errors"].append(
+                    "немає тригерів маніфесту " + ", ".join(missing) + " — прогноз файлів пропущено"
+                )
+        elif ensure_photo_manifest_triggers(conn):
+            stats["manifest_rebuilt"] = True
 
-    _progress("cleanup: parsed_items — файли старіших за поріг…", on_progress)
-    _cleanup_old_parsed_item_rows(
-        cursor, conn, dry_run, stats, listing_basenames, cutoff, time_mod, pending_commits, on_progress
-    )
+        _progress("cleanup: parsed_items — зняття фото зі старих рядків…", on_progress)
+        _expire_old_parsed_item_images(cursor, conn, dry_run, stats, cutoff_ts, on_progress)
 
-    _progress("cleanup: БД — синхронізація images_json…", on_progress)
-    _sync_parsed_items_images_in_db(
-        cursor, conn, dry_run, stats, listing_basenames, cutoff, time_mod, pending_commits, on_progress
-    )
+        _progress("cleanup: БД — видалення застарілих parsed_items…", on_progress)
+        _delete_old_parsed_items_from_db(cursor, conn, dry_run, stats, cutoff_ts, on_progress)
 
-    _progress("cleanup: БД — видалення застарілих parsed_items…", on_progress)
-    _delete_old_parsed_items_from_db(
-        cursor, conn, dry_run, stats, time_mod, pending_commits, on_progress
-    )
-
-    if include_public:
-        _progress("cleanup: public parser/pi* — надто старі…", on_progress)
-        _cleanup_old_public_parser_photos(
-            conn, dry_run, stats, listing_basenames, cutoff, pending_commits, on_progress
+        _progress(
+            "cleanup: файли без посилань"
+            + (f" (parsed_photos + {PUBLIC_ORIGINALS_DIR.name})" if include_public else " (parsed_photos)")
+            + "…",
+            on_progress,
         )
-
-    if not dry_run:
-        conn.commit()
-    conn.close()
+        if not dry_run:
+            _delete_unreferenced_files(cursor, conn, stats, cutoff_ts, include_public, on_progress)
+        elif not stats["errors"]:
+            _estimate_unreferenced_files(cursor, stats, cutoff_ts, include_public, on_progress)
+    finally:
+        conn.close()
 
     _progress(
         f"cleanup: готово — файли {stats['files_deleted']} (надто старі {stats['too_old_deleted']}), "
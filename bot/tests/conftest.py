@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+_BOT_ROOT = Path(__file__).resolve().parent.parent
+if str(_BOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_BOT_ROOT))
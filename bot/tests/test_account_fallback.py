@@ -0,0 +1,75 @@
+"""Fallback при FloodWait, коли всі акаунти зайняті своїми бакетами (concurrency ≥ акаунтів)."""
+
+import asyncio
+from pathlib import Path
+
+import pyrogram
+import pytest
+
+from parser.core import pyrogram_accounts
+from parser.core.account_pool import PyrogramAccount
+from parser.storage import parser_accounts_db
+
+
+class _FakeClient:
+    def __init__(self, name: str, **kwargs):
+        self.name = name
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _account(idx: int, tmp_path: Path) -> PyrogramAccount:
+    return PyrogramAccount(
+        id=idx,
+        label=f"acc{idx}",
+        api_id=idx,
+        api_hash="hash",
+        phone=f"+4915000000{idx}",
+        session_path=tmp_path / f"fallback_test_{idx}.session",
+        priority=idx,
+    )
+
+
+@pytest.fixture
+def accounts(monkeypatch, tmp_path):
+    accs = [_account(1, tmp_path), _account(2, tmp_path)]
+    monkeypatch.setattr(pyrogram, "Client", _FakeClient)
+    monkeypatch.setattr(pyrogram_accounts, "list_accounts_round_robin", lambda for_dm=False: list(accs))
+    monkeypatch.setattr(
+        pyrogram_accounts,
+        "fallback_accounts_after",
+        lambda primary: [a for a in accs if a.id != primary.id],
+    )
+    monkeypatch.setattr(parser_accounts_db, "mark_parse_result", lambda *a, **k: None)
+    monkeypatch.setattr(parser_accounts_db, "set_flood_until", lambda *a, **k: None)
+    return accs
+
+
+def test_fallback_waits_for_busy_account(accounts):
+    flooded, spare = accounts
+    parsed: list[tuple[str, str]] = []
+
+    async def parse_fn(client, channel, city, notify_callback):
+        if client.name == str(flooded.session_path):
+            raise RuntimeError("Telegram says: [420 FLOOD_WAIT_X] - A wait of 300 seconds is required")
+        # Резервний акаунт ще зайнятий своїм бакетом, коли перший ловить ліміт.
+        await asyncio.sleep(0.05)
+        parsed.append((client.name, channel))
+        return {"added": 1, "skipped": 0, "reasons": {}}
+
+    total = asyncio.run(
+        pyrogram_accounts.run_channels_with_accounts(
+            {"@flooded": "Berlin", "@spare": "Hamburg"},
+            parse_fn,
+            None,
+            concurrency=2,
+        )
+    )
+
+    assert total["errors"] == []
+    assert total["added"] == 2
+    assert (str(spare.session_path), "@flooded") in parsed
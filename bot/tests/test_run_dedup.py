@@ -0,0 +1,68 @@
+"""Репости в одному вікні конвеєра: prepare обох іде до commit першого."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from parser.core.dedup import RunDedup, parser_dedup_override
+from parser.core.message_pipeline import run_ordered_pipeline
+from parser.storage.embeddings import encode_embedding
+
+
+def _row(message_id: int, dedup_key: str, vec=None) -> dict:
+    return {
+        "message_id": message_id,
+        "parser_type": "default",
+        "dedup_key": dedup_key,
+        "text_embedding": encode_embedding(vec, "f32") if vec is not None else None,
+    }
+
+
+def _run_window(rows: list[dict], *, batch_size: int) -> list[int]:
+    """Повторює commit з parse_channel: RunDedup перед insert; повертає «вставлені» message_id."""
+    inserted: list[int] = []
+    run_dedup = RunDedup()
+
+    async def source():
+        for row in rows:
+            yield row
+
+    async def prepare(row: dict) -> dict:
+        await asyncio.sleep(0.01)
+        return row
+
+    async def commit(batch: list[dict]) -> None:
+        inserted.extend(r["message_id"] for r in batch if not run_dedup.duplicate_reason(r))
+
+    async def main():
+        await run_ordered_pipeline(
+            source(), prepare, commit, workers=8, window=8, batch_size=batch_size, batch_wait_ms=100
+        )
+
+    with parser_dedup_override(True):
+        asyncio.run(main())
+    return inserted
+
+
+@pytest.mark.parametrize("batch_size", [1, 8])
+def test_repost_with_same_dedup_key_in_one_window(batch_size):
+    rows = [_row(10, "key-a"), _row(11, "key-b"), _row(12, "key-a")]
+    assert _run_window(rows, batch_size=batch_size) == [10, 11]
+
+
+@pytest.mark.parametrize("batch_size", [1, 8])
+def test_repost_with_near_identical_embedding_in_one_window(batch_size):
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=64).astype(np.float32)
+    other = rng.normal(size=64).astype(np.float32)
+    near = base + 0.01 * rng.normal(size=64).astype(np.float32)
+    rows = [_row(20, "k1", base), _row(21, "k2", other), _row(22, "k3", near)]
+    assert _run_window(rows, batch_size=batch_size) == [20, 21]
+
+
+def test_text_dedup_disabled_keeps_reposts():
+    run_dedup = RunDedup()
+    with parser_dedup_override(False):
+        assert run_dedup.duplicate_reason(_row(1, "same")) is None
+        assert run_dedup.duplicate_reason(_row(2, "same")) is None